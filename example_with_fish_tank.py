@@ -14,6 +14,8 @@ handler = bug_trail_core.BugTrailHandler(
 )
 
 logging.basicConfig(handlers=[handler], level=logging.DEBUG)
+# Uncaught exceptions (any thread) are logged, and the handler is flushed on exit/SIGTERM.
+bug_trail_core.install_hooks(handler)
 
 # Example usage
 logger = logging.getLogger(__name__)
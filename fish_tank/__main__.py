@@ -2,7 +2,6 @@
 import logging
 import os
 import random
-import sys
 import time
 
 import fish_tank.best_fish as best_fish
@@ -11,14 +10,6 @@ from fish_tank.basic_classes import Fish, Tank
 logger = logging.getLogger(__name__)
 
 
-# the hook is called with type, exception, traceback
-def handle_exception(exc_type, exc_value, exc_traceback):
-    logger.error("Uncaught exception", exc_info=(exc_type, exc_value, exc_traceback))
-
-
-sys.excepthook = handle_exception
-
-
 def main():
     logger.info("Starting fish tank")
     os.system("cls" if os.name == "nt" else "clear")
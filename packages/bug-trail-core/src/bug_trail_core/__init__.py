@@ -5,8 +5,52 @@ Install bug_trail_core to your application. Pipx install bug_trail to avoid depe
 conflicts
 """
 
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from bug_trail_core.__about__ import __version__
-from bug_trail_core.config import BugTrailConfig, read_config
-from bug_trail_core.handlers import BugTrailHandler
 
-__all__ = ["BugTrailHandler", "read_config", "BugTrailConfig", "__version__"]
+if TYPE_CHECKING:
+    from bug_trail_core.async_handler import AsyncBugTrailHandler
+    from bug_trail_core.collector import Collector, SocketBugTrailHandler
+    from bug_trail_core.config import BugTrailConfig, read_config
+    from bug_trail_core.handlers import BugTrailHandler
+    from bug_trail_core.shutdown import install_hooks
+
+# Public name -> module. Resolved on first access so `import bug_trail_core` stays
+# cheap for CLI tools; asyncio, psutil, platformdirs and toml load only when used.
+_LAZY = {
+    "BugTrailHandler": "bug_trail_core.handlers",
+    "AsyncBugTrailHandler": "bug_trail_core.async_handler",
+    "SocketBugTrailHandler": "bug_trail_core.collector",
+    "Collector": "bug_trail_core.collector",
+    "read_config": "bug_trail_core.config",
+    "BugTrailConfig": "bug_trail_core.config",
+    "install_hooks": "bug_trail_core.shutdown",
+}
+
+__all__ = [
+    "BugTrailHandler",
+    "AsyncBugTrailHandler",
+    "SocketBugTrailHandler",
+    "Collector",
+    "read_config",
+    "BugTrailConfig",
+    "install_hooks",
+    "__version__",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -34,8 +34,48 @@ def main(argv: Sequence[str] | None = None) -> int:
         "--version", action="version", version="%(prog)s " + f"{__version__}"
     )
 
+    subparsers = parser.add_subparsers(dest="command")
+    collect = subparsers.add_parser(
+        "collect",
+        help="Run the single-writer collector that SocketBugTrailHandler sends to.",
+    )
+    collect.add_argument(
+        "--config",
+        type=str,
+        default="pyproject.toml",
+        help="Path to the configuration file (default: pyproject.toml).",
+    )
+    collect.add_argument(
+        "--db", type=str, default=None, help="Override database path from config."
+    )
+    collect.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Unix socket to listen on (default: bug_trail.sock next to the database).",
+    )
+    collect.add_argument(
+        "--batch-size", type=int, default=500, help="Most records per transaction."
+    )
+
     args = parser.parse_args(argv)
-    if args.show_config:
+    if args.command == "collect":
+        from bug_trail_core.collector import Collector
+
+        config = read_config(args.config)
+        db_path = args.db or config.database_path
+        collector = Collector(
+            db_path,
+            args.socket,
+            batch_size=args.batch_size,
+            promoted_keys=config.promoted_keys,
+            index_locals=config.index_locals,
+        )
+        print(
+            f"Collecting into {db_path} from {collector.socket_path}. Press Ctrl+C to stop."
+        )
+        collector.serve_forever()
+    elif args.show_config:
         print(
             "This is the core library. Install or run bug_trail to generate the website to view the logs.\n"
         )
@@ -0,0 +1,185 @@
+"""
+Logging handler for asyncio applications.
+
+`logger.exception` called from a coroutine must not block the event loop on SQLite.
+`AsyncBugTrailHandler` snapshots the record on the loop thread, while the frames
+still hold the locals of the moment of the error and the current task is known,
+and hands the database write to its own single-thread executor.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.snapshot import RecordSnapshot
+
+
+class AsyncBugTrailHandler(logging.Handler):
+    """
+    A logging handler that keeps SQLite I/O off the event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        minimum_level: int = logging.ERROR,
+        promoted_keys: Sequence[str] = (),
+        index_locals: bool = False,
+    ) -> None:
+        """
+        Initialize the handler
+        Args:
+            db_path (str): Path to the SQLite database
+            minimum_level (int): Records below this level are ignored
+            promoted_keys (Sequence[str]): `extra` keys given an indexed column
+            index_locals (bool): Make captured local variables searchable
+        """
+        super().__init__()
+        self.minimum_level = minimum_level
+        # One worker: writes stay ordered and the connection never changes thread.
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bug-trail-writer"
+        )
+        self.base_handler: BaseErrorLogHandler = self._executor.submit(
+            BaseErrorLogHandler,
+            db_path,
+            minimum_level=minimum_level,
+            promoted_keys=promoted_keys,
+            index_locals=index_locals,
+        ).result()
+        self._closed = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Queue a log record for the writer thread
+
+        On the event loop thread this returns immediately. Anywhere else it waits
+        for the write, like `BugTrailHandler` does.
+
+        Args:
+            record (logging.LogRecord): The log record to be inserted
+        """
+        metrics = self.base_handler.metrics
+        if record.levelno < self.minimum_level or self._closed:
+            metrics.suppressed += 1
+            return
+        started = time.perf_counter_ns()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            on_loop = False
+        else:
+            on_loop = True
+            # The current task is only visible on this thread.
+            if getattr(record, "taskName", None) is None:
+                task = asyncio.current_task()
+                if task is not None:
+                    record.taskName = task.get_name()
+        metrics.emitted += 1
+        # Snapshot here, while the frames still hold the locals of the moment of the
+        # error; the coroutine keeps running while the writer catches up.
+        snapshot = self.base_handler.prepare(record)
+        try:
+            future = self._executor.submit(self._write, snapshot)
+        except RuntimeError:
+            # close() shut the executor down after the _closed check above.
+            metrics.dropped += 1
+            return
+        metrics.queue_depth += 1
+        if not on_loop:
+            future.result()
+        metrics.emit.observe(time.perf_counter_ns() - started)
+
+    def _write(self, snapshot: RecordSnapshot) -> None:
+        metrics = self.base_handler.metrics
+        metrics.queue_depth -= 1
+        try:
+            self.base_handler.write_batch([snapshot])
+        except Exception:  # noqa: BLE001
+            metrics.errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Counters and latency histograms, see `BaseErrorLogHandler.stats`.
+        """
+        return self.base_handler.stats()
+
+    def flush(self) -> None:
+        """
+        Wait up to five seconds for queued records to be written, see `drain`.
+        On the event loop thread this doesn't wait; use `await handler.aflush()`.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.drain()
+
+    def drain(self, timeout: float | None = 5.0) -> bool:
+        """
+        Block until every queued record is written. Not for the event loop thread.
+
+        Args:
+            timeout (float): Longest to wait, in seconds. None waits for as long as it takes.
+
+        Returns:
+            bool: False if the queue was not written within `timeout` seconds
+        """
+        try:
+            self._barrier().result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def aflush(self) -> None:
+        """
+        Wait for every queued record to be written, without blocking the event loop.
+        """
+        await asyncio.wrap_future(self._barrier())
+
+    def _barrier(self) -> Future[None]:
+        # Done once everything submitted before it is written.
+        if not self._closed:
+            try:
+                return self._executor.submit(lambda: None)
+            except RuntimeError:
+                pass  # shut down meanwhile, nothing left to wait for
+        barrier: Future[None] = Future()
+        barrier.set_result(None)
+        return barrier
+
+    async def aclose(self) -> None:
+        """
+        Flush and close without blocking the event loop. Use in a lifespan shutdown.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        await asyncio.wrap_future(self._executor.submit(self.base_handler.close))
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._executor.shutdown, True
+        )
+        super().close()
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Write what is queued, then close the connection on its own thread
+
+        Args:
+            timeout (float): Longest to wait for the writer, None waits for as long as it takes
+        """
+        if not self._closed:
+            self._closed = True
+            closing = self._executor.submit(self.base_handler.close)
+            try:
+                closing.result(timeout)
+            except TimeoutError:
+                pass
+            # Don't wait on a writer that is still busy past the timeout.
+            self._executor.shutdown(wait=closing.done())
+        super().close()
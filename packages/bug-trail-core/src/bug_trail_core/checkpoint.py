@@ -0,0 +1,151 @@
+"""
+WAL checkpointing.
+
+SQLite only checkpoints automatically at commit time and never shrinks the
+-wal file, and a checkpoint can't get past a long-lived reader. So whoever is
+long-lived (the batch writer thread, the viewer) calls `WalCheckpointer.tick`
+now and then:
+
+- PASSIVE every `interval` seconds, copying what it can without blocking anyone,
+- TRUNCATE once things go quiet, so the -wal file shrinks back to zero,
+- TRUNCATE straight away once the -wal file is bigger than `size_limit`.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any
+
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+@dataclass
+class CheckpointResult:
+    """Outcome of one `PRAGMA wal_checkpoint`."""
+
+    mode: str
+    busy: bool
+    wal_frames: int
+    checkpointed_frames: int
+    duration_s: float
+
+
+def wal_size(db_path: str) -> int:
+    """Size of the -wal file in bytes, 0 if there is none."""
+    try:
+        return os.path.getsize(db_path + "-wal")
+    except OSError:
+        return 0
+
+
+def checkpoint(conn: sqlite3.Connection, mode: str = "PASSIVE") -> CheckpointResult:
+    """
+    Run a WAL checkpoint.
+
+    Args:
+        conn (sqlite3.Connection): Any connection to the database, outside a transaction
+        mode (str): One of CHECKPOINT_MODES
+
+    Returns:
+        CheckpointResult: busy is True if readers or writers kept it from finishing
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"mode must be one of {CHECKPOINT_MODES}, got {mode!r}")
+    started = time.perf_counter()
+    busy, wal_frames, checkpointed = conn.execute(
+        f"PRAGMA wal_checkpoint({mode})"
+    ).fetchone()  # nosec
+    return CheckpointResult(
+        mode=mode,
+        busy=bool(busy),
+        wal_frames=wal_frames,
+        checkpointed_frames=checkpointed,
+        duration_s=time.perf_counter() - started,
+    )
+
+
+class WalCheckpointer:
+    """
+    Decides when to checkpoint and keeps counts for the admin page.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        interval: float = 30.0,
+        size_limit: int = 64 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database
+            interval (float): Seconds between PASSIVE checkpoints
+            size_limit (int): Bytes of -wal file that trigger an immediate TRUNCATE
+        """
+        self.db_path = db_path
+        self.interval = interval
+        self.size_limit = size_limit
+        self.counts = {mode: 0 for mode in CHECKPOINT_MODES}
+        self.busy = 0
+        self.errors = 0
+        self.last: CheckpointResult | None = None
+        self.last_at: float | None = None
+        self._last_run = time.monotonic()
+
+    def due(self, idle: bool) -> str | None:
+        """The checkpoint mode to run now, or None."""
+        size = wal_size(self.db_path)
+        if size == 0:
+            return None
+        if size > self.size_limit:
+            return "TRUNCATE"
+        if idle:
+            return "TRUNCATE"
+        if time.monotonic() - self._last_run >= self.interval:
+            return "PASSIVE"
+        return None
+
+    def tick(
+        self, conn: sqlite3.Connection, idle: bool = False
+    ) -> CheckpointResult | None:
+        """
+        Checkpoint if one is due.
+
+        Args:
+            conn (sqlite3.Connection): Connection to checkpoint through
+            idle (bool): True if nothing has been written since the last tick
+        """
+        mode = self.due(idle)
+        if mode is None:
+            return None
+        self._last_run = time.monotonic()
+        try:
+            result = checkpoint(conn, mode)
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+        self.counts[mode] += 1
+        self.last = result
+        self.last_at = time.time()
+        if result.busy:
+            self.busy += 1
+        return result
+
+    def as_dict(self) -> dict[str, Any]:
+        """Counts and the last checkpoint, for display."""
+        return {
+            "wal_size": wal_size(self.db_path),
+            "size_limit": self.size_limit,
+            "interval": self.interval,
+            "counts": dict(self.counts),
+            "busy": self.busy,
+            "errors": self.errors,
+            "last_mode": self.last.mode if self.last else None,
+            "last_duration_ms": (
+                round(self.last.duration_s * 1000, 3) if self.last else None
+            ),
+            "last_at": self.last_at,
+        }
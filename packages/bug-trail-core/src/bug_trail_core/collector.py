@@ -0,0 +1,432 @@
+"""
+Single-writer collector for many worker processes on one host.
+
+Workers log through `SocketBugTrailHandler`, which projects each record and ships
+it over a Unix domain socket. One `Collector` process owns the SQLite file and
+bulk-inserts what it receives, one transaction per batch, so the workers never
+contend for the database lock.
+
+Wire format: a 4 byte big-endian length followed by a UTF-8 JSON object
+`{"row": {column: value}, "exception": payload-or-null}`.
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from bug_trail_core.handlers import BaseErrorLogHandler, project_record
+from bug_trail_core.promoted_keys import promoted_column
+from bug_trail_core.snapshot import RecordSnapshot
+from bug_trail_core.stats import HandlerStats
+
+logger = logging.getLogger(__name__)
+# The collector must never log into itself.
+logger.propagate = False
+
+HEADER = struct.Struct("!I")
+# Refuse absurd frames rather than allocating whatever a peer asks for.
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+def default_socket_path(db_path: str) -> str:
+    """The socket lives next to the database unless configured otherwise."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "bug_trail.sock")
+
+
+def encode_frame(entry: RecordSnapshot) -> bytes:
+    """Serialize a snapshot into a length-prefixed frame."""
+    body = json.dumps(
+        {"row": entry.as_dict(), "exception": entry.exception},
+        default=str,
+    ).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+def decode_frame(body: bytes) -> RecordSnapshot:
+    """Turn a frame body back into a snapshot."""
+    message = json.loads(body)
+    row: dict[str, Any] = message["row"]
+    return RecordSnapshot.from_row(row, message.get("exception"))
+
+
+class _FrameHandler(socketserver.StreamRequestHandler):
+    server: _CollectorServer
+
+    def handle(self) -> None:
+        collector = self.server.collector
+        with collector.connections_lock:
+            collector.connections.add(self.request)
+        try:
+            self._read_frames(collector)
+        finally:
+            with collector.connections_lock:
+                collector.connections.discard(self.request)
+                collector.connections_lock.notify_all()
+
+    def _read_frames(self, collector: Collector) -> None:
+        while True:
+            header = self.rfile.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            (length,) = HEADER.unpack(header)
+            if length > MAX_FRAME_BYTES:
+                logger.warning(
+                    "Dropping connection after oversize frame (%s bytes)", length
+                )
+                return
+            body = self.rfile.read(length)
+            if len(body) < length:
+                return
+            try:
+                collector.submit(decode_frame(body))
+            except (ValueError, KeyError, TypeError) as error:
+                logger.warning("Discarding malformed frame: %s", error)
+
+
+class _CollectorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, collector: Collector) -> None:
+        self.collector = collector
+        super().__init__(socket_path, _FrameHandler)
+
+
+class Collector:
+    """
+    Listens on a Unix domain socket and is the single writer to the database.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        socket_path: str | None = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        promoted_keys: Sequence[str] = (),
+        index_locals: bool = False,
+    ) -> None:
+        """
+        Initialize the collector
+        Args:
+            db_path (str): Path to the SQLite database
+            socket_path (str): Unix socket to listen on, defaults to one next to the database
+            batch_size (int): Most records written per transaction
+            flush_interval (float): Longest a received record waits before being written
+            promoted_keys (Sequence[str]): `extra` keys given an indexed column
+            index_locals (bool): Make captured local variables searchable
+        """
+        self.db_path = db_path
+        # Checked here: the writer thread creates the schema, and start() waits on it.
+        self.promoted_keys = tuple(promoted_keys)
+        for key in self.promoted_keys:
+            promoted_column(key)
+        self.index_locals = index_locals
+        self.socket_path = socket_path or default_socket_path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[RecordSnapshot | None] = queue.Queue()
+        self._server: _CollectorServer | None = None
+        self._threads: list[threading.Thread] = []
+        self.connections: set[socket.socket] = set()
+        self.connections_lock = threading.Condition()
+        self.records_written = 0
+        self._startup_error: BaseException | None = None
+
+    def submit(self, entry: RecordSnapshot) -> None:
+        """Queue a record for the writer thread."""
+        self._queue.put(entry)
+
+    def start(self) -> None:
+        """Bind the socket and start the accept and writer threads."""
+        if os.path.exists(self.socket_path):
+            # Stale socket from a collector that died; a live one would still accept.
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(
+                    f"A collector is already listening on {self.socket_path}"
+                )
+            finally:
+                probe.close()
+        ready = threading.Event()
+        writer = threading.Thread(
+            target=self._write_loop,
+            args=(ready,),
+            name="bug-trail-collector-writer",
+            daemon=True,
+        )
+        writer.start()
+        # The handler (and its sqlite connection) lives on the writer thread.
+        ready.wait()
+        if self._startup_error is not None:
+            error, self._startup_error = self._startup_error, None
+            raise error
+        self._server = _CollectorServer(self.socket_path, self)
+        server = threading.Thread(
+            target=self._server.serve_forever,
+            name="bug-trail-collector-accept",
+            daemon=True,
+        )
+        server.start()
+        self._threads = [writer, server]
+
+    def serve_forever(self) -> None:
+        """Run until interrupted."""
+        self.start()
+        try:
+            while all(thread.is_alive() for thread in self._threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop accepting, write everything already received, then close."""
+        deadline = time.monotonic() + timeout
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        # Let connected workers finish sending, then cut off any that linger.
+        with self.connections_lock:
+            while self.connections and time.monotonic() < deadline:
+                self.connections_lock.wait(deadline - time.monotonic())
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _write_loop(self, ready: threading.Event) -> None:
+        try:
+            handler = BaseErrorLogHandler(
+                self.db_path,
+                promoted_keys=self.promoted_keys,
+                index_locals=self.index_locals,
+            )
+        except BaseException as error:  # noqa: BLE001
+            # Raised again by start(), which is waiting on ready.
+            self._startup_error = error
+            ready.set()
+            return
+        ready.set()
+        try:
+            stopping = False
+            while not stopping:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                if first is None:
+                    break
+                batch = [first]
+                while len(batch) < self.batch_size:
+                    try:
+                        entry = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if entry is None:
+                        stopping = True
+                        break
+                    batch.append(entry)
+                handler.metrics.queue_depth = self._queue.qsize()
+                try:
+                    handler.write_batch(batch)
+                    self.records_written += len(batch)
+                except Exception as error:  # noqa: BLE001
+                    logger.warning(
+                        "Collector failed to write %s records: %s", len(batch), error
+                    )
+        finally:
+            handler.close()
+
+
+class SocketBugTrailHandler(logging.Handler):
+    """
+    A logging handler that ships records to a `Collector` instead of writing SQLite itself.
+
+    `emit` only projects the record and appends it to a local buffer. A background
+    thread does the sending and keeps the buffer while the collector is unreachable.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        minimum_level: int = logging.ERROR,
+        buffer_size: int = 10_000,
+        reconnect_interval: float = 1.0,
+    ) -> None:
+        """
+        Initialize the handler
+        Args:
+            socket_path (str): Unix socket the collector listens on
+            minimum_level (int): Records below this level are ignored
+            buffer_size (int): Frames kept while the collector is down, oldest dropped first
+            reconnect_interval (float): Seconds between connection attempts
+        """
+        super().__init__()
+        self.socket_path = socket_path
+        self.minimum_level = minimum_level
+        self.reconnect_interval = reconnect_interval
+        self.metrics = HandlerStats(type(self).__name__)
+        self._buffer: collections.deque[bytes] = collections.deque(maxlen=buffer_size)
+        self._wakeup = threading.Condition()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closing = False
+        self._sock: socket.socket | None = None
+        self._sender = threading.Thread(
+            target=self._send_loop, name="bug-trail-socket-sender", daemon=True
+        )
+        self._sender.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Queue a record for the collector
+
+        Args:
+            record (logging.LogRecord): The log record to be sent
+        """
+        if record.levelno < self.minimum_level:
+            self.metrics.suppressed += 1
+            return
+        started = time.perf_counter_ns()
+        self.metrics.emitted += 1
+        try:
+            frame = encode_frame(project_record(record))
+        except Exception:  # noqa: BLE001
+            self.metrics.errors += 1
+            self.handleError(record)
+            return
+        self.metrics.serialize.observe(time.perf_counter_ns() - started)
+        with self._wakeup:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.metrics.dropped += 1
+            self._buffer.append(frame)
+            self.metrics.queue_depth = len(self._buffer)
+            self._idle.clear()
+            self._wakeup.notify()
+        self.metrics.emit.observe(time.perf_counter_ns() - started)
+
+    @property
+    def dropped(self) -> int:
+        """Records lost because the buffer was full."""
+        return self.metrics.dropped
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Counters and latency histograms for this handler. `written` counts frames sent.
+        """
+        return self.metrics.as_dict()
+
+    def flush(self) -> None:
+        """Wait up to five seconds for the buffer to drain, see `drain`."""
+        self.drain()
+
+    def drain(self, timeout: float | None = 5.0) -> bool:
+        """
+        Wait for the buffer to drain. Returns at once after `close`.
+
+        Args:
+            timeout (float): Longest to wait, in seconds. None waits for as long as it takes.
+
+        Returns:
+            bool: False if the collector could not be reached before the timeout
+        """
+        if self._closing:
+            return not self._buffer
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Send what can be sent, then stop the background thread. Frames still
+        buffered after that are counted as dropped.
+
+        Args:
+            timeout (float): How long to keep trying, defaults to two reconnect intervals
+        """
+        if timeout is None:
+            timeout = self.reconnect_interval * 2
+        self.drain(timeout)
+        with self._wakeup:
+            self._closing = True
+            self._wakeup.notify()
+        self._sender.join(timeout)
+        with self._wakeup:
+            self.metrics.dropped += len(self._buffer)
+            self._buffer.clear()
+            self.metrics.queue_depth = 0
+        self._disconnect()
+        super().close()
+
+    def _connect(self) -> socket.socket | None:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                return None
+            self._sock = sock
+        return self._sock
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _send_loop(self) -> None:
+        while True:
+            with self._wakeup:
+                while not self._buffer and not self._closing:
+                    self._idle.set()
+                    self._wakeup.wait()
+                if not self._buffer:
+                    self._idle.set()
+                    return
+                frame = self._buffer.popleft()
+                self.metrics.queue_depth = len(self._buffer)
+            sock = self._connect()
+            if sock is not None:
+                try:
+                    sock.sendall(frame)
+                    self.metrics.written += 1
+                    continue
+                except OSError:
+                    self._disconnect()
+            # Collector is down: put the frame back and wait before retrying.
+            self.metrics.retries += 1
+            with self._wakeup:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.metrics.dropped += 1
+                else:
+                    self._buffer.appendleft(frame)
+                if self._closing:
+                    return
+                self._wakeup.wait(self.reconnect_interval)
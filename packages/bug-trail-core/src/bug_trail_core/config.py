@@ -5,19 +5,16 @@ Configuration module for Bug Trail.
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any
 
-try:
-    import tomllib
-
-    USE_TOMLLIB = True
-except ImportError:
-    USE_TOMLLIB = False
-try:
-    import toml
-except ImportError:
-    pass
-import platformdirs
+from bug_trail_core.profiles import (
+    DEFAULT_PROFILE,
+    PROFILE_SETTINGS,
+    PROFILES,
+    StorageProfile,
+    resolve_profile,
+)
 
 
 @dataclass
@@ -30,6 +27,28 @@ class BugTrailConfig:
     database_path: str
     source_folder: str
     ctags_file: str
+    # Durability/throughput settings for the handlers, see bug_trail_core.profiles
+    profile: StorageProfile = field(default_factory=lambda: PROFILES[DEFAULT_PROFILE])
+    # `extra` keys given an indexed column, see bug_trail_core.promoted_keys
+    promoted_keys: list[str] = field(default_factory=list)
+    # Search errors by local variable values, see bug_trail_core.locals_index
+    index_locals: bool = False
+
+
+def _load_toml(config_path: str) -> dict[str, Any]:
+    """Parse a TOML file, returning {} if it is missing or unreadable."""
+    try:
+        try:
+            import tomllib
+        except ImportError:
+            import toml
+
+            return toml.load(config_path)
+        with open(config_path, "rb") as handle:
+            return tomllib.load(handle)
+    # toml and tomllib raise different errors
+    except Exception:
+        return {}
 
 
 def read_config(config_path: str) -> BugTrailConfig:
@@ -42,17 +61,11 @@ def read_config(config_path: str) -> BugTrailConfig:
     Returns:
         BugTrailConfig: Configuration object for Bug Trail.
     """
-    # Read the TOML file
+    # Parsers and platformdirs are imported here, not at module level, so that
+    # importing the handlers stays cheap for apps that never read a config file.
+    import platformdirs
 
-    try:
-        if USE_TOMLLIB:
-            with open(config_path, "rb") as handle:
-                bug_trail_config = tomllib.load(handle)
-        else:
-            bug_trail_config = toml.load(config_path)
-    # toml and tomllib raise different errors
-    except Exception:
-        bug_trail_config = {}
+    bug_trail_config = _load_toml(config_path)
 
     section = bug_trail_config.get("tool", {}).get("bug_trail", {})
 
@@ -77,8 +90,22 @@ def read_config(config_path: str) -> BugTrailConfig:
     # input!
     source_folder = section.get("source_folder", "")
     ctags_file = section.get("ctags_file", "")
+
+    # profile = "fast", plus any single setting, e.g. batch_size = 50
+    overrides = {key: section[key] for key in PROFILE_SETTINGS if key in section}
+    profile = resolve_profile(section.get("profile", DEFAULT_PROFILE), **overrides)
+    promoted_keys = [str(key) for key in section.get("promoted_keys", [])]
+    index_locals = bool(section.get("index_locals", False))
     return BugTrailConfig(
-        app_name, app_author, report_folder, database_path, source_folder, ctags_file
+        app_name,
+        app_author,
+        report_folder,
+        database_path,
+        source_folder,
+        ctags_file,
+        profile,
+        promoted_keys,
+        index_locals,
     )
 
 
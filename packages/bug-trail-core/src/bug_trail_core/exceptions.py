@@ -4,8 +4,17 @@ Record type, instance and call stack info about an exception.
 
 from __future__ import annotations
 
+import enum
+import itertools
 import json
 import sqlite3
+import types
+from collections.abc import Mapping
+from typing import Any
+
+# Attributes kept from each object found in a frame's locals or globals.
+OBJECT_ATTRIBUTE_LIMIT = 50
+_SCALARS = (str, int, float, bool, type(None))
 
 
 def get_exception_hierarchy(ex: BaseException) -> list[tuple[str, str | None]]:
@@ -33,6 +42,40 @@ def get_exception_hierarchy(ex: BaseException) -> list[tuple[str, str | None]]:
     return hierarchy
 
 
+def _object_json(value: Any) -> Any:
+    # json.dumps fallback: an instance becomes its own attributes, one level deep, so
+    # `fish.x` can be searched; anything without them (or nested deeper) its str().
+    if isinstance(value, (type, types.ModuleType, enum.Enum)) or callable(value):
+        return str(value)
+    try:
+        attributes = vars(value)
+    except TypeError:
+        return str(value)
+    if not attributes:
+        return str(value)
+    return {
+        str(name): attribute if isinstance(attribute, _SCALARS) else str(attribute)
+        for name, attribute in itertools.islice(
+            attributes.items(), OBJECT_ATTRIBUTE_LIMIT
+        )
+    }
+
+
+def variables_json(variables: Mapping[str, Any]) -> str:
+    """
+    Serialize a frame's locals or globals. Objects are written as a bounded,
+    shallow copy of their attributes, other values JSON can't hold as their str().
+
+    Args:
+        variables (Mapping[str, Any]): f_locals or f_globals
+
+    Returns:
+        str: A JSON object
+    """
+    # On 3.13+ f_locals is a FrameLocalsProxy, which json.dumps would write as its str()
+    return json.dumps(dict(variables), default=_object_json)
+
+
 def create_connection(db_file: str) -> sqlite3.Connection:
     """Create a database connection to a SQLite database"""
     conn = sqlite3.connect(db_file)
@@ -100,6 +143,24 @@ def create_exception_instance_table(conn: sqlite3.Connection) -> None:
     cursor.execute(sql_create_exception_instance_table)
 
 
+EXCEPTION_INDEXES = (
+    # Log list filtered by exception type: name -> type ids -> record ids.
+    "CREATE INDEX IF NOT EXISTS ix_exception_type_name ON exception_type (name)",
+    "CREATE INDEX IF NOT EXISTS ix_exception_instance_type ON exception_instance (type_id)",
+    # A record's frames in order. Covering for the frame list: the location columns
+    # come after the locals and globals, and reading them from the table would
+    # walk through those.
+    "CREATE INDEX IF NOT EXISTS ix_traceback_info_instance "
+    "ON traceback_info (exception_instance_id, frame_number, filename, function, lineno)",
+)
+
+
+def create_exception_indexes(conn: sqlite3.Connection) -> None:
+    """Create the EXCEPTION_INDEXES, after their tables. Does not commit."""
+    for statement in EXCEPTION_INDEXES:
+        conn.execute(statement)
+
+
 def insert_exception_instance(
     conn: sqlite3.Connection, record_id: str, ex: BaseException, comments: str = ""
 ) -> None:
@@ -136,18 +197,35 @@ def insert_exception_instance(
     conn.commit()
 
 
+# Where each frame was, added after f_locals/f_globals; older databases get them by ALTER TABLE.
+FRAME_LOCATION_COLUMNS = (
+    ("filename", "TEXT"),
+    ("function", "TEXT"),
+    ("lineno", "INTEGER"),
+)
+
+
 def create_traceback_info_table(conn: sqlite3.Connection) -> None:
-    """Create the traceback_info table if it doesn't exist"""
+    """Create the traceback_info table if it doesn't exist, or add the location columns it lacks"""
     sql_create_traceback_info_table = """CREATE TABLE IF NOT EXISTS traceback_info (
                                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                                             exception_instance_id TEXT,
                                             frame_number INTEGER,
                                             f_locals TEXT,
                                             f_globals TEXT,
+                                            filename TEXT,
+                                            function TEXT,
+                                            lineno INTEGER,
                                             FOREIGN KEY (exception_instance_id) REFERENCES exception_instance (record_id)
                                         );"""
     cursor = conn.cursor()
     cursor.execute(sql_create_traceback_info_table)
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(traceback_info)")}
+    for column, column_type in FRAME_LOCATION_COLUMNS:
+        if column not in existing:
+            cursor.execute(
+                f"ALTER TABLE traceback_info ADD COLUMN {column} {column_type}"
+            )  # nosec
 
 
 def insert_traceback_info(
@@ -159,21 +237,113 @@ def insert_traceback_info(
 
     while tb:
         frame = tb.tb_frame
-        f_locals = json.dumps(frame.f_locals, default=str)
-        f_globals = json.dumps(frame.f_globals, default=str)
+        f_locals = variables_json(frame.f_locals)
+        f_globals = variables_json(frame.f_globals)
 
         sql_insert_traceback_info = """INSERT INTO traceback_info 
-                                       (exception_instance_id, frame_number, f_locals, f_globals) 
-                                       VALUES (?, ?, ?, ?)"""
+                                       (exception_instance_id, frame_number, f_locals, f_globals,
+                                        filename, function, lineno)
+                                       VALUES (?, ?, ?, ?, ?, ?, ?)"""
         cursor.execute(
             sql_insert_traceback_info,
-            (exception_instance_id, frame_number, f_locals, f_globals),
+            (
+                exception_instance_id,
+                frame_number,
+                f_locals,
+                f_globals,
+                frame.f_code.co_filename,
+                frame.f_code.co_name,
+                tb.tb_lineno,
+            ),
         )
 
         tb = tb.tb_next
         frame_number += 1
 
 
+def serialize_exception(ex: BaseException) -> dict[str, Any]:
+    """
+    Snapshot an exception into plain values so it can be written later, or by another process.
+
+    Parameters:
+    ex (BaseException): The exception instance.
+
+    Returns:
+    dict: name, module, docstring, hierarchy, args, str_repr and per frame
+        [f_locals JSON, f_globals JSON, filename, function, lineno].
+    """
+    ex_class = ex.__class__
+    frames = []
+    tb = ex.__traceback__
+    while tb:
+        frame = tb.tb_frame
+        frames.append(
+            [
+                variables_json(frame.f_locals),
+                variables_json(frame.f_globals),
+                frame.f_code.co_filename,
+                frame.f_code.co_name,
+                tb.tb_lineno,
+            ]
+        )
+        tb = tb.tb_next
+    return {
+        "name": ex_class.__name__,
+        "module": ex_class.__module__,
+        "docstring": ex_class.__doc__,
+        "hierarchy": json.dumps(get_exception_hierarchy(ex)),
+        "args": str(ex.args),
+        "str_repr": str(ex),
+        "frames": frames,
+    }
+
+
+def insert_serialized_exception(
+    conn: sqlite3.Connection, record_id: str, payload: dict[str, Any]
+) -> None:
+    """
+    Insert type, instance and traceback rows from a `serialize_exception` payload.
+
+    Does not commit, so a caller can write many records in one transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id FROM exception_type WHERE name = ? AND module = ?",
+        (payload["name"], payload["module"]),
+    )
+    data = cursor.fetchone()
+    if data is None:
+        cursor.execute(
+            "INSERT INTO exception_type (name, module, docstring, hierarchy) VALUES (?, ?, ?, ?)",
+            (
+                payload["name"],
+                payload["module"],
+                payload["docstring"],
+                payload["hierarchy"],
+            ),
+        )
+        type_id = cursor.lastrowid
+    else:
+        type_id = data[0]
+
+    cursor.execute(
+        """INSERT INTO exception_instance
+           (record_id, type_id, args, str_repr, comments)
+           VALUES (?, ?, ?, ?, ?)""",
+        (record_id, type_id, payload["args"], payload["str_repr"], ""),
+    )
+    cursor.executemany(
+        """INSERT INTO traceback_info
+           (exception_instance_id, frame_number, f_locals, f_globals, filename, function, lineno)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [
+            # Payloads from older senders have just [f_locals, f_globals].
+            (record_id, frame_number, *frame, *(None,) * (5 - len(frame)))
+            for frame_number, frame in enumerate(payload["frames"])
+        ],
+    )
+
+
 if __name__ == "__main__":
 
     def run():
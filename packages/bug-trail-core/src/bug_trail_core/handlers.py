@@ -4,29 +4,148 @@ This module contains custom logging handlers.
 
 from __future__ import annotations
 
-import json
+import collections
 import logging
+import os
 import re
 import sqlite3
-import sys
 import threading
-import traceback
-import uuid
-from importlib.resources import as_file, files
+import time
+from collections.abc import Callable, Collection, Iterator, Sequence
+from contextlib import contextmanager
 from typing import Any
 
-from bug_trail_core.exceptions import (create_exception_instance_table,
-                                       create_exception_type_table,
-                                       create_traceback_info_table,
-                                       insert_exception_instance,
-                                       insert_exception_type,
-                                       insert_traceback_info)
-from bug_trail_core.sqlite3_utils import (is_table_empty,
-                                          serialize_to_sqlite_supported)
-from bug_trail_core.system_info import (create_system_info_table,
-                                        record_system_info)
-from bug_trail_core.venv_info import (create_python_libraries_table,
-                                      record_venv_info)
+from bug_trail_core.checkpoint import WalCheckpointer
+from bug_trail_core.exceptions import (
+    create_exception_indexes,
+    create_exception_instance_table,
+    create_exception_type_table,
+    create_traceback_info_table,
+    insert_serialized_exception,
+)
+from bug_trail_core.locals_index import create_locals_index
+from bug_trail_core.profiles import StorageProfile, apply_pragmas, resolve_profile
+from bug_trail_core.promoted_keys import promote_keys
+from bug_trail_core.rollups import create_rollups
+from bug_trail_core.row_counts import create_table_stats
+from bug_trail_core.search_index import create_search_index
+from bug_trail_core.snapshot import INSERT_LOGS_SQL, LOG_COLUMN_SET, RecordSnapshot
+from bug_trail_core.sqlite3_utils import is_table_empty
+from bug_trail_core.stats import HandlerStats, create_handler_stats_table
+from bug_trail_core.system_info import create_system_info_table, record_system_info
+from bug_trail_core.venv_info import create_python_libraries_table, record_venv_info
+
+FALLBACK_LOGS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS logs (
+    record_id TEXT PRIMARY KEY,
+    args TEXT,
+    asctime TEXT,
+    created REAL,
+    exc_info TEXT,
+    exc_text TEXT,
+    filename TEXT,
+    funcName TEXT,
+    levelname TEXT,
+    levelno INTEGER,
+    lineno INTEGER,
+    message TEXT,
+    module TEXT,
+    msecs REAL,
+    msg TEXT,
+    name TEXT,
+    pathname TEXT,
+    process INTEGER,
+    processName TEXT,
+    relativeCreated REAL,
+    stack_info TEXT,
+    thread INTEGER,
+    threadName TEXT,
+    traceback TEXT,
+    taskName TEXT,
+    user_data TEXT
+)"""
+
+
+# Secondary indexes on logs, created with the schema (IF NOT EXISTS, so older
+# databases pick them up the next time a handler starts).
+LOGS_INDEXES = (
+    # Keyset pagination of the log list, newest first: WHERE (created, record_id) < (?, ?)
+    "CREATE INDEX IF NOT EXISTS ix_logs_created ON logs (created, record_id)",
+    # Log list filtered by module or logger name, still in (created, record_id) order
+    "CREATE INDEX IF NOT EXISTS ix_logs_module_created ON logs (module, created, record_id)",
+    "CREATE INDEX IF NOT EXISTS ix_logs_name_created ON logs (name, created, record_id)",
+    # Level filters: covering for counts, and an exact level is read in list order
+    "CREATE INDEX IF NOT EXISTS ix_logs_level_created ON logs (levelno, created, record_id)",
+)
+
+
+def create_logs_indexes(conn: sqlite3.Connection) -> None:
+    """Create the LOGS_INDEXES. Does not commit."""
+    for statement in LOGS_INDEXES:
+        conn.execute(statement)
+
+
+def logs_table_sql() -> str:
+    """Read the logs table DDL shipped with the package."""
+    path = os.path.join(os.path.dirname(__file__), "create_table.sql")
+    try:
+        with open(path, encoding="utf-8") as handle:
+            create_table_sql = handle.read()
+    except OSError:
+        # Not a plain directory install (e.g. zipapp); importlib.resources is slow to import.
+        from importlib.resources import as_file, files
+
+        source = files("bug_trail_core").joinpath("create_table.sql")
+        with as_file(source) as file:
+            create_table_sql = file.read_text(encoding="utf-8")
+    return create_table_sql or FALLBACK_LOGS_TABLE_SQL
+
+
+def parse_field_names(create_table_sql: str) -> list[str]:
+    """Extract the column names from a CREATE TABLE logs statement."""
+    field_names: list[str] = []
+    # Find all content within parentheses of CREATE TABLE
+    match = re.search(
+        r"CREATE TABLE IF NOT EXISTS logs\s*\((.*)\)",
+        create_table_sql,
+        re.DOTALL | re.IGNORECASE,
+    )
+    if match:
+        column_defs = match.group(1).split(",")
+        for col_def in column_defs:
+            col_def = col_def.strip()
+            if not col_def:
+                continue
+            # Extract first word as column name
+            parts = col_def.split()
+            if parts:
+                col_name = parts[0].strip()
+                if col_name.upper() not in (
+                    "PRIMARY",
+                    "FOREIGN",
+                    "CONSTRAINT",
+                    "CHECK",
+                    "UNIQUE",
+                ):
+                    field_names.append(col_name)
+    return field_names
+
+
+def project_record(
+    record: logging.LogRecord, known_attrs: Collection[str] = LOG_COLUMN_SET
+) -> RecordSnapshot:
+    """
+    Turn a log record into a logs row plus a serialized exception payload.
+
+    Must run on the thread that logged, since it reads `sys.exc_info()`.
+
+    Args:
+        record (logging.LogRecord): The log record to project
+        known_attrs (Collection[str]): Columns of the logs table; other attributes go to user_data
+
+    Returns:
+        RecordSnapshot: A compact copy, safe to queue
+    """
+    return RecordSnapshot.from_record(record, known_attrs)
 
 
 class BaseErrorLogHandler:
@@ -40,40 +159,74 @@ class BaseErrorLogHandler:
         pico: bool = False,
         minimum_level: int = logging.ERROR,
         single_threaded: bool = True,
+        stats_interval: float = 60.0,
+        profile: StorageProfile | str | None = None,
+        promoted_keys: Sequence[str] = (),
+        index_locals: bool = False,
     ) -> None:
         """
         Initialize the handler
         Args:
             db_path (str): Path to the SQLite database
+            stats_interval (float): Seconds between snapshots of `stats()` written to handler_stats
+            profile (StorageProfile | str): Pragmas to apply, see `bug_trail_core.profiles`
+            promoted_keys (Sequence[str]): `extra` keys to index, see `bug_trail_core.promoted_keys`
+            index_locals (bool): Index traceback locals by value, see `bug_trail_core.locals_index`
         """
+        self.profile = resolve_profile(profile)
         self.single_threaded = single_threaded
         self.db_path = db_path
         self.pico = pico
         self.minimum_level = minimum_level
+        self.promoted_keys = tuple(promoted_keys)
+        self.index_locals = index_locals
         self.create_table_sql: str = ""
-        self.formatted_sql = ""
+        self.formatted_sql = INSERT_LOGS_SQL
         self.field_names: list[str] = []
+        self._known_attrs: frozenset[str] = LOG_COLUMN_SET
         self._lock = threading.Lock()
         self.conn: sqlite3.Connection | None = None
+        self._conn_thread = 0
+        self.metrics = HandlerStats(type(self).__name__, stats_interval)
+        self.checkpointer = WalCheckpointer(
+            db_path, self.profile.checkpoint_interval, self.profile.wal_size_limit
+        )
 
         # Ensure tables exist
-        self.reopen()
-        assert self.conn is not None
-        self.create_table()
-        create_exception_type_table(self.conn)
-        create_exception_instance_table(self.conn)
-        create_traceback_info_table(self.conn)
-        create_system_info_table(self.conn)
-        if is_table_empty(self.conn, "system_info"):
-            record_system_info(self.conn)
-
-        create_python_libraries_table(self.conn)
-        if is_table_empty(self.conn, "python_libraries"):
-            record_venv_info(self.conn)
-
-        if not self.single_threaded:
-            self.conn.close()
-            self.conn = None
+        self.create_schema()
+        with self._connection() as conn:
+            if is_table_empty(conn, "system_info"):
+                record_system_info(conn)
+            if is_table_empty(conn, "python_libraries"):
+                record_venv_info(conn)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Hold the lock and a live connection; multithreaded mode closes it afterwards."""
+        waited = time.perf_counter_ns()
+        self._lock.acquire()
+        self.metrics.lock_wait.observe(time.perf_counter_ns() - waited)
+        try:
+            if not self.single_threaded or self.conn is None:
+                self.reopen()
+            assert self.conn is not None
+            if self.single_threaded and self._conn_thread != threading.get_ident():
+                # e.g. threading.excepthook runs on the dying thread; sqlite3 refuses
+                # to share the connection, so use a one-off one.
+                transient = self._open()
+                try:
+                    yield transient
+                finally:
+                    transient.close()
+                return
+            try:
+                yield self.conn
+            finally:
+                if not self.single_threaded:
+                    self.conn.close()
+                    self.conn = None
+        finally:
+            self._lock.release()
 
     def reopen(self) -> None:
         """Reopen the connection"""
@@ -82,91 +235,55 @@ class BaseErrorLogHandler:
                 self.conn.close()
             except sqlite3.ProgrammingError:
                 pass
-        self.conn = sqlite3.connect(
-            self.db_path, check_same_thread=self.single_threaded
-        )
-        self.conn.execute(
-            "PRAGMA journal_mode = WAL;"
-        )  # WAL is generally better for concurrency
-        self.conn.execute("PRAGMA synchronous = NORMAL;")
+        self.conn = self._open()
+        self._conn_thread = threading.get_ident()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=self.single_threaded)
+        apply_pragmas(conn, self.profile)
+        return conn
+
+    def create_schema(self) -> None:
+        """Create the logs table and the exception and environment tables."""
+        self.create_table()
+        with self._connection() as conn:
+            create_logs_indexes(conn)
+            promote_keys(conn, self.promoted_keys)
+            create_exception_type_table(conn)
+            create_exception_instance_table(conn)
+            create_traceback_info_table(conn)
+            create_exception_indexes(conn)
+            if self.index_locals:
+                create_locals_index(conn)
+            create_system_info_table(conn)
+            create_python_libraries_table(conn)
+            create_handler_stats_table(conn)
+            create_table_stats(conn)
+            create_search_index(conn)
+            create_rollups(conn)
+            conn.commit()
 
     def create_table(self) -> None:
         """
         Create the logs table if it doesn't exist
         """
-        # Locate the resource file
-        source = files("bug_trail_core").joinpath("create_table.sql")
-
-        with as_file(source) as file:
-            self.create_table_sql = file.read_text(encoding="utf-8")
-
-        if not self.create_table_sql:
-            # Fallback schema if file not found
-            self.create_table_sql = """CREATE TABLE IF NOT EXISTS logs (
-                record_id TEXT PRIMARY KEY,
-                args TEXT,
-                asctime TEXT,
-                created REAL,
-                exc_info TEXT,
-                exc_text TEXT,
-                filename TEXT,
-                funcName TEXT,
-                levelname TEXT,
-                levelno INTEGER,
-                lineno INTEGER,
-                message TEXT,
-                module TEXT,
-                msecs REAL,
-                msg TEXT,
-                name TEXT,
-                pathname TEXT,
-                process INTEGER,
-                processName TEXT,
-                relativeCreated REAL,
-                stack_info TEXT,
-                thread INTEGER,
-                threadName TEXT,
-                traceback TEXT,
-                taskName TEXT,
-                user_data TEXT
-            )"""
-
+        self.create_table_sql = logs_table_sql()
         # Extract known field names from the SQL to avoid 'extra' crash
-        self.field_names = []
-        # Find all content within parentheses of CREATE TABLE
-        match = re.search(
-            r"CREATE TABLE IF NOT EXISTS logs\s*\((.*)\)",
-            self.create_table_sql,
-            re.DOTALL | re.IGNORECASE,
-        )
-        if match:
-            column_defs = match.group(1).split(",")
-            for col_def in column_defs:
-                col_def = col_def.strip()
-                if not col_def:
-                    continue
-                # Extract first word as column name
-                parts = col_def.split()
-                if parts:
-                    col_name = parts[0].strip()
-                    if col_name.upper() not in (
-                        "PRIMARY",
-                        "FOREIGN",
-                        "CONSTRAINT",
-                        "CHECK",
-                        "UNIQUE",
-                    ):
-                        self.field_names.append(col_name)
-
-        self.safe_execute(self.create_table_sql, [])
-        self._migrate_schema()
-
-    def _migrate_schema(self) -> None:
+        self.field_names = parse_field_names(self.create_table_sql)
+        # record_id is the PK column in the schema, make sure it is always written.
+        if "record_id" not in self.field_names:
+            self.field_names.insert(0, "record_id")
+        self._known_attrs = frozenset(self.field_names) | LOG_COLUMN_SET
+
+        with self._connection() as conn:
+            conn.execute(self.create_table_sql)
+            conn.commit()
+            self._migrate_schema(conn)
+
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
         """Add any missing columns from field_names to an existing logs table."""
-        if self.conn is None:
-            return
         try:
-            cursor = self.conn.cursor()
+            cursor = conn.cursor()
             cursor.execute("PRAGMA table_info(logs)")
             existing = {row[1] for row in cursor.fetchall()}
             for field in self.field_names:
@@ -176,10 +293,22 @@ class BaseErrorLogHandler:
                     cursor.execute(f"ALTER TABLE logs ADD COLUMN {field} TEXT")  # nosec
                 except sqlite3.OperationalError:
                     pass
-            self.conn.commit()
+            conn.commit()
         except sqlite3.Error:
             pass
 
+    def prepare(self, record: logging.LogRecord) -> RecordSnapshot:
+        """
+        Project a log record into a row ready for `write_batch`.
+
+        Args:
+            record (logging.LogRecord): The log record to be projected
+        """
+        started = time.perf_counter_ns()
+        snapshot = project_record(record, self._known_attrs)
+        self.metrics.serialize.observe(time.perf_counter_ns() - started)
+        return snapshot
+
     def emit(self, record: logging.LogRecord) -> None:
         """
         Insert a log record into the database
@@ -188,128 +317,238 @@ class BaseErrorLogHandler:
             record (logging.LogRecord): The log record to be inserted
         """
         if record.levelno < self.minimum_level:
+            self.metrics.suppressed += 1
             return
+        started = time.perf_counter_ns()
+        self.metrics.emitted += 1
+        self.write_batch([self.prepare(record)])
+        self.metrics.emit.observe(time.perf_counter_ns() - started)
 
-        # clientside primary key
-        record_id = str(uuid.uuid4())
-        if not record.exc_info:
-            record.exc_info = sys.exc_info()
-            if not record.exc_info[0]:
-                record.exc_info = None
-
-        # Check if there is exception information
-        if record.exc_info:
-            exception_type, exception, traceback_object = record.exc_info
-            # Format the traceback
-            traceback_str = "".join(traceback.format_exception(*record.exc_info))
-            record.traceback = traceback_str
-
-            if exception:
-                with self._lock:
-                    if not self.single_threaded:
-                        self.reopen()
-                    assert self.conn is not None
-                    try:
-                        # not unique per log entry
-                        insert_exception_type(self.conn, exception)
-                        # unique per log entry
-                        insert_exception_instance(self.conn, record_id, exception)
-                        exception_instance_id = record_id
-                        # Insert traceback info
-                        if exception and exception.__traceback__:
-                            insert_traceback_info(
-                                self.conn,
-                                exception_instance_id,
-                                exception.__traceback__,
-                            )
-                        self.conn.commit()
-                    finally:
-                        if not self.single_threaded:
-                            self.conn.close()
-                            self.conn = None
-        else:
-            record.traceback = None
-
-        # Prepare arguments, capturing 'extra' fields into user_data
-        known_attrs = set(self.field_names)
-        user_data = {}
-        # Attributes to ignore (internal to LogRecord or already handled)
-        internal_attrs = {
-            "getMessage",
-            "exc_info",
-            "exc_text",
-            "stack_info",
-            "record_id",
-        }
-
-        for attr in dir(record):
-            if attr.startswith("__") or attr in internal_attrs:
-                continue
-            if attr not in known_attrs:
-                val = getattr(record, attr)
-                if not callable(val):
-                    user_data[attr] = val
-
-        record.user_data = json.dumps(user_data, default=str) if user_data else None
-
-        if not self.formatted_sql:
-            # record_id is already in field_names (it is the PK column in the
-            # schema), so don't prepend it again.
-            fields = (
-                self.field_names
-                if "record_id" in self.field_names
-                else ["record_id"] + self.field_names
-            )
-            placeholders = ", ".join(["?" for _ in fields])
-            self.formatted_sql = (
-                f"INSERT INTO logs ({', '.join(fields)}) VALUES ({placeholders})"
-            )
+    def stats(self) -> dict[str, Any]:
+        """
+        Counters and latency histograms (nanoseconds, log2 buckets) for this handler.
+        """
+        return self.metrics.as_dict()
 
-        if "record_id" in self.field_names:
-            args = [
-                record_id if field == "record_id" else getattr(record, field, None)
-                for field in self.field_names
-            ]
-        else:
-            args = [record_id] + [
-                getattr(record, field, None) for field in self.field_names
-            ]
-        args = [serialize_to_sqlite_supported(arg) for arg in args]
+    def write_batch(self, entries: Sequence[RecordSnapshot]) -> None:
+        """
+        Insert many prepared records in a single transaction.
+
+        Args:
+            entries (Sequence[RecordSnapshot]): Output of `prepare`, or rows received from elsewhere
+        """
+        if not entries:
+            return
+        try:
+            self._write_entries(entries)
+        except sqlite3.OperationalError as oe:
+            if "no such table" not in str(oe):
+                self.metrics.errors += 1
+                raise
+            # Someone dropped the tables underneath us (e.g. admin reset).
+            self.metrics.retries += 1
+            self.create_schema()
+            self._write_entries(entries)
+
+    def _write_entries(self, entries: Sequence[RecordSnapshot]) -> None:
+        with self._connection() as conn:
+            started = time.perf_counter_ns()
+            try:
+                for entry in entries:
+                    if entry.exception is not None:
+                        insert_serialized_exception(
+                            conn, entry.record_id, entry.exception
+                        )
+                conn.executemany(
+                    self.formatted_sql, [entry.as_row() for entry in entries]
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            self.metrics.db_write.observe(time.perf_counter_ns() - started)
+            self.metrics.written += len(entries)
+            self.metrics.batches += 1
+            if self.metrics.persist_due():
+                self._persist_stats(conn)
+
+    def maintain_wal(self, idle: bool = False) -> None:
+        """
+        Checkpoint the WAL if one is due. For long-lived writer threads.
+
+        Args:
+            idle (bool): True if nothing was written since the last call
+        """
+        with self._connection() as conn:
+            if self.checkpointer.tick(conn, idle) is not None:
+                self.metrics.checkpoints += 1
 
-        self.safe_execute(self.formatted_sql, args)
+    def _persist_stats(self, conn: sqlite3.Connection) -> None:
+        try:
+            self.metrics.persist(conn)
+        except sqlite3.Error:
+            # Metrics must never cost us a log record.
+            conn.rollback()
 
     def safe_execute(self, sql: str, args: list[Any], recurse_count: int = 0) -> None:
-        with self._lock:
-            if not self.single_threaded or self.conn is None:
-                self.reopen()
-            assert self.conn is not None
-            try:
-                self.conn.execute(sql, args)
-                self.conn.commit()
-            except sqlite3.OperationalError as oe:
-                if "no such table" in oe.args[0] and recurse_count == 0:
-                    self.create_table()
-                    self.safe_execute(sql, args, recurse_count + 1)
-                else:
-                    raise
-            finally:
-                if not self.single_threaded:
-                    self.conn.close()
-                    self.conn = None
+        try:
+            with self._connection() as conn:
+                conn.execute(sql, args)
+                conn.commit()
+        except sqlite3.OperationalError as oe:
+            if "no such table" in oe.args[0] and recurse_count == 0:
+                self.create_table()
+                self.safe_execute(sql, args, recurse_count + 1)
+            else:
+                raise
 
     def close(self) -> None:
         """
         Close the connection to the database
         """
+        if self.metrics.emitted or self.metrics.written:
+            try:
+                with self._connection() as conn:
+                    self._persist_stats(conn)
+            except sqlite3.Error:
+                pass
         # If we are not single threaded, even talking to the conn object
         # will throw an error.
         if self.conn and self.single_threaded:
             try:
                 self.conn.close()
             except sqlite3.ProgrammingError as programming_error:
-                if "Cannot operate on a closed database" in str(programming_error):
+                if "Cannot operate on a closed database" not in str(programming_error):
+                    raise
+            self.conn = None
+
+
+class BatchWriter:
+    """
+    Buffers prepared records and writes them from a background thread.
+
+    A batch is written when `batch_size` records are waiting or the oldest has
+    waited `flush_interval` seconds, whichever comes first. The thread owns the
+    handler, so the sqlite connection never changes thread.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], BaseErrorLogHandler],
+        batch_size: int,
+        flush_interval: float,
+        maintenance_interval: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            factory (Callable): Builds the BaseErrorLogHandler, run on the writer thread
+            batch_size (int): Most records written per transaction
+            flush_interval (float): Longest a record waits before being written
+            maintenance_interval (float): How often an idle writer checkpoints the WAL
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maintenance_interval = maintenance_interval
+        self._buffer: collections.deque[RecordSnapshot] = collections.deque()
+        self._wakeup = threading.Condition()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._flush_requested = False
+        self._closing = False
+        self._oldest = 0.0
+        self._ready = threading.Event()
+        self._startup_error: BaseException | None = None
+        self.base_handler: BaseErrorLogHandler | None = None
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(factory,),
+            name="bug-trail-batch-writer",
+            daemon=True,
+        )
+        self._thread.start()
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise self._startup_error
+
+    def add(self, entry: RecordSnapshot) -> None:
+        """Queue a prepared record. After `close` it is counted as dropped instead."""
+        with self._wakeup:
+            if self._closing:
+                if self.base_handler is not None:
+                    self.base_handler.metrics.dropped += 1
+                return
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(entry)
+            self._idle.clear()
+            if len(self._buffer) >= self.batch_size:
+                self._wakeup.notify()
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Write what is buffered now. False if that took longer than `timeout` seconds."""
+        with self._wakeup:
+            if self._closing:
+                return not self._buffer
+            self._flush_requested = True
+            self._wakeup.notify()
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write what is buffered, then close the handler on its own thread."""
+        with self._wakeup:
+            self._closing = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+
+    def _next_batch(self) -> list[RecordSnapshot] | None:
+        with self._wakeup:
+            while True:
+                if self._buffer and (
+                    self._closing
+                    or self._flush_requested
+                    or len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._oldest >= self.flush_interval
+                ):
+                    break
+                if not self._buffer:
+                    self._flush_requested = False
+                    self._idle.set()
+                    if self._closing:
+                        return None
+                    if not self._wakeup.wait(self.maintenance_interval):
+                        # quiet for a whole interval
+                        return []
+                else:
+                    self._wakeup.wait(
+                        self.flush_interval - (time.monotonic() - self._oldest)
+                    )
+            count = min(len(self._buffer), self.batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            if self._buffer:
+                self._oldest = time.monotonic()
+            return batch
+
+    def _run(self, factory: Callable[[], BaseErrorLogHandler]) -> None:
+        try:
+            self.base_handler = factory()
+        except BaseException as error:  # noqa: BLE001
+            self._startup_error = error
+            self._ready.set()
+            return
+        self._ready.set()
+        base = self.base_handler
+        try:
+            while (batch := self._next_batch()) is not None:
+                base.metrics.queue_depth = len(self._buffer)
+                try:
+                    if batch:
+                        base.write_batch(batch)
+                    base.maintain_wal(idle=not batch)
+                except Exception:  # noqa: BLE001
+                    # counted in metrics.errors; a logging handler must not die
                     pass
-                raise
+        finally:
+            base.close()
 
 
 class BugTrailHandler(logging.Handler):
@@ -322,30 +561,102 @@ class BugTrailHandler(logging.Handler):
         db_path: str,
         minimum_level: int = logging.ERROR,
         single_threaded: bool = True,
+        profile: StorageProfile | str | None = None,
+        promoted_keys: Sequence[str] = (),
+        index_locals: bool = False,
     ) -> None:
         """
         Initialize the handler
         Args:
             db_path (str): Path to the SQLite database
             single_threaded (bool): If True, the handler will close the connection after each emit.
+            profile (StorageProfile | str): "safe", "balanced" (default), "fast" or a
+                profile from `read_config(...).profile`
+            promoted_keys (Sequence[str]): `extra` keys given an indexed column, e.g.
+                `read_config(...).promoted_keys`
+            index_locals (bool): Make captured local variables searchable, e.g.
+                `read_config(...).index_locals`
         """
-        self.base_handler = BaseErrorLogHandler(
-            db_path, minimum_level=minimum_level, single_threaded=single_threaded
-        )
+        self.profile = resolve_profile(profile)
+        self._batcher: BatchWriter | None = None
+        if self.profile.batched:
+            self._batcher = BatchWriter(
+                lambda: BaseErrorLogHandler(
+                    db_path,
+                    minimum_level=minimum_level,
+                    profile=self.profile,
+                    promoted_keys=promoted_keys,
+                    index_locals=index_locals,
+                ),
+                self.profile.batch_size,
+                self.profile.flush_interval,
+                self.profile.checkpoint_interval,
+            )
+            assert self._batcher.base_handler is not None
+            self.base_handler = self._batcher.base_handler
+        else:
+            self.base_handler = BaseErrorLogHandler(
+                db_path,
+                minimum_level=minimum_level,
+                single_threaded=single_threaded,
+                profile=self.profile,
+                promoted_keys=promoted_keys,
+                index_locals=index_locals,
+            )
         super().__init__()
 
     def emit(self, record: logging.LogRecord) -> None:
         """
-        Insert a log record into the database
+        Insert a log record into the database, or queue it when the profile batches
 
         Args:
             record (logging.LogRecord): The log record to be inserted
         """
-        self.base_handler.emit(record)
+        if self._batcher is None:
+            self.base_handler.emit(record)
+            return
+        base = self.base_handler
+        if record.levelno < base.minimum_level:
+            base.metrics.suppressed += 1
+            return
+        started = time.perf_counter_ns()
+        base.metrics.emitted += 1
+        self._batcher.add(base.prepare(record))
+        base.metrics.emit.observe(time.perf_counter_ns() - started)
 
-    def close(self) -> None:
+    def stats(self) -> dict[str, Any]:
         """
-        Close the connection to the database
+        Counters and latency histograms for this handler, see `BaseErrorLogHandler.stats`.
+        """
+        return self.base_handler.stats()
+
+    def flush(self) -> None:
+        """Write any batched records now, waiting up to five seconds, see `drain`."""
+        self.drain()
+
+    def drain(self, timeout: float | None = 5.0) -> bool:
+        """
+        Write any batched records now. Without batching, `emit` already wrote them.
+
+        Args:
+            timeout (float): Longest to wait, in seconds. None waits for as long as it takes.
+
+        Returns:
+            bool: False if the batch was not written within `timeout` seconds
+        """
+        if self._batcher is None:
+            return True
+        return self._batcher.flush(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
         """
-        self.base_handler.close()
+        Write any batched records and close the connection to the database
+
+        Args:
+            timeout (float): Longest to wait for the batch writer, None waits for as long as it takes
+        """
+        if self._batcher is None:
+            self.base_handler.close()
+        else:
+            self._batcher.close(timeout)
         super().close()
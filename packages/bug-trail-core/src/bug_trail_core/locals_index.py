@@ -0,0 +1,112 @@
+"""
+Opt-in index of captured local variable values.
+
+traceback_info.f_locals holds each frame's locals as one JSON object. With the
+index enabled, `local_values` gets one row per local: (name, value, frame_id),
+where frame_id is the traceback_info row. Dicts and lists are flattened to
+paths like `order.id` or `items[0]`, and so are objects, which are captured as
+their own attributes one level deep (`fish.x`). Long text is truncated, and
+None values are left out. Names starting with a double underscore are skipped,
+so a module-level frame doesn't index `__builtins__`, `__loader__` and the like.
+"All errors where order_id was 12345" is then a search of the table's primary
+key instead of decoding every frame's blob.
+
+A trigger on traceback_info fills it while the handler writes, in the same
+transaction. Enabling it on an existing database indexes the frames already
+there. It is opt-in (`[tool.bug_trail] index_locals = true`) because a frame
+can have hundreds of locals, which makes writes slower and the file larger.
+Nothing deletes single frames. A row whose frame is gone matches nothing
+once joined back to traceback_info.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+LOCALS_TABLE = "local_values"
+
+# Text values longer than this are cut; a search compares the first characters.
+LOCALS_VALUE_LIMIT = 200
+# Most locals indexed per frame. A module-level frame's locals are its globals.
+LOCALS_PER_FRAME = 200
+
+# The primary key is the index: name, then a value or a range of values, then
+# frame_id, so equal values come out in write order and "newest first" needs no
+# sort. WITHOUT ROWID stores each value once rather than in a table and an index.
+_CREATE_TABLE = f"""CREATE TABLE IF NOT EXISTS {LOCALS_TABLE} (
+    name TEXT NOT NULL,
+    -- no affinity: numbers stay numbers, so value < 0 is a range of the key
+    value NOT NULL,
+    frame_id INTEGER NOT NULL,
+    PRIMARY KEY (name, value, frame_id)
+) WITHOUT ROWID"""
+
+# The locals of traceback_info row `row` (NEW in the trigger). fullkey is the
+# JSON path, `$.order.id`; SQLite quotes keys that aren't plain words
+# (`$."order_id"`), so the quotes are dropped. json.dumps writes NaN and
+# Infinity, which aren't JSON; json_tree would abort the insert, so frames that
+# don't parse are skipped.
+_NAME = """replace(substr(local.fullkey, 3), '"', '')"""
+_VALUE = f"CASE local.type WHEN 'text' THEN substr(local.atom, 1, {LOCALS_VALUE_LIMIT}) ELSE local.atom END"
+_INDEXED = f"local.type NOT IN ('object', 'array', 'null') AND {_NAME} NOT GLOB '__*'"
+_SOURCE_SELECT = f"""SELECT {_NAME}, {_VALUE}, {{row}}.id
+      FROM json_tree(CASE WHEN json_valid({{row}}.f_locals) THEN {{row}}.f_locals END) AS local
+     WHERE {_INDEXED}"""
+
+# OR IGNORE: `a.b` and a key "a.b" share a name, which must not fail the log write.
+_TRIGGER = f"""CREATE TRIGGER IF NOT EXISTS traceback_locals_insert AFTER INSERT ON traceback_info
+    BEGIN
+        INSERT OR IGNORE INTO {LOCALS_TABLE} (name, value, frame_id)
+        {_SOURCE_SELECT.format(row="NEW")}
+        LIMIT {LOCALS_PER_FRAME};
+    END"""
+
+
+def locals_index_exists(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LOCALS_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def create_locals_index(conn: sqlite3.Connection) -> bool:
+    """
+    Create local_values and its trigger, filling it from existing frames the
+    first time. Call after traceback_info exists. Does not commit.
+
+    Returns:
+        bool: True if the index was created now, False if it already existed
+    """
+    created = not locals_index_exists(conn)
+    conn.execute(_CREATE_TABLE)
+    existing = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'traceback_locals_insert'"
+    ).fetchone()
+    # sqlite_master keeps the statement without IF NOT EXISTS.
+    if existing is not None and existing[0] != _TRIGGER.replace(
+        " IF NOT EXISTS", "", 1
+    ):
+        # Created by an earlier version, which also indexed dunder names.
+        conn.execute("DROP TRIGGER traceback_locals_insert")
+        conn.execute(f"DELETE FROM {LOCALS_TABLE} WHERE name GLOB '__*'")  # nosec
+    conn.execute(_TRIGGER)
+    if created:
+        # Same transaction as the trigger, so frames written meanwhile are not indexed twice.
+        conn.execute(f"""INSERT OR IGNORE INTO {LOCALS_TABLE} (name, value, frame_id)
+                SELECT name, value, frame_id FROM (
+                    SELECT {_NAME} AS name,
+                           {_VALUE} AS value,
+                           frame.id AS frame_id,
+                           row_number() OVER (PARTITION BY frame.id) AS position
+                      FROM traceback_info AS frame,
+                           json_tree(CASE WHEN json_valid(frame.f_locals) THEN frame.f_locals END) AS local
+                     WHERE {_INDEXED}
+                )
+                WHERE position <= {LOCALS_PER_FRAME}""")  # nosec
+    return created
+
+
+def drop_locals_index(conn: sqlite3.Connection) -> None:
+    """Drop local_values and its trigger, turning the index off. Does not commit."""
+    conn.execute("DROP TRIGGER IF EXISTS traceback_locals_insert")
+    conn.execute(f"DROP TABLE IF EXISTS {LOCALS_TABLE}")  # nosec
@@ -0,0 +1,161 @@
+"""
+Named durability/throughput trade-offs for the SQLite handlers.
+
+A profile is a coherent set of pragmas plus how the handler batches writes.
+Pick one by name in `[tool.bug_trail]` and override single settings there:
+
+    [tool.bug_trail]
+    profile = "fast"
+    batch_size = 50
+
+- safe: every record is committed and fsynced before `emit` returns.
+- balanced (default): commit per record, fsync at WAL checkpoints. Survives an
+  application crash, may lose the last records on power loss.
+- fast: records are written in batches by a background thread. A crash loses
+  whatever is still buffered, up to `flush_interval` seconds of records.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import sqlite3
+from dataclasses import dataclass
+from typing import Any
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+TEMP_STORE_MODES = ("DEFAULT", "FILE", "MEMORY")
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """SQLite pragmas and batching behavior used by a handler."""
+
+    name: str
+    synchronous: str = "NORMAL"
+    wal_autocheckpoint: int = 1000
+    # Negative values are KiB, as in `PRAGMA cache_size`.
+    cache_size: int = -2000
+    mmap_size: int = 0
+    temp_store: str = "DEFAULT"
+    # Only applied when the handler creates the database file.
+    page_size: int = 4096
+    batch_size: int = 1
+    flush_interval: float = 0.0
+    # Background WAL checkpoints, see bug_trail_core.checkpoint
+    checkpoint_interval: float = 30.0
+    wal_size_limit: int = 64 * 1024 * 1024
+
+    def __post_init__(self) -> None:
+        if self.synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"synchronous must be one of {SYNCHRONOUS_MODES}, got {self.synchronous!r}"
+            )
+        if self.temp_store.upper() not in TEMP_STORE_MODES:
+            raise ValueError(
+                f"temp_store must be one of {TEMP_STORE_MODES}, got {self.temp_store!r}"
+            )
+        if self.checkpoint_interval <= 0:
+            raise ValueError("checkpoint_interval must be positive")
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if self.page_size < 512 or self.page_size & (self.page_size - 1):
+            raise ValueError("page_size must be a power of two, 512 or more")
+
+    @property
+    def batched(self) -> bool:
+        """True if records are buffered and written by a background thread."""
+        return self.batch_size > 1 or self.flush_interval > 0
+
+
+PROFILES: dict[str, StorageProfile] = {
+    "safe": StorageProfile(
+        name="safe",
+        synchronous="FULL",
+        wal_autocheckpoint=1000,
+        cache_size=-2000,
+        mmap_size=0,
+        temp_store="DEFAULT",
+        page_size=4096,
+        batch_size=1,
+        flush_interval=0.0,
+        checkpoint_interval=10.0,
+        wal_size_limit=16 * 1024 * 1024,
+    ),
+    "balanced": StorageProfile(
+        name="balanced",
+        synchronous="NORMAL",
+        wal_autocheckpoint=1000,
+        cache_size=-2000,
+        mmap_size=0,
+        temp_store="DEFAULT",
+        page_size=4096,
+        batch_size=1,
+        flush_interval=0.0,
+        checkpoint_interval=30.0,
+        wal_size_limit=64 * 1024 * 1024,
+    ),
+    "fast": StorageProfile(
+        name="fast",
+        synchronous="OFF",
+        wal_autocheckpoint=10000,
+        cache_size=-32768,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        page_size=8192,
+        batch_size=200,
+        flush_interval=0.5,
+        checkpoint_interval=60.0,
+        wal_size_limit=256 * 1024 * 1024,
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+PROFILE_SETTINGS = tuple(
+    field.name for field in dataclasses.fields(StorageProfile) if field.name != "name"
+)
+
+
+def resolve_profile(
+    profile: StorageProfile | str | None = None, **overrides: Any
+) -> StorageProfile:
+    """
+    Look up a profile by name and apply individual overrides.
+
+    Args:
+        profile (StorageProfile | str | None): A profile, a name from PROFILES, or None for the default
+        **overrides: Any of PROFILE_SETTINGS
+
+    Returns:
+        StorageProfile: The resulting profile
+    """
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, str):
+        try:
+            profile = PROFILES[profile.lower()]
+        except KeyError:
+            raise ValueError(
+                f"Unknown profile {profile!r}, expected one of {sorted(PROFILES)}"
+            ) from None
+    unknown = set(overrides) - set(PROFILE_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown profile settings: {sorted(unknown)}")
+    if not overrides:
+        return profile
+    return dataclasses.replace(profile, **overrides)
+
+
+def apply_pragmas(conn: sqlite3.Connection, profile: StorageProfile) -> None:
+    """
+    Configure a fresh connection. page_size only takes effect on an empty database,
+    and has to be set before it switches to WAL.
+    """
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        conn.execute(f"PRAGMA page_size = {int(profile.page_size)}")
+    conn.execute("PRAGMA journal_mode = WAL")  # WAL is generally better for concurrency
+    # Values are validated in StorageProfile; pragmas don't take bound parameters.
+    conn.execute(f"PRAGMA synchronous = {profile.synchronous.upper()}")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {int(profile.wal_autocheckpoint)}")
+    conn.execute(f"PRAGMA cache_size = {int(profile.cache_size)}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile.mmap_size)}")
+    conn.execute(f"PRAGMA temp_store = {profile.temp_store.upper()}")
@@ -0,0 +1,83 @@
+"""
+Extra fields promoted to indexed columns of logs.
+
+`extra=` attributes without a logs column of their own are stored together as
+JSON in logs.user_data. A promoted key also gets a virtual generated column,
+`extra_<key>`, computed from user_data, and a partial index on it. Finding
+the records for one request_id or tenant is then an index lookup instead of
+parsing every row's JSON. A virtual column takes no space in the table. Only
+the index stores the values, and only for rows that have the key.
+
+Keys are listed in `[tool.bug_trail] promoted_keys` and added when a handler
+opens the database. A key dropped from the list keeps its column and index.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from collections.abc import Iterable
+
+PROMOTED_PREFIX = "extra_"
+
+# Keys end up in column names and JSON paths, so only identifiers are promoted.
+_KEY_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+
+def promoted_column(key: str) -> str:
+    """
+    Name of the generated column for an extra key.
+
+    Raises:
+        ValueError: If `key` is not a Python identifier
+    """
+    if not _KEY_PATTERN.match(key):
+        raise ValueError(f"Can't promote {key!r}: only identifier keys can be promoted")
+    return PROMOTED_PREFIX + key
+
+
+def promoted_columns(conn: sqlite3.Connection) -> dict[str, str]:
+    """The keys this database has promoted, mapped to their columns."""
+    columns: dict[str, str] = {}
+    # table_xinfo lists generated columns too; hidden is 2 for a virtual one.
+    for _cid, name, _type, _notnull, _default, _pk, hidden in conn.execute(
+        "PRAGMA table_xinfo(logs)"
+    ):
+        if hidden == 2 and name.startswith(PROMOTED_PREFIX):
+            columns[name[len(PROMOTED_PREFIX) :]] = name
+    return columns
+
+
+def promote_keys(conn: sqlite3.Connection, keys: Iterable[str]) -> list[str]:
+    """
+    Add the column and index for each key not promoted yet. Does not commit.
+
+    The column has TEXT affinity, so numbers and booleans in user_data are
+    indexed as the text the viewer's filter compares them with. Building the
+    index reads every existing row once.
+
+    Args:
+        conn (sqlite3.Connection): Connection to a database with a logs table
+        keys (Iterable[str]): Top-level keys of the records' `extra=` data
+
+    Returns:
+        list[str]: The keys that were added
+    """
+    existing = promoted_columns(conn)
+    added: list[str] = []
+    for key in keys:
+        column = promoted_column(key)
+        if key not in existing:
+            # key is an identifier, checked by promoted_column
+            conn.execute(
+                f"ALTER TABLE logs ADD COLUMN {column} TEXT "  # nosec
+                f"GENERATED ALWAYS AS (json_extract(user_data, '$.{key}')) VIRTUAL"
+            )
+            existing[key] = column
+            added.append(key)
+        # (column, created, record_id): the filtered log list is read in index order.
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_logs_{column} "  # nosec
+            f"ON logs ({column}, created, record_id) WHERE {column} IS NOT NULL"
+        )
+    return added
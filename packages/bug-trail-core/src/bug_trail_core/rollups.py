@@ -0,0 +1,108 @@
+"""
+Log counts per time bucket, for the viewer's charts.
+
+`log_rollups` holds one row per (resolution, bucket, dimension, value): how
+many records were logged in that minute, hour or day with that level, from
+that logger or with that exception type. An AFTER INSERT trigger on logs adds
+1 to the record's buckets (an UPSERT per resolution and dimension), in the
+same transaction as the write, so a chart reads a few hundred rollup rows and
+never groups the logs table. The exception rows for a record are written
+before its logs row, so the trigger can read the exception type too.
+
+Buckets start at multiples of their width in Unix time, so days are UTC days.
+Nothing deletes single log records; clearing the logs clears the rollups.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+ROLLUP_TABLE = "log_rollups"
+
+# Bucket widths in seconds.
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+# What a count is split by: the record's levelname, logger name or exception type name.
+ROLLUP_DIMENSIONS = ("level", "logger", "exception")
+
+# bucket before value: a chart asks for one resolution and dimension over a time range.
+_CREATE_TABLE = f"""CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+    resolution INTEGER NOT NULL,
+    dimension TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (resolution, dimension, bucket, value)
+) WITHOUT ROWID"""
+
+_RESOLUTIONS_SELECT = " UNION ALL ".join(
+    f"SELECT {seconds} AS seconds" for seconds in ROLLUP_RESOLUTIONS.values()
+)
+_DIMENSIONS_SELECT = " UNION ALL ".join(
+    f"SELECT '{name}' AS name" for name in ROLLUP_DIMENSIONS
+)
+
+# The buckets of logs row `row` (NEW in the trigger, logs in the backfill).
+_SOURCE_SELECT = f"""SELECT resolution.seconds AS resolution,
+           dimension.name AS dimension,
+           CAST({{row}}.created / resolution.seconds AS INTEGER) * resolution.seconds AS bucket,
+           CASE dimension.name
+               WHEN 'level' THEN {{row}}.levelname
+               WHEN 'logger' THEN {{row}}.name
+               ELSE (SELECT exception_type.name
+                       FROM exception_instance
+                       JOIN exception_type ON exception_type.id = exception_instance.type_id
+                      WHERE exception_instance.record_id = {{row}}.record_id)
+           END AS value
+      FROM {{logs}}({_RESOLUTIONS_SELECT}) AS resolution, ({_DIMENSIONS_SELECT}) AS dimension"""
+
+_TRIGGER = f"""CREATE TRIGGER IF NOT EXISTS logs_rollup_insert AFTER INSERT ON logs
+    BEGIN
+        INSERT INTO {ROLLUP_TABLE} (resolution, dimension, bucket, value, count)
+        SELECT resolution, dimension, bucket, value, 1
+          FROM ({_SOURCE_SELECT.format(row="NEW", logs="")})
+         WHERE bucket IS NOT NULL AND value IS NOT NULL
+        ON CONFLICT (resolution, dimension, bucket, value) DO UPDATE SET count = count + 1;
+    END"""
+
+_BACKFILL = f"""INSERT INTO {ROLLUP_TABLE} (resolution, dimension, bucket, value, count)
+    SELECT resolution, dimension, bucket, value, count(*)
+      FROM ({_SOURCE_SELECT.format(row="logs", logs="logs, ")})
+     WHERE bucket IS NOT NULL AND value IS NOT NULL
+     GROUP BY resolution, dimension, bucket, value"""
+
+
+def rollups_exist(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def create_rollups(conn: sqlite3.Connection) -> bool:
+    """
+    Create log_rollups and its trigger, counting existing logs the first time.
+    Call after logs and the exception tables exist. Does not commit.
+
+    Returns:
+        bool: True if the rollups were created now, False if they already existed
+    """
+    created = not rollups_exist(conn)
+    conn.execute(_CREATE_TABLE)
+    conn.execute(_TRIGGER)
+    if created:
+        # Same transaction as the trigger, so rows written meanwhile are not counted twice.
+        conn.execute(_BACKFILL)
+    return created
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Recount log_rollups from the logs table, creating it if missing. Does not commit."""
+    if not create_rollups(conn):
+        conn.execute(f"DELETE FROM {ROLLUP_TABLE}")  # nosec
+        conn.execute(_BACKFILL)
+
+
+def drop_rollups(conn: sqlite3.Connection) -> None:
+    """Drop log_rollups and its trigger. Does not commit."""
+    conn.execute("DROP TRIGGER IF EXISTS logs_rollup_insert")
+    conn.execute(f"DROP TABLE IF EXISTS {ROLLUP_TABLE}")  # nosec
@@ -0,0 +1,97 @@
+"""
+Row counts kept in the `table_stats` table so readers don't need count(*).
+
+AFTER INSERT / AFTER DELETE triggers on every table in ALL_TABLES adjust the
+count in the same transaction as the write, so the numbers are exact as long
+as rows only change through SQL. `recount` rebuilds them from count(*).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+
+from bug_trail_core.sqlite3_utils import ALL_TABLES
+
+STATS_TABLE = "table_stats"
+
+
+def _trigger_sql(table: str) -> list[str]:
+    # Table names come from ALL_TABLES, not user input.
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE table_stats SET row_count = row_count + 1 WHERE table_name = '{table}';
+            END""",  # nosec
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE table_stats SET row_count = row_count - 1 WHERE table_name = '{table}';
+            END""",  # nosec
+    ]
+
+
+def create_table_stats(conn: sqlite3.Connection) -> None:
+    """
+    Create table_stats and its triggers, and seed counts for tables not yet
+    tracked (one count(*) each, the first time). Call after the other tables
+    exist. Does not commit.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS table_stats (
+               table_name TEXT PRIMARY KEY,
+               row_count INTEGER NOT NULL,
+               counted_at REAL
+           )""")
+    for table in ALL_TABLES:
+        try:
+            for statement in _trigger_sql(table):
+                conn.execute(statement)
+            # Triggers first: a row written meanwhile is either seen by count(*) or
+            # hits the trigger's UPDATE before the seed row exists, never both.
+            conn.execute(
+                f"INSERT OR IGNORE INTO table_stats (table_name, row_count, counted_at) "
+                f"SELECT ?, count(*), ? FROM {table}",  # nosec
+                (table, time.time()),
+            )
+        except sqlite3.OperationalError:
+            # Table not created yet
+            continue
+
+
+def read_counts(conn: sqlite3.Connection) -> dict[str, int]:
+    """Tracked row counts by table. Empty if table_stats doesn't exist."""
+    try:
+        rows = conn.execute("SELECT table_name, row_count FROM table_stats").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {table: count for table, count in rows if table in ALL_TABLES}
+
+
+def recount(conn: sqlite3.Connection) -> dict[str, int]:
+    """Replace the tracked counts with exact count(*) results, creating the triggers if missing. Commits."""
+    counts: dict[str, int] = {}
+    now = time.time()
+    if not conn.in_transaction:
+        # Hold the write lock across count and update so no insert slips between.
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        create_table_stats(conn)
+        for table in ALL_TABLES:
+            try:
+                counts[table] = conn.execute(
+                    f"SELECT count(*) FROM {table}"
+                ).fetchone()[
+                    0
+                ]  # nosec
+            except sqlite3.OperationalError:
+                continue
+            conn.execute(
+                "INSERT INTO table_stats (table_name, row_count, counted_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (table_name) DO UPDATE SET row_count = excluded.row_count, "
+                "counted_at = excluded.counted_at",
+                (table, counts[table], now),
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return counts
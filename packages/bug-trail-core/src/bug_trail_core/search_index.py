@@ -0,0 +1,103 @@
+"""
+Full-text index over log messages, tracebacks and exception text (SQLite FTS5).
+
+`log_search` holds one row per logs row, with the same rowid. Triggers on
+logs keep it in step within the writing transaction. The exception rows for
+a record are written before its logs row (see insert_serialized_exception),
+so the insert trigger can copy the exception type name and message too.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+SEARCH_TABLE = "log_search"
+
+SEARCH_COLUMNS = ("message", "traceback", "exception")
+# bm25 weight per column: a word in the message counts most, one deep in a traceback least.
+SEARCH_WEIGHTS = (4.0, 1.0, 2.0)
+
+# What goes into log_search for the logs row `row` (NEW in triggers, logs in the backfill).
+_SOURCE_SELECT = """SELECT {row}.rowid,
+           -- message is only set when a Formatter ran; msg is the template, args its repr
+           coalesce({row}.message, {row}.msg || ' ' || coalesce({row}.args, '')),
+           {row}.traceback,
+           (SELECT exception_type.name || ': ' || coalesce(exception_instance.str_repr, '')
+              FROM exception_instance
+              JOIN exception_type ON exception_type.id = exception_instance.type_id
+             WHERE exception_instance.record_id = {row}.record_id)"""
+
+_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS logs_search_insert AFTER INSERT ON logs
+        BEGIN
+            INSERT INTO log_search (rowid, message, traceback, exception)
+            {_SOURCE_SELECT.format(row="NEW")};
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS logs_search_delete AFTER DELETE ON logs
+        BEGIN
+            DELETE FROM log_search WHERE rowid = OLD.rowid;
+        END""",
+)
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """Whether this SQLite build has FTS5 compiled in."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def search_index_exists(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def create_search_index(conn: sqlite3.Connection) -> bool:
+    """
+    Create log_search and its triggers, filling it from existing logs the first
+    time. Call after logs and the exception tables exist. Does not commit.
+
+    Returns:
+        bool: False if this SQLite has no FTS5, in which case there is no search
+    """
+    if not fts5_available(conn):
+        return False
+    created = not search_index_exists(conn)
+    if created:
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({', '.join(SEARCH_COLUMNS)})"  # nosec
+        )
+        # Stored with the table, so ORDER BY rank uses the weights everywhere.
+        conn.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', ?)",  # nosec
+            (f"bm25({', '.join(str(weight) for weight in SEARCH_WEIGHTS)})",),
+        )
+    for statement in _TRIGGERS:
+        conn.execute(statement)
+    if created:
+        # Same transaction as the triggers, so rows written meanwhile are not indexed twice.
+        conn.execute(
+            f"INSERT INTO log_search (rowid, message, traceback, exception) {_SOURCE_SELECT.format(row='logs')} "
+            "FROM logs"
+        )
+    return True
+
+
+def drop_search_index(conn: sqlite3.Connection) -> None:
+    """Drop log_search and its triggers. Does not commit."""
+    conn.execute("DROP TRIGGER IF EXISTS logs_search_insert")
+    conn.execute("DROP TRIGGER IF EXISTS logs_search_delete")
+    conn.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")  # nosec
+
+
+def optimize_search_index(conn: sqlite3.Connection) -> None:
+    """Merge the index's b-trees into one, which speeds up queries after bulk writes. Commits."""
+    conn.execute(
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+    )  # nosec
+    conn.commit()
@@ -0,0 +1,265 @@
+"""
+Capture crashes and drain the handler on the way out.
+
+`install_hooks` routes uncaught exceptions (main thread, other threads, asyncio
+callbacks) through a handler, and flushes that handler at exit or on SIGTERM.
+Every flush is bounded by a deadline so an unreachable collector or a stuck
+writer can delay shutdown but never hang it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import inspect
+import logging
+import signal
+import sys
+import threading
+from collections.abc import Callable
+from types import FrameType, TracebackType
+from typing import Any
+
+UNCAUGHT_LOGGER = "bug_trail.uncaught"
+
+
+def _call_with_deadline(function: Callable[[], Any], deadline: float) -> bool:
+    done = threading.Event()
+    result = {"ok": True}
+
+    def run() -> None:
+        try:
+            if function() is False:
+                result["ok"] = False
+        except Exception:  # noqa: BLE001
+            result["ok"] = False
+        finally:
+            done.set()
+
+    # A daemon thread, so a call that never returns cannot keep the process alive.
+    threading.Thread(target=run, name="bug-trail-shutdown", daemon=True).start()
+    return done.wait(deadline) and result["ok"]
+
+
+def _with_timeout(method: Callable[..., Any], timeout: float) -> Callable[[], Any]:
+    # bug_trail handlers take a timeout, plain logging handlers don't.
+    if "timeout" in inspect.signature(method).parameters:
+        return lambda: method(timeout=timeout)
+    return method
+
+
+def _drain(handler: logging.Handler, timeout: float) -> Callable[[], Any]:
+    # bug_trail handlers have drain(timeout), plain logging handlers only flush().
+    drain = getattr(handler, "drain", None)
+    if callable(drain):
+        return _with_timeout(drain, timeout)
+    return handler.flush
+
+
+def flush_with_deadline(handler: logging.Handler, deadline: float) -> bool:
+    """
+    Flush a handler, giving up after `deadline` seconds.
+
+    Args:
+        handler (logging.Handler): Any handler; bug_trail handlers are drained with the timeout passed through
+        deadline (float): Longest to wait, in seconds
+
+    Returns:
+        bool: False if the flush did not finish in time
+    """
+    return _call_with_deadline(_drain(handler, deadline), deadline)
+
+
+class ShutdownHooks:
+    """
+    The hooks registered by `install_hooks`. Call `uninstall` to put the previous ones back.
+    """
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        deadline: float = 2.0,
+        logger_name: str = UNCAUGHT_LOGGER,
+    ) -> None:
+        """
+        Args:
+            handler (logging.Handler): Receives uncaught exceptions, flushed at shutdown
+            deadline (float): Seconds each shutdown flush may take
+            logger_name (str): Logger name recorded on uncaught exception records
+        """
+        self.handler = handler
+        self.deadline = deadline
+        self.logger_name = logger_name
+        self._previous_excepthook = sys.excepthook
+        self._previous_threading_hook = threading.excepthook
+        self._previous_sigterm: Any = None
+        self._sigterm_installed = False
+        self._loops: list[tuple[Any, Any]] = []
+        self._installed = False
+
+    def install(self, sigterm: bool = True) -> ShutdownHooks:
+        """Register the hooks. SIGTERM is only hooked from the main thread."""
+        self._previous_excepthook = sys.excepthook
+        self._previous_threading_hook = threading.excepthook
+        sys.excepthook = self._excepthook
+        threading.excepthook = self._threading_excepthook
+        atexit.register(self._atexit)
+        if sigterm and threading.current_thread() is threading.main_thread():
+            self._previous_sigterm = signal.signal(signal.SIGTERM, self._on_sigterm)
+            self._sigterm_installed = True
+        self._installed = True
+        return self
+
+    def install_asyncio(self, loop: Any) -> None:
+        """
+        Route exceptions nobody retrieved (failed tasks, callbacks) on `loop` through the handler.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The loop to hook, e.g. `asyncio.get_running_loop()`
+        """
+        previous = loop.get_exception_handler()
+        self._loops.append((loop, previous))
+
+        def exception_handler(event_loop: Any, context: dict[str, Any]) -> None:
+            exception = context.get("exception")
+            exc_info = (
+                (type(exception), exception, exception.__traceback__)
+                if exception
+                else None
+            )
+            # The loop keeps running, so don't stall it on a flush; atexit drains the handler.
+            self.capture(
+                context.get("message") or "Unhandled exception in event loop",
+                exc_info,
+                flush=False,
+            )
+            if previous is not None:
+                previous(event_loop, context)
+            else:
+                event_loop.default_exception_handler(context)
+
+        loop.set_exception_handler(exception_handler)
+
+    def uninstall(self) -> None:
+        """Restore whatever hooks were there before."""
+        if not self._installed:
+            return
+        self._installed = False
+        if sys.excepthook == self._excepthook:
+            sys.excepthook = self._previous_excepthook
+        if threading.excepthook == self._threading_excepthook:
+            threading.excepthook = self._previous_threading_hook
+        atexit.unregister(self._atexit)
+        if self._sigterm_installed:
+            signal.signal(signal.SIGTERM, self._previous_sigterm)
+            self._sigterm_installed = False
+        for loop, previous in self._loops:
+            if not loop.is_closed():
+                loop.set_exception_handler(previous)
+        self._loops = []
+
+    def capture(
+        self,
+        message: str,
+        exc_info: (
+            tuple[type[BaseException], BaseException, TracebackType | None] | None
+        ),
+        thread: threading.Thread | None = None,
+        flush: bool = True,
+    ) -> None:
+        """Send one CRITICAL record for an uncaught exception straight to the handler."""
+        pathname, lineno, func = "(unknown file)", 0, None
+        traceback = exc_info[2] if exc_info else None
+        while traceback is not None and traceback.tb_next is not None:
+            traceback = traceback.tb_next
+        if traceback is not None:
+            code = traceback.tb_frame.f_code
+            pathname, lineno, func = code.co_filename, traceback.tb_lineno, code.co_name
+        record = logging.getLogger(self.logger_name).makeRecord(
+            self.logger_name,
+            logging.CRITICAL,
+            pathname,
+            lineno,
+            message,
+            (),
+            exc_info,
+            func,
+        )
+        if thread is not None:
+            record.thread = thread.ident
+            record.threadName = thread.name
+        try:
+            self.handler.handle(record)
+        except Exception:  # noqa: BLE001
+            # The crash is being reported elsewhere too, don't mask it.
+            pass
+        if flush:
+            flush_with_deadline(self.handler, self.deadline)
+
+    def _excepthook(
+        self,
+        exc_type: type[BaseException],
+        exc_value: BaseException,
+        exc_traceback: TracebackType | None,
+    ) -> None:
+        if not issubclass(exc_type, KeyboardInterrupt):
+            self.capture("Uncaught exception", (exc_type, exc_value, exc_traceback))
+        self._previous_excepthook(exc_type, exc_value, exc_traceback)
+
+    def _threading_excepthook(self, args: threading.ExceptHookArgs) -> None:
+        if args.exc_value is not None and not issubclass(args.exc_type, SystemExit):
+            self.capture(
+                "Uncaught exception in thread",
+                (args.exc_type, args.exc_value, args.exc_traceback),
+                args.thread,
+            )
+        self._previous_threading_hook(args)
+
+    def _atexit(self) -> None:
+        flushed = flush_with_deadline(self.handler, self.deadline)
+        # Close here so logging.shutdown, which runs after us and has no deadline,
+        # finds nothing left to wait for. Don't wait again if the flush timed out.
+        # On this thread: a sqlite connection can only be closed by the thread that
+        # opened it, and the handlers' close bounds itself with the timeout.
+        close = _with_timeout(self.handler.close, self.deadline if flushed else 0.0)
+        try:
+            close()
+        except Exception:  # noqa: BLE001
+            pass
+
+    def _on_sigterm(self, signum: int, frame: FrameType | None) -> None:
+        flush_with_deadline(self.handler, self.deadline)
+        previous = self._previous_sigterm
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            # Default action is to die; exit normally instead so atexit and logging.shutdown run.
+            sys.exit(128 + signum)
+
+
+def install_hooks(
+    handler: logging.Handler,
+    deadline: float = 2.0,
+    sigterm: bool = True,
+    loop: Any = None,
+) -> ShutdownHooks:
+    """
+    Log uncaught exceptions to `handler` and flush it at exit and on SIGTERM.
+
+    Args:
+        handler (logging.Handler): A bug_trail handler (or any other)
+        deadline (float): Seconds each shutdown flush may take
+        sigterm (bool): Also flush on SIGTERM. Only possible from the main thread.
+        loop (asyncio.AbstractEventLoop): Event loop to hook, defaults to the running one if any
+
+    Returns:
+        ShutdownHooks: Call `uninstall()` to undo
+    """
+    hooks = ShutdownHooks(handler, deadline=deadline).install(sigterm=sigterm)
+    if loop is None and "asyncio" in sys.modules:
+        try:
+            loop = sys.modules["asyncio"].get_running_loop()
+        except RuntimeError:
+            loop = None
+    if loop is not None:
+        hooks.install_asyncio(loop)
+    return hooks
@@ -0,0 +1,167 @@
+"""
+Compact copy of the parts of a LogRecord that end up in the database.
+
+Anything that holds records for a later write (batches, queues, the collector)
+keeps these instead of LogRecords, so the caller's frames, `args` and `exc_info`
+can be freed as soon as logging returns.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import operator
+import sys
+import traceback
+import uuid
+from collections.abc import Collection
+from typing import Any
+
+from bug_trail_core.exceptions import serialize_exception
+from bug_trail_core.sqlite3_utils import SqliteTypes, serialize_to_sqlite_supported
+
+# Columns of the logs table, in create_table.sql order.
+LOG_COLUMNS: tuple[str, ...] = (
+    "record_id",
+    "args",
+    "asctime",
+    "created",
+    "exc_info",
+    "exc_text",
+    "filename",
+    "funcName",
+    "levelname",
+    "levelno",
+    "lineno",
+    "message",
+    "module",
+    "msecs",
+    "msg",
+    "name",
+    "pathname",
+    "process",
+    "processName",
+    "relativeCreated",
+    "stack_info",
+    "thread",
+    "threadName",
+    "traceback",
+    "taskName",
+    "user_data",
+)
+
+# Attributes to ignore when collecting 'extra' (internal to LogRecord or already handled)
+INTERNAL_ATTRS = frozenset(
+    {
+        "getMessage",
+        "exc_info",
+        "exc_text",
+        "stack_info",
+        "record_id",
+    }
+)
+
+# Read straight off the LogRecord; the rest are computed in from_record.
+_COPIED_COLUMNS = tuple(
+    column
+    for column in LOG_COLUMNS
+    if column not in ("record_id", "exc_info", "traceback", "user_data")
+)
+LOG_COLUMN_SET = frozenset(LOG_COLUMNS)
+
+INSERT_LOGS_SQL = (
+    f"INSERT INTO logs ({', '.join(LOG_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in LOG_COLUMNS)})"
+)
+
+
+class RecordSnapshot:
+    """
+    The logs row for one record plus its pre-serialized exception payload.
+    """
+
+    __slots__ = LOG_COLUMNS + ("exception",)
+
+    record_id: str
+    exc_info: str | None
+    traceback: str | None
+    user_data: str | None
+    exception: dict[str, Any] | None
+
+    @classmethod
+    def from_record(
+        cls, record: logging.LogRecord, known_attrs: Collection[str] = LOG_COLUMN_SET
+    ) -> RecordSnapshot:
+        """
+        Copy a record. Must run on the thread that logged, since it reads `sys.exc_info()`.
+
+        Args:
+            record (logging.LogRecord): The log record to copy
+            known_attrs (Collection[str]): Attributes that are columns rather than 'extra'
+
+        Returns:
+            RecordSnapshot: A copy holding no references to the record or its frames
+        """
+        snapshot = cls.__new__(cls)
+        for column in _COPIED_COLUMNS:
+            setattr(
+                snapshot,
+                column,
+                serialize_to_sqlite_supported(getattr(record, column, None)),
+            )
+        # clientside primary key
+        snapshot.record_id = str(uuid.uuid4())
+
+        exc_info = record.exc_info
+        if not exc_info:
+            exc_info = sys.exc_info()
+            if not exc_info[0]:
+                exc_info = None
+        if exc_info:
+            snapshot.exc_info = str(exc_info)
+            snapshot.traceback = "".join(traceback.format_exception(*exc_info))
+            snapshot.exception = (
+                serialize_exception(exc_info[1]) if exc_info[1] else None
+            )
+        else:
+            snapshot.exc_info = None
+            snapshot.traceback = None
+            snapshot.exception = None
+
+        # Capture 'extra' fields into user_data
+        user_data = {
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in known_attrs
+            and key not in INTERNAL_ATTRS
+            and not key.startswith("__")
+            and not callable(value)
+        }
+        snapshot.user_data = json.dumps(user_data, default=str) if user_data else None
+        return snapshot
+
+    @classmethod
+    def from_row(
+        cls, row: dict[str, SqliteTypes], exception: dict[str, Any] | None = None
+    ) -> RecordSnapshot:
+        """Rebuild a snapshot from a column mapping, e.g. one received by the collector."""
+        snapshot = cls.__new__(cls)
+        for column in LOG_COLUMNS:
+            setattr(snapshot, column, row.get(column))
+        snapshot.record_id = str(row["record_id"])
+        snapshot.exception = exception
+        return snapshot
+
+    def as_row(self) -> tuple[SqliteTypes, ...]:
+        """Values in LOG_COLUMNS order, ready for `executemany(INSERT_LOGS_SQL, ...)`."""
+        return _row_getter(self)
+
+    def as_dict(self) -> dict[str, SqliteTypes]:
+        """Column name to value mapping."""
+        return dict(zip(LOG_COLUMNS, _row_getter(self), strict=True))
+
+    def __repr__(self) -> str:
+        return f"RecordSnapshot(record_id={self.record_id!r}, levelname={getattr(self, 'levelname', None)!r})"
+
+
+_row_getter = operator.attrgetter(*LOG_COLUMNS)
@@ -17,6 +17,7 @@ logger.propagate = False
 ALL_TABLES = [
     "exception_instance",
     "exception_type",
+    "handler_stats",
     "logs",
     "python_libraries",
     "system_info",
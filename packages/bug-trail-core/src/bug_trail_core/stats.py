@@ -0,0 +1,181 @@
+"""
+Cheap self-metrics for the handlers.
+
+Counters are plain ints and latencies go into fixed log2-scale histograms, so
+recording an event is an index lookup and an increment. Snapshots are written
+to the `handler_stats` table now and then so the viewer can show them; each
+process and handler keeps one row there, replaced on every write.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from bisect import bisect_left
+from typing import Any
+
+# Upper bounds of the histogram buckets in nanoseconds: 1us, 2us, 4us ... ~1s.
+# One extra bucket at the end catches everything slower.
+BUCKET_BOUNDS_NS: tuple[int, ...] = tuple(1_000 * 2**i for i in range(21))
+
+COUNTERS = (
+    "emitted",
+    "written",
+    "batches",
+    "retries",
+    "dropped",
+    "suppressed",
+    "errors",
+    "checkpoints",
+)
+HISTOGRAMS = ("emit", "serialize", "db_write", "lock_wait")
+# Snapshots from processes that haven't reported for this long are deleted.
+STATS_RETENTION_S = 7 * 24 * 3600
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, duration_ns: int) -> None:
+        """Record one duration."""
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ns": self.total_ns,
+            "max_ns": self.max_ns,
+            "buckets": list(self.counts),
+        }
+
+
+def histogram_percentile(buckets: list[int], pct: float) -> int | None:
+    """
+    Estimate a percentile from bucket counts, as the upper bound of the bucket it falls in.
+
+    >>> histogram_percentile([0, 3, 1] + [0] * 19, 50)
+    2000
+    """
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = total * pct / 100
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= rank and count:
+            if index < len(BUCKET_BOUNDS_NS):
+                return BUCKET_BOUNDS_NS[index]
+            return BUCKET_BOUNDS_NS[-1] * 2
+    return BUCKET_BOUNDS_NS[-1] * 2
+
+
+class HandlerStats:
+    """
+    Counters, a queue depth gauge and latency histograms for one handler.
+    """
+
+    def __init__(self, name: str, persist_interval: float = 60.0) -> None:
+        """
+        Args:
+            name (str): Handler label stored with each persisted snapshot
+            persist_interval (float): Seconds between rows written to handler_stats
+        """
+        self.name = name
+        self.persist_interval = persist_interval
+        self.started = time.time()
+        self._last_persist = time.monotonic()
+        self.emitted = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.suppressed = 0
+        self.errors = 0
+        self.checkpoints = 0
+        self.queue_depth = 0
+        self.emit = LatencyHistogram()
+        self.serialize = LatencyHistogram()
+        self.db_write = LatencyHistogram()
+        self.lock_wait = LatencyHistogram()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Plain-data view of everything recorded so far."""
+        result: dict[str, Any] = {
+            counter: getattr(self, counter) for counter in COUNTERS
+        }
+        result["queue_depth"] = self.queue_depth
+        result["uptime_s"] = round(time.time() - self.started, 3)
+        result["histograms"] = {
+            name: getattr(self, name).as_dict() for name in HISTOGRAMS
+        }
+        return result
+
+    def persist_due(self) -> bool:
+        """True when the last persisted snapshot is older than persist_interval."""
+        return time.monotonic() - self._last_persist >= self.persist_interval
+
+    def persist(self, conn: sqlite3.Connection) -> None:
+        """Replace this handler's snapshot row in handler_stats. Commits."""
+        self._last_persist = time.monotonic()
+        now = time.time()
+        pid = os.getpid()
+        # Only the latest row per (pid, handler) is shown, so that is all that's kept,
+        # and processes that stopped reporting are forgotten after a while.
+        conn.execute(
+            "DELETE FROM handler_stats WHERE (pid = ? AND handler = ?) OR recorded_at < ?",
+            (pid, self.name, now - STATS_RETENTION_S),
+        )
+        conn.execute(
+            """INSERT INTO handler_stats (pid, process_name, handler, recorded_at, stats)
+               VALUES (?, ?, ?, ?, ?)""",
+            (
+                pid,
+                _process_name(),
+                self.name,
+                now,
+                json.dumps(self.as_dict()),
+            ),
+        )
+        conn.commit()
+
+
+def _process_name() -> str:
+    # Same trick as logging: only ask multiprocessing if the app already imported it.
+    multiprocessing = sys.modules.get("multiprocessing")
+    if multiprocessing is not None:
+        try:
+            return str(multiprocessing.current_process().name)
+        except Exception:  # noqa: BLE001
+            pass
+    return os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python"
+
+
+def create_handler_stats_table(conn: sqlite3.Connection) -> None:
+    """Create the handler_stats table if it doesn't exist"""
+    conn.execute("""CREATE TABLE IF NOT EXISTS handler_stats (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               pid INTEGER,
+               process_name TEXT,
+               handler TEXT,
+               recorded_at REAL,
+               stats TEXT
+           );""")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_handler_stats_pid ON handler_stats (pid, recorded_at)"
+    )
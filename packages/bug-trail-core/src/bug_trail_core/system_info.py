@@ -10,8 +10,6 @@ import platform
 from collections.abc import Sequence
 from typing import Any
 
-import psutil
-
 
 def convert_bytes_to_gb(bytes_value: int) -> str:
     """
@@ -52,6 +50,9 @@ def get_system_info() -> dict[str, Any]:
     """
     Collects and returns system information including memory, CPU, disk space, and operating system details.
     """
+    # psutil is slow to import and only needed the first time a database is created.
+    import psutil
+
     # Memory information
     mem = psutil.virtual_memory()
     total_memory = convert_bytes_to_gb(mem.total)
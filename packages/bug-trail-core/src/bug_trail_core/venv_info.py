@@ -1,4 +1,3 @@
-import importlib.metadata
 import json
 import sqlite3
 import uuid
@@ -50,6 +49,9 @@ def insert_python_library(
 
 # Modified type hint for the metadata object
 def get_installed_packages() -> Generator[tuple[str, str, Mapping[str, Any]], None, None]:  # type: ignore
+    # Deferred: importlib.metadata is only needed when the table is first filled.
+    import importlib.metadata
+
     for package in importlib.metadata.distributions():
         # package.metadata in 3.9 is an email.message.Message object,
         # which behaves like a dictionary. We'll use Mapping[str, Any]
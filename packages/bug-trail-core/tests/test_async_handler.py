@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+
+from bug_trail_core.async_handler import AsyncBugTrailHandler
+
+
+def _make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.setLevel(logging.ERROR)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def test_exception_from_task_is_written_with_task_name(tmp_path):
+    db_path = str(tmp_path / "async.db")
+
+    async def failing() -> None:
+        try:
+            raise KeyError("missing")
+        except KeyError:
+            logger.exception("inside a task")
+
+    async def main() -> None:
+        await asyncio.create_task(failing(), name="worker-7")
+        await handler.aflush()
+        await handler.aclose()
+
+    handler = AsyncBugTrailHandler(db_path)
+    logger = _make_logger("async_handler_test", handler)
+    asyncio.run(main())
+    logger.handlers.clear()
+
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT taskName, traceback FROM logs").fetchone()
+    instances = conn.execute("SELECT count(*) FROM exception_instance").fetchone()[0]
+    conn.close()
+    assert row[0] == "worker-7"
+    assert "KeyError" in row[1]
+    assert instances == 1
+
+
+def test_emit_without_loop_writes_synchronously(tmp_path):
+    db_path = str(tmp_path / "sync.db")
+    handler = AsyncBugTrailHandler(db_path)
+    logger = _make_logger("async_handler_sync_test", handler)
+    logger.error("no loop here")
+
+    conn = sqlite3.connect(db_path)
+    count = conn.execute("SELECT count(*) FROM logs").fetchone()[0]
+    conn.close()
+    handler.close()
+    handler.close()
+    logger.handlers.clear()
+    assert count == 1
+
+
+def test_locals_are_captured_when_logged_not_when_written(tmp_path):
+    db_path = str(tmp_path / "locals.db")
+    handler = AsyncBugTrailHandler(db_path)
+    logger = _make_logger("async_handler_locals_test", handler)
+    writer_busy = threading.Event()
+
+    async def main() -> None:
+        # Hold the writer so the record waits in the queue while the coroutine moves on.
+        handler._executor.submit(
+            writer_busy.wait, 5
+        )  # pylint: disable=protected-access
+        attempt = 1
+        try:
+            raise ValueError("first attempt")
+        except ValueError:
+            logger.exception("failed")
+        attempt = 2
+        writer_busy.set()
+        await handler.aflush()
+        assert attempt == 2
+        await handler.aclose()
+
+    asyncio.run(main())
+    logger.handlers.clear()
+    conn = sqlite3.connect(db_path)
+    (f_locals,) = conn.execute("SELECT f_locals FROM traceback_info").fetchone()
+    conn.close()
+    assert json.loads(f_locals)["attempt"] == 1
+
+
+def test_emit_racing_close_is_counted_not_raised(tmp_path):
+    handler = AsyncBugTrailHandler(str(tmp_path / "race.db"))
+    logger = _make_logger("async_handler_race_test", handler)
+    # What close() does on another thread between emit's _closed check and its submit
+    handler._executor.shutdown(wait=True)  # pylint: disable=protected-access
+    logger.error("too late")
+    assert handler.stats()["dropped"] == 1
+    handler._closed = True  # pylint: disable=protected-access
+    handler.close(timeout=1.0)
+    logger.handlers.clear()
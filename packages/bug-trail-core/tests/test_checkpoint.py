@@ -0,0 +1,81 @@
+import logging
+import sqlite3
+
+from bug_trail_core.checkpoint import WalCheckpointer, wal_size
+from bug_trail_core.handlers import BugTrailHandler
+from bug_trail_core.profiles import resolve_profile
+
+
+def _grow_wal(db_path: str, rows: int = 200) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    conn.execute("CREATE TABLE IF NOT EXISTS filler (body TEXT)")
+    conn.executemany("INSERT INTO filler VALUES (?)", [("x" * 500,)] * rows)
+    conn.commit()
+    return conn
+
+
+def test_passive_on_schedule_truncate_when_idle(tmp_path):
+    db_path = str(tmp_path / "wal.db")
+    conn = _grow_wal(db_path)
+    try:
+        checkpointer = WalCheckpointer(db_path, interval=3600)
+        assert checkpointer.tick(conn) is None
+
+        checkpointer.interval = 0
+        result = checkpointer.tick(conn)
+        assert result is not None and result.mode == "PASSIVE"
+        assert not result.busy
+        assert wal_size(db_path) > 0
+
+        result = checkpointer.tick(conn, idle=True)
+        assert result is not None and result.mode == "TRUNCATE"
+        assert wal_size(db_path) == 0
+        # nothing left to do
+        assert checkpointer.tick(conn, idle=True) is None
+        assert checkpointer.as_dict()["counts"] == {
+            "PASSIVE": 1,
+            "FULL": 0,
+            "RESTART": 0,
+            "TRUNCATE": 1,
+        }
+    finally:
+        conn.close()
+
+
+def test_size_limit_forces_truncate(tmp_path):
+    db_path = str(tmp_path / "big.db")
+    conn = _grow_wal(db_path)
+    try:
+        checkpointer = WalCheckpointer(db_path, interval=3600, size_limit=1024)
+        result = checkpointer.tick(conn)
+        assert result is not None and result.mode == "TRUNCATE"
+        assert wal_size(db_path) == 0
+    finally:
+        conn.close()
+
+
+def test_batch_writer_checkpoints_when_idle(tmp_path):
+    db_path = str(tmp_path / "idle.db")
+    # Nothing on a timer: the test drives the idle tick itself.
+    profile = resolve_profile("fast", flush_interval=3600, checkpoint_interval=3600)
+    handler = BugTrailHandler(db_path, profile=profile)
+    logger = logging.getLogger("checkpoint_idle")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(50):
+            logger.error("fill the wal %s", i)
+        assert handler.drain(5.0)
+        assert wal_size(db_path) > 0
+        base = handler._batcher.base_handler  # pylint: disable=protected-access
+        assert base is not None
+        # What the writer thread does after a quiet maintenance_interval
+        base.maintain_wal(idle=True)
+        assert wal_size(db_path) == 0
+        assert handler.stats()["checkpoints"] == 1
+    finally:
+        logger.handlers.clear()
+        handler.close()
@@ -0,0 +1,130 @@
+import logging
+import sqlite3
+import tempfile
+import time
+
+import pytest
+
+from bug_trail_core import collector as collector_module
+from bug_trail_core.__main__ import main
+from bug_trail_core.collector import Collector, SocketBugTrailHandler
+
+
+@pytest.fixture()
+def socket_path():
+    # AF_UNIX paths are limited to ~100 chars, pytest's tmp_path can be longer.
+    with tempfile.TemporaryDirectory(prefix="bt") as short_dir:
+        yield f"{short_dir}/collector.sock"
+
+
+def _count(db_path: str, table: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]  # nosec
+    finally:
+        conn.close()
+
+
+def _make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.setLevel(logging.ERROR)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def test_records_reach_collector(tmp_path, socket_path):
+    db_path = str(tmp_path / "collected.db")
+    collector = Collector(db_path, socket_path, flush_interval=0.05)
+    collector.start()
+    handler = SocketBugTrailHandler(socket_path)
+    logger = _make_logger("collector_test", handler)
+    try:
+        for i in range(20):
+            logger.error("worker error %s", i)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("with traceback")
+        assert handler.drain(5.0)
+    finally:
+        handler.close()
+        logger.handlers.clear()
+        collector.stop()
+
+    assert _count(db_path, "logs") == 21
+    assert _count(db_path, "exception_instance") == 1
+    assert _count(db_path, "traceback_info") >= 1
+
+
+def test_handler_buffers_while_collector_down(tmp_path, socket_path):
+    db_path = str(tmp_path / "late.db")
+    handler = SocketBugTrailHandler(socket_path, reconnect_interval=0.05)
+    logger = _make_logger("collector_test_late", handler)
+    start = time.perf_counter()
+    for i in range(5):
+        logger.error("before collector %s", i)
+    # emit never blocks on the missing collector
+    assert time.perf_counter() - start < 1.0
+    assert not handler.drain(0.1)
+
+    collector = Collector(db_path, socket_path, flush_interval=0.05)
+    collector.start()
+    try:
+        assert handler.drain(5.0)
+    finally:
+        handler.close()
+        logger.handlers.clear()
+        collector.stop()
+
+    assert _count(db_path, "logs") == 5
+
+
+def test_full_buffer_drops_oldest(socket_path):
+    handler = SocketBugTrailHandler(socket_path, buffer_size=3, reconnect_interval=0.05)
+    logger = _make_logger("collector_test_drop", handler)
+    for i in range(10):
+        logger.error("overflow %s", i)
+    assert handler.dropped >= 6
+    handler.close()
+    logger.handlers.clear()
+    # The collector never came up: what was still buffered is lost too, and counted.
+    assert handler.dropped == 10
+
+
+def test_collector_start_fails_when_database_cannot_open(tmp_path, socket_path):
+    collector = Collector(str(tmp_path / "missing" / "x.db"), socket_path)
+    with pytest.raises(sqlite3.OperationalError):
+        collector.start()
+
+
+def test_collect_command_applies_the_config(tmp_path, socket_path, monkeypatch):
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text(
+        '[tool.bug_trail]\npromoted_keys = ["request_id"]\nindex_locals = true\n',
+        encoding="utf-8",
+    )
+    started = []
+    monkeypatch.setattr(
+        collector_module.Collector, "serve_forever", lambda self: started.append(self)
+    )
+    db_path = str(tmp_path / "cli.db")
+    assert (
+        main(
+            [
+                "collect",
+                "--config",
+                str(pyproject),
+                "--db",
+                db_path,
+                "--socket",
+                socket_path,
+            ]
+        )
+        == 0
+    )
+    (collector,) = started
+    assert collector.db_path == db_path
+    assert collector.promoted_keys == ("request_id",)
+    assert collector.index_locals
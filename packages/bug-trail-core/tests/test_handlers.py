@@ -124,3 +124,46 @@ def test_defensive_if(tmp_path):
         None,
     )
     handler.emit(record)  # Call emit with None to test the defensive if
+
+
+def test_frames_record_where_they_were_and_old_tables_gain_the_columns(tmp_path):
+    db_path = tmp_path / "old.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(
+        "CREATE TABLE traceback_info (id INTEGER PRIMARY KEY AUTOINCREMENT, exception_instance_id TEXT, "
+        "frame_number INTEGER, f_locals TEXT, f_globals TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals, f_globals) VALUES ('old', 0, '{}', '{}')"
+    )
+    conn.commit()
+    conn.close()
+
+    handler = BugTrailHandler(str(db_path))
+    logger = logging.getLogger("test_logger_frames")
+    logger.setLevel(logging.ERROR)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    def fail():
+        raise ValueError("frames")
+
+    try:
+        fail()
+    except ValueError:
+        logger.exception("failed")
+    logger.removeHandler(handler)
+    handler.close()
+
+    conn = sqlite3.connect(str(db_path))
+    rows = conn.execute(
+        "SELECT exception_instance_id, frame_number, filename, function, lineno FROM traceback_info ORDER BY id"
+    ).fetchall()
+    conn.close()
+    assert rows[0] == ("old", 0, None, None, None)
+    assert [row[3] for row in rows[1:]] == [
+        "test_frames_record_where_they_were_and_old_tables_gain_the_columns",
+        "fail",
+    ]
+    assert rows[2][2] == __file__
+    assert rows[2][4] == fail.__code__.co_firstlineno + 1
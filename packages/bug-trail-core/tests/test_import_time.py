@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+# Import time itself is measured by tests_performance/handler_startup.py; a
+# wall-clock budget here would depend on how busy the machine is.
+HEAVY_MODULES = ("psutil", "platformdirs", "tomllib", "toml", "asyncio", "socketserver")
+
+
+def _imported_modules(code: str) -> set[str]:
+    """Run code under -X importtime; return every module it loaded."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        modules.add(line.split("|")[2].strip())
+    return modules
+
+
+def test_import_is_cheap():
+    modules = _imported_modules("import bug_trail_core")
+    assert "bug_trail_core" in modules
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_handler_class_does_not_pull_heavy_dependencies():
+    modules = _imported_modules("import bug_trail_core; bug_trail_core.BugTrailHandler")
+    assert "bug_trail_core.snapshot" in modules
+    assert not modules & set(HEAVY_MODULES)
@@ -0,0 +1,150 @@
+import json
+import logging
+import sqlite3
+
+from bug_trail_core.handlers import BugTrailHandler
+from bug_trail_core.locals_index import (
+    LOCALS_PER_FRAME,
+    LOCALS_TABLE,
+    LOCALS_VALUE_LIMIT,
+    create_locals_index,
+    drop_locals_index,
+)
+
+
+class Fish:
+    def __init__(self, x: int) -> None:
+        self.x = x
+        self.tank = ["a", "b"]
+
+    def __repr__(self) -> str:
+        return f"<Fish at {self.x}>"
+
+
+def _log_failure(db_path: str, index_locals: bool) -> None:
+    handler = BugTrailHandler(db_path, index_locals=index_locals)
+    logger = logging.getLogger("locals-index-test")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    def ship(order_id, fish, note, pet, self=None):
+        raise KeyError("warehouse")
+
+    try:
+        try:
+            ship(12345, {"x": -3, "tags": ["wet"]}, "n" * 1000, Fish(-3))
+        except KeyError:
+            logger.exception("shipping failed")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def _values(conn: sqlite3.Connection, name: str) -> list:
+    return [
+        row[0]
+        for row in conn.execute(
+            f"SELECT value FROM {LOCALS_TABLE} WHERE name = ?", (name,)
+        )
+    ]
+
+
+def _frame_count(conn: sqlite3.Connection, frame_number: int) -> int:
+    return conn.execute(
+        f"SELECT count(*) FROM {LOCALS_TABLE} JOIN traceback_info ON traceback_info.id = frame_id "
+        "WHERE traceback_info.frame_number = ?",
+        (frame_number,),
+    ).fetchone()[0]
+
+
+def test_locals_are_indexed_as_they_are_written(tmp_path):
+    db_path = str(tmp_path / "locals.db")
+    _log_failure(db_path, index_locals=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        assert _values(conn, "order_id") == [12345]
+        assert _values(conn, "fish.x") == [-3]
+        assert _values(conn, "fish.tags[0]") == ["wet"]
+        assert [len(value) for value in _values(conn, "note")] == [LOCALS_VALUE_LIMIT]
+        # objects are captured as their attributes, one level deep
+        assert _values(conn, "pet.x") == [-3]
+        assert _values(conn, "pet.tank") == ["['a', 'b']"]
+        matches = conn.execute(
+            f"SELECT count(*) FROM {LOCALS_TABLE} WHERE name = 'pet.x' AND value < 0"
+        ).fetchone()[0]
+        assert matches == 1
+        plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT frame_id FROM {LOCALS_TABLE} WHERE name = ? AND value < ?",
+                ("fish.x", 0),
+            )
+        )
+        assert "USING PRIMARY KEY (name=? AND value<?)" in plan
+        # None isn't indexed
+        assert _values(conn, "self") == []
+    finally:
+        conn.close()
+
+
+def test_existing_frames_are_backfilled_and_bad_json_skipped(tmp_path):
+    db_path = str(tmp_path / "backfill.db")
+    _log_failure(db_path, index_locals=False)
+    conn = sqlite3.connect(db_path)
+    try:
+        record_id = conn.execute(
+            "SELECT exception_instance_id FROM traceback_info"
+        ).fetchone()[0]
+        # json.dumps writes NaN, which isn't JSON; that frame must not stop the write.
+        conn.execute(
+            "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals) VALUES (?, 9, ?)",
+            (record_id, '{"ratio": NaN}'),
+        )
+        many = json.dumps({f"v{i}": i for i in range(LOCALS_PER_FRAME + 50)})
+        conn.execute(
+            "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals) VALUES (?, 10, ?)",
+            (record_id, many),
+        )
+        assert create_locals_index(conn)
+        conn.commit()
+        assert _values(conn, "order_id") == [12345]
+        assert _values(conn, "pet.x") == [-3]
+        assert _values(conn, "ratio") == []
+        assert _frame_count(conn, 10) == LOCALS_PER_FRAME
+        # Written after the index exists: the trigger, with the same limit
+        conn.execute(
+            "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals) VALUES (?, 11, ?)",
+            (record_id, many),
+        )
+        assert _frame_count(conn, 11) == LOCALS_PER_FRAME
+        # A module-level frame's locals are its globals; the dunders aren't worth indexing.
+        conn.execute(
+            "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals) VALUES (?, 12, ?)",
+            (
+                record_id,
+                json.dumps(
+                    {
+                        "__name__": "__main__",
+                        "__builtins__": {"len": "<built-in function len>"},
+                        "total": 7,
+                    }
+                ),
+            ),
+        )
+        assert _values(conn, "total") == [7]
+        assert _frame_count(conn, 12) == 1
+        assert not create_locals_index(conn)
+
+        drop_locals_index(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    # Turned off: nothing indexes new frames
+    _log_failure(db_path, index_locals=False)
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name IN ('local_values', 'traceback_locals_insert')"
+        ).fetchone() == (0,)
+    finally:
+        conn.close()
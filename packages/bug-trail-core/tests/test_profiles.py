@@ -0,0 +1,123 @@
+import logging
+import sqlite3
+import time
+
+import pytest
+
+from bug_trail_core.config import read_config
+from bug_trail_core.handlers import BugTrailHandler
+from bug_trail_core.profiles import PROFILES, resolve_profile
+
+
+def _count(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT count(*) FROM logs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_resolve_profile_overrides():
+    profile = resolve_profile("fast", batch_size=10)
+    assert profile.batch_size == 10
+    assert profile.synchronous == PROFILES["fast"].synchronous
+    assert resolve_profile(None) is PROFILES["balanced"]
+    with pytest.raises(ValueError):
+        resolve_profile("reckless")
+    with pytest.raises(ValueError):
+        resolve_profile("safe", journal_mode="DELETE")
+    with pytest.raises(ValueError):
+        resolve_profile("safe", synchronous="FULL; DROP TABLE logs")
+
+
+def test_read_config_profile(tmp_path):
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text(
+        '[tool.bug_trail]\ndatabase_path = "x.db"\nprofile = "fast"\nflush_interval = 0.1\n',
+        encoding="utf-8",
+    )
+    config = read_config(str(pyproject))
+    assert config.profile.name == "fast"
+    assert config.profile.flush_interval == 0.1
+    assert config.profile.batch_size == PROFILES["fast"].batch_size
+
+
+def test_default_profile_matches_previous_pragmas(tmp_path):
+    handler = BugTrailHandler(str(tmp_path / "balanced.db"))
+    conn = handler.base_handler.conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # NORMAL
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    # SQLite's own defaults: 2000 KiB of cache, DEFAULT temp store
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2000
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 0
+    handler.close()
+
+
+def test_fast_profile_batches_until_flush(tmp_path):
+    db_path = str(tmp_path / "fast.db")
+    handler = BugTrailHandler(
+        db_path, profile=resolve_profile("fast", flush_interval=60)
+    )
+    logger = logging.getLogger("profile_fast")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.error("batched %s", i)
+        try:
+            raise ValueError("in a batch")
+        except ValueError:
+            logger.exception("with traceback")
+        assert _count(db_path) == 0
+        assert handler.drain(5.0)
+        assert _count(db_path) == 6
+        logger.error("written on close")
+    finally:
+        logger.handlers.clear()
+        handler.close()
+    assert _count(db_path) == 7
+    assert handler.stats()["batches"] >= 2
+
+    # too late to be written, but not lost silently
+    handler.emit(
+        logging.LogRecord(
+            "profile_fast", logging.ERROR, __file__, 1, "after close", (), None
+        )
+    )
+    assert handler.stats()["dropped"] == 1
+    assert _count(db_path) == 7
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert (
+            conn.execute("PRAGMA page_size").fetchone()[0] == PROFILES["fast"].page_size
+        )
+        assert (
+            conn.execute("SELECT count(*) FROM exception_instance").fetchone()[0] == 1
+        )
+    finally:
+        conn.close()
+
+
+def test_batch_written_when_full(tmp_path):
+    db_path = str(tmp_path / "full.db")
+    handler = BugTrailHandler(
+        db_path, profile=resolve_profile("fast", batch_size=3, flush_interval=60)
+    )
+    logger = logging.getLogger("profile_full")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(3):
+            logger.error("fills the batch %s", i)
+        # no flush requested: the full batch goes on its own
+        deadline = time.monotonic() + 5
+        while _count(db_path) < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert _count(db_path) == 3
+    finally:
+        logger.handlers.clear()
+        handler.close()
@@ -0,0 +1,82 @@
+import logging
+import sqlite3
+
+import pytest
+
+from bug_trail_core.config import read_config
+from bug_trail_core.handlers import BugTrailHandler
+from bug_trail_core.promoted_keys import promote_keys, promoted_column, promoted_columns
+
+
+def _log_requests(db_path: str, promoted_keys=()) -> None:
+    handler = BugTrailHandler(db_path, promoted_keys=promoted_keys)
+    logger = logging.getLogger("promoted-keys-test")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.error("checkout failed", extra={"request_id": "r-1", "attempt": 2})
+        logger.error("refund failed", extra={"request_id": "r-2", "tenant": "acme"})
+        logger.error("no extra fields")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_existing_logs_are_indexed_when_a_key_is_promoted(tmp_path):
+    db_path = str(tmp_path / "promoted.db")
+    _log_requests(db_path)
+    # A handler starting with the key configured migrates the database.
+    BugTrailHandler(db_path, promoted_keys=["request_id", "attempt"]).close()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert promoted_columns(conn) == {
+            "request_id": "extra_request_id",
+            "attempt": "extra_attempt",
+        }
+        assert conn.execute(
+            "SELECT msg FROM logs WHERE extra_request_id = 'r-2'"
+        ).fetchall() == [("refund failed",)]
+        # Numbers are indexed as text
+        assert conn.execute(
+            "SELECT msg FROM logs WHERE extra_attempt = '2'"
+        ).fetchall() == [("checkout failed",)]
+        plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT msg FROM logs WHERE extra_request_id = ? ORDER BY created DESC",
+                ("r-1",),
+            )
+        )
+        assert "USING INDEX ix_logs_extra_request_id" in plan
+        assert "TEMP B-TREE" not in plan
+        # Running again changes nothing
+        assert promote_keys(conn, ["request_id"]) == []
+    finally:
+        conn.close()
+
+    # New rows are picked up without any write-side work
+    _log_requests(db_path, promoted_keys=["request_id"])
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute(
+            "SELECT count(*) FROM logs WHERE extra_request_id = 'r-1'"
+        ).fetchone() == (2,)
+    finally:
+        conn.close()
+
+
+def test_only_identifier_keys_can_be_promoted(tmp_path):
+    with pytest.raises(ValueError):
+        promoted_column("x') OR 1=1 --")
+    with pytest.raises(ValueError):
+        BugTrailHandler(str(tmp_path / "bad.db"), promoted_keys=["request id"])
+
+
+def test_read_config_promoted_keys(tmp_path):
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text(
+        '[tool.bug_trail]\ndatabase_path = "x.db"\npromoted_keys = ["request_id", "tenant"]\n',
+        encoding="utf-8",
+    )
+    assert read_config(str(pyproject)).promoted_keys == ["request_id", "tenant"]
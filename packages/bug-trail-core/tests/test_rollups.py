@@ -0,0 +1,97 @@
+import logging
+import sqlite3
+
+from bug_trail_core.handlers import BaseErrorLogHandler, BugTrailHandler
+from bug_trail_core.rollups import (
+    ROLLUP_TABLE,
+    create_rollups,
+    drop_rollups,
+    rebuild_rollups,
+)
+
+
+def _log_errors(db_path: str) -> None:
+    handler = BugTrailHandler(db_path)
+    logger = logging.getLogger("rollups-test.db")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.error("disk full")
+        logger.critical("disk gone")
+        try:
+            raise KeyError("widget")
+        except KeyError:
+            logger.exception("lookup failed")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def _rollups(conn: sqlite3.Connection, resolution: int) -> dict[tuple[str, str], int]:
+    rows = conn.execute(
+        f"SELECT dimension, value, sum(count) FROM {ROLLUP_TABLE} WHERE resolution = ? GROUP BY dimension, value",
+        (resolution,),
+    ).fetchall()
+    return {(dimension, value): count for dimension, value, count in rows}
+
+
+def test_each_record_is_counted_in_its_buckets(tmp_path):
+    db_path = str(tmp_path / "rollups.db")
+    _log_errors(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        expected = {
+            ("level", "ERROR"): 2,
+            ("level", "CRITICAL"): 1,
+            ("logger", "rollups-test.db"): 3,
+            ("exception", "KeyError"): 1,
+        }
+        for resolution in (60, 3600, 86400):
+            assert _rollups(conn, resolution) == expected
+        created = conn.execute("SELECT max(created) FROM logs").fetchone()[0]
+        (bucket,) = conn.execute(
+            f"SELECT DISTINCT bucket FROM {ROLLUP_TABLE} WHERE resolution = 3600 ORDER BY bucket DESC LIMIT 1"
+        ).fetchone()
+        assert bucket % 3600 == 0 and bucket <= created < bucket + 3600
+    finally:
+        conn.close()
+
+
+def test_existing_logs_are_counted_once_and_rebuilt(tmp_path):
+    db_path = str(tmp_path / "backfill.db")
+    _log_errors(db_path)
+    conn = sqlite3.connect(db_path)
+    before = _rollups(conn, 60)
+    drop_rollups(conn)
+    conn.commit()
+    conn.close()
+
+    # A handler starting up migrates the database, as after an upgrade.
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        assert _rollups(conn, 60) == before
+        assert create_rollups(conn) is False
+        conn.execute(f"UPDATE {ROLLUP_TABLE} SET count = 99")
+        rebuild_rollups(conn)
+        assert _rollups(conn, 60) == before
+    finally:
+        conn.close()
+
+
+def test_a_chart_range_reads_only_its_buckets(tmp_path):
+    db_path = str(tmp_path / "plan.db")
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        plan = conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT value, bucket, count FROM {ROLLUP_TABLE} "
+            "WHERE resolution = ? AND dimension = ? AND bucket BETWEEN ? AND ?",
+            (3600, "level", 0, 3600),
+        ).fetchall()
+        assert (
+            "PRIMARY KEY (resolution=? AND dimension=? AND bucket>? AND bucket<?)"
+            in plan[0][3]
+        )
+    finally:
+        conn.close()
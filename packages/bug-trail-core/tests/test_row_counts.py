@@ -0,0 +1,65 @@
+import logging
+import sqlite3
+
+from bug_trail_core.handlers import BaseErrorLogHandler, BugTrailHandler
+from bug_trail_core.row_counts import create_table_stats, read_counts, recount
+
+
+def _exact(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def test_triggers_track_handler_writes(tmp_path):
+    db_path = str(tmp_path / "counts.db")
+    handler = BugTrailHandler(db_path)
+    logger = logging.getLogger("row-counts-test")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(3):
+            try:
+                raise ValueError(i)
+            except ValueError:
+                logger.exception("failed %s", i)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = read_counts(conn)
+        for table in ("logs", "exception_instance", "traceback_info"):
+            assert counts[table] == _exact(conn, table)
+        assert counts["logs"] == 3
+
+        conn.execute("DELETE FROM logs WHERE rowid = (SELECT min(rowid) FROM logs)")
+        conn.commit()
+        assert read_counts(conn)["logs"] == _exact(conn, "logs") == 2
+    finally:
+        conn.close()
+
+
+def test_existing_rows_seeded_and_recount_repairs_drift(tmp_path):
+    db_path = str(tmp_path / "old.db")
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        # A database from before table_stats existed
+        conn.execute("DROP TABLE table_stats")
+        conn.execute("DROP TRIGGER logs_count_insert")
+        conn.execute("DROP TRIGGER logs_count_delete")
+        conn.executemany(
+            "INSERT INTO logs (record_id, created) VALUES (?, 1.0)", [("a",), ("b",)]
+        )
+        conn.commit()
+
+        create_table_stats(conn)
+        conn.commit()
+        assert read_counts(conn)["logs"] == 2
+
+        conn.execute("UPDATE table_stats SET row_count = 99 WHERE table_name = 'logs'")
+        conn.commit()
+        assert recount(conn)["logs"] == 2
+        assert read_counts(conn)["logs"] == 2
+    finally:
+        conn.close()
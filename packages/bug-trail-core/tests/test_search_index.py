@@ -0,0 +1,74 @@
+import logging
+import sqlite3
+
+from bug_trail_core.handlers import BaseErrorLogHandler, BugTrailHandler
+from bug_trail_core.search_index import (
+    SEARCH_TABLE,
+    create_search_index,
+    drop_search_index,
+)
+
+
+def _log_errors(db_path: str) -> None:
+    handler = BugTrailHandler(db_path)
+    logger = logging.getLogger("search-index-test")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.error("disk quota exceeded on %s", "/var/spool")
+        try:
+            raise KeyError("missing_widget_id")
+        except KeyError:
+            logger.exception("lookup failed")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def _matches(conn: sqlite3.Connection, query: str) -> list[str]:
+    rows = conn.execute(
+        f"SELECT logs.msg FROM {SEARCH_TABLE} JOIN logs ON logs.rowid = {SEARCH_TABLE}.rowid "
+        f"WHERE {SEARCH_TABLE} MATCH ? ORDER BY rank",
+        (query,),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def test_triggers_index_messages_and_exceptions(tmp_path):
+    db_path = str(tmp_path / "search.db")
+    _log_errors(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        assert _matches(conn, "quota") == ["disk quota exceeded on %s"]
+        # Formatted message, not just the template
+        assert _matches(conn, "spool") == ["disk quota exceeded on %s"]
+        assert _matches(conn, "exception:KeyError") == ["lookup failed"]
+        assert _matches(conn, "missing_widget_id") == ["lookup failed"]
+        assert _matches(conn, "traceback:raise") == ["lookup failed"]
+
+        conn.execute("DELETE FROM logs WHERE msg = 'lookup failed'")
+        conn.commit()
+        assert _matches(conn, "KeyError") == []
+    finally:
+        conn.close()
+
+
+def test_existing_logs_are_backfilled(tmp_path):
+    db_path = str(tmp_path / "backfill.db")
+    _log_errors(db_path)
+    conn = sqlite3.connect(db_path)
+    drop_search_index(conn)
+    conn.commit()
+    conn.close()
+
+    # A handler starting up migrates the database, as after an upgrade.
+    BaseErrorLogHandler(db_path).close()
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute(f"SELECT count(*) FROM {SEARCH_TABLE}").fetchone()[0] == 2
+        assert _matches(conn, "KeyError") == ["lookup failed"]
+        # Already there: nothing is indexed twice.
+        assert create_search_index(conn) is True
+        assert conn.execute(f"SELECT count(*) FROM {SEARCH_TABLE}").fetchone()[0] == 2
+    finally:
+        conn.close()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import signal
+import sqlite3
+import subprocess  # nosec
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from bug_trail_core.async_handler import AsyncBugTrailHandler
+from bug_trail_core.handlers import BugTrailHandler
+from bug_trail_core.shutdown import flush_with_deadline, install_hooks
+
+
+def _rows(db_path: str) -> list[tuple]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT levelname, msg, threadName, traceback FROM logs"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _run(script: str, timeout: float = 30.0) -> subprocess.CompletedProcess:
+    return subprocess.run(  # nosec
+        [sys.executable, "-c", textwrap.dedent(script)],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        check=False,
+    )
+
+
+def test_crash_persists_final_error(tmp_path):
+    db_path = str(tmp_path / "crash.db")
+    result = _run(f"""
+        import bug_trail_core
+        handler = bug_trail_core.BugTrailHandler({db_path!r})
+        bug_trail_core.install_hooks(handler)
+        raise ValueError("the last thing that happened")
+        """)
+    assert result.returncode == 1
+    # the previous excepthook still prints the traceback
+    assert "ValueError: the last thing that happened" in result.stderr
+    rows = _rows(db_path)
+    assert len(rows) == 1
+    levelname, message, _, traceback = rows[0]
+    assert levelname == "CRITICAL"
+    assert message == "Uncaught exception"
+    assert "the last thing that happened" in traceback
+
+
+def test_sigterm_flush_is_bounded(tmp_path):
+    # Nobody is listening on the socket, so the flush can never succeed.
+    start = time.perf_counter()
+    result = _run(f"""
+        import logging, os, signal, time
+        import bug_trail_core
+        handler = bug_trail_core.SocketBugTrailHandler({str(tmp_path / "none.sock")!r}, reconnect_interval=0.05)
+        logging.getLogger("t").addHandler(handler)
+        logging.getLogger("t").error("never delivered")
+        bug_trail_core.install_hooks(handler, deadline=0.2)
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(30)
+        """)
+    assert result.returncode == 128 + signal.SIGTERM
+    # logging.shutdown must not wait out the socket handler's 5s default flush
+    assert time.perf_counter() - start < 4.0
+
+
+def test_thread_exception_is_logged(tmp_path):
+    db_path = str(tmp_path / "thread.db")
+    handler = BugTrailHandler(db_path)
+    hooks = install_hooks(handler, sigterm=False)
+    previous = hooks._previous_threading_hook  # pylint: disable=protected-access
+    hooks._previous_threading_hook = lambda args: None  # keep pytest output quiet
+
+    def worker() -> None:
+        raise RuntimeError("worker died")
+
+    try:
+        thread = threading.Thread(target=worker, name="doomed")
+        thread.start()
+        thread.join()
+    finally:
+        hooks._previous_threading_hook = previous
+        hooks.uninstall()
+        handler.close()
+    assert threading.excepthook is previous
+    rows = _rows(db_path)
+    assert [(row[0], row[2]) for row in rows] == [("CRITICAL", "doomed")]
+    assert "worker died" in rows[0][3]
+
+
+def test_exit_closes_the_handler_connection(tmp_path):
+    handler = BugTrailHandler(str(tmp_path / "exit.db"))
+    hooks = install_hooks(handler, sigterm=False)
+    conn = handler.base_handler.conn
+    assert conn is not None
+    try:
+        hooks._atexit()  # pylint: disable=protected-access
+    finally:
+        hooks.uninstall()
+    with pytest.raises(sqlite3.ProgrammingError, match="closed database"):
+        conn.execute("SELECT 1")
+
+
+def test_asyncio_exception_handler(tmp_path):
+    db_path = str(tmp_path / "loop.db")
+    handler = AsyncBugTrailHandler(db_path)
+    seen = []
+
+    def failing_callback() -> None:
+        raise KeyError("callback")
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(
+            lambda _loop, context: seen.append(context["message"])
+        )
+        hooks = install_hooks(handler, sigterm=False)
+        try:
+            loop.call_soon(failing_callback)
+            await asyncio.sleep(0.01)
+            await handler.aflush()
+        finally:
+            hooks.uninstall()
+
+    asyncio.run(main())
+    handler.close()
+    assert len(seen) == 1
+    rows = _rows(db_path)
+    assert len(rows) == 1
+    assert "KeyError" in rows[0][3]
+
+
+def test_flush_with_deadline_gives_up():
+    class StuckHandler(logging.Handler):
+        def emit(self, record):
+            pass
+
+        def flush(self):
+            time.sleep(5)
+
+    start = time.perf_counter()
+    assert not flush_with_deadline(StuckHandler(), 0.1)
+    assert time.perf_counter() - start < 1.0
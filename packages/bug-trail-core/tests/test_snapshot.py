@@ -0,0 +1,68 @@
+import gc
+import logging
+import tracemalloc
+import weakref
+
+from bug_trail_core.handlers import logs_table_sql, parse_field_names
+from bug_trail_core.snapshot import LOG_COLUMNS, RecordSnapshot
+
+
+def _record(msg: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("snap", logging.ERROR, __file__, 10, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_columns_match_shipped_schema():
+    assert list(LOG_COLUMNS) == parse_field_names(logs_table_sql())
+
+
+def test_row_and_user_data():
+    snapshot = RecordSnapshot.from_record(
+        _record("hello %s", "world", request_id="r-1")
+    )
+    row = snapshot.as_row()
+    assert len(row) == len(LOG_COLUMNS)
+    assert row[LOG_COLUMNS.index("record_id")] == snapshot.record_id
+    assert row[LOG_COLUMNS.index("msg")] == "hello %s"
+    assert row[LOG_COLUMNS.index("args")] == "('world',)"
+    assert '"request_id": "r-1"' in row[LOG_COLUMNS.index("user_data")]
+    assert not hasattr(snapshot, "__dict__")
+
+
+def test_snapshot_releases_exception_frames():
+    class Marker:
+        pass
+
+    def fail(marker: Marker) -> None:
+        raise RuntimeError("kept alive?")
+
+    marker = Marker()
+    ref = weakref.ref(marker)
+    try:
+        fail(marker)
+    except RuntimeError:
+        snapshot = RecordSnapshot.from_record(_record("oops"))
+    del marker
+    gc.collect()
+    assert ref() is None
+    assert snapshot.exception is not None
+    assert snapshot.exception["name"] == "RuntimeError"
+    assert "kept alive?" in snapshot.as_dict()["traceback"]
+
+
+def test_bytes_retained_per_queued_record_is_bounded():
+    count = 2000
+    tracemalloc.start()
+    try:
+        records = [_record("queued %s", i, tenant="acme") for i in range(count)]
+        before = tracemalloc.take_snapshot()
+        queue = [RecordSnapshot.from_record(record) for record in records]
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    per_record = grown / len(queue)
+    # ~440 bytes on CPython 3.13: the slots object, its row strings and the uuid.
+    assert per_record < 640, per_record
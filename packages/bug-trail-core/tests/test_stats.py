@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from bug_trail_core.handlers import BugTrailHandler
+from bug_trail_core.stats import (
+    BUCKET_BOUNDS_NS,
+    STATS_RETENTION_S,
+    HandlerStats,
+    LatencyHistogram,
+    histogram_percentile,
+)
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram()
+    for duration in (500, 1_500, 1_500, 3_000_000, 10**12):
+        histogram.observe(duration)
+    assert histogram.count == 5
+    assert histogram.max_ns == 10**12
+    assert histogram.counts[0] == 1
+    assert histogram.counts[1] == 2
+    assert histogram.counts[-1] == 1
+    assert histogram_percentile(histogram.counts, 50) == BUCKET_BOUNDS_NS[1]
+    assert histogram_percentile([0] * len(histogram.counts), 50) is None
+
+
+def test_handler_stats_and_persistence(tmp_path):
+    db_path = str(tmp_path / "stats.db")
+    handler = BugTrailHandler(db_path)
+    logger = logging.getLogger("stats_test")
+    logger.handlers.clear()
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+    logger.info("below minimum level")
+    logger.error("counted")
+    logger.error("counted again")
+
+    stats = handler.stats()
+    assert stats["emitted"] == 2
+    assert stats["written"] == 2
+    assert stats["suppressed"] == 1
+    assert stats["histograms"]["db_write"]["count"] == 2
+    assert stats["histograms"]["emit"]["count"] == 2
+
+    handler.close()
+    logger.handlers.clear()
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT handler, stats FROM handler_stats").fetchall()
+    conn.close()
+    assert rows[-1][0] == "BaseErrorLogHandler"
+    assert json.loads(rows[-1][1])["emitted"] == 2
+
+
+def test_persisting_keeps_one_row_per_process_and_handler(tmp_path):
+    db_path = str(tmp_path / "retention.db")
+    BugTrailHandler(db_path).close()
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO handler_stats (pid, process_name, handler, recorded_at, stats) VALUES (1, 'gone', 'x', ?, '{}')",
+            (time.time() - STATS_RETENTION_S - 60,),
+        )
+        conn.execute(
+            "INSERT INTO handler_stats (pid, process_name, handler, recorded_at, stats) VALUES (2, 'recent', 'x', ?, '{}')",
+            (time.time(),),
+        )
+        stats = HandlerStats("RetentionTest")
+        for _ in range(3):
+            stats.persist(conn)
+        rows = conn.execute(
+            "SELECT pid, handler FROM handler_stats WHERE handler != 'BaseErrorLogHandler' ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    # pid 1 stopped reporting long ago; three persists left one row
+    assert rows == [(2, "x"), (os.getpid(), "RetentionTest")]
@@ -41,16 +41,57 @@ def _build_parser() -> argparse.ArgumentParser:
 
     start = subparsers.add_parser("start", help="Start the web server.")
     _add_config_arg(start)
-    start.add_argument("--host", default="127.0.0.1", help="Host to bind (default: 127.0.0.1).")
-    start.add_argument("--port", type=int, default=7890, help="Port to bind (default: 7890).")
-    start.add_argument("--db", type=str, default=None, help="Override database path from config.")
-    start.add_argument("--source", type=str, default=None, help="Override source folder from config.")
-    start.add_argument("--reload", action="store_true", help="Auto-reload on code changes (dev mode).")
+    start.add_argument(
+        "--host", default="127.0.0.1", help="Host to bind (default: 127.0.0.1)."
+    )
+    start.add_argument(
+        "--port", type=int, default=7890, help="Port to bind (default: 7890)."
+    )
+    start.add_argument(
+        "--db", type=str, default=None, help="Override database path from config."
+    )
+    start.add_argument(
+        "--source", type=str, default=None, help="Override source folder from config."
+    )
+    start.add_argument(
+        "--reload", action="store_true", help="Auto-reload on code changes (dev mode)."
+    )
+    start.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes serving requests, to use more than one core (default: 1).",
+    )
+    start.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.5,
+        help="Least seconds between live updates, and the poll period (default: 0.5).",
+    )
+    start.add_argument(
+        "--poll",
+        action="store_true",
+        help="Detect changes by polling instead of file events (network filesystems, containers).",
+    )
+    start.add_argument(
+        "--max-sse-clients",
+        type=int,
+        default=1000,
+        help="Most browser tabs receiving live updates at once, per worker (default: 1000).",
+    )
+    start.add_argument(
+        "--query-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds a page's queries may run before they are stopped with a 504 (default: 10).",
+    )
 
     admin = subparsers.add_parser("admin", help="Data management commands.")
     admin_sub = admin.add_subparsers(dest="admin_command", required=True)
 
-    admin_clear = admin_sub.add_parser("clear", help="Wipe rows from all log tables (keep schema).")
+    admin_clear = admin_sub.add_parser(
+        "clear", help="Wipe rows from all log tables (keep schema)."
+    )
     _add_config_arg(admin_clear)
     admin_clear.add_argument("--db", type=str, default=None)
 
@@ -72,25 +113,59 @@ def _cmd_start(args: argparse.Namespace) -> int:
     import uvicorn
 
     db_path, source_folder = _resolve_db_path(args)
+    profile = read_config(args.config).profile
 
-    # Stash paths in env-ish globals for the app factory.
+    workers = max(1, args.workers)
+    if args.reload and workers > 1:
+        print("  --reload runs a single worker; ignoring --workers.")
+        workers = 1
+
+    # Sets STATE here and exports BUG_TRAIL_* variables for the worker processes.
     from bug_trail import app as app_module
 
-    app_module.configure(db_path=db_path, source_folder=source_folder)
+    app_module.configure(
+        db_path=db_path,
+        source_folder=source_folder,
+        checkpoint_interval=profile.checkpoint_interval,
+        wal_size_limit=profile.wal_size_limit,
+        watch_interval=args.watch_interval,
+        watch_mode="poll" if args.poll else "watch",
+        max_sse_clients=args.max_sse_clients,
+        query_timeout=args.query_timeout,
+        # Several workers checkpointing the same WAL only get in each other's way.
+        wal_monitor_in_worker=workers == 1,
+    )
 
     url = f"http://{args.host}:{args.port}"
     print(f"Bug Trail server starting at {url}")
     print(f"  Database: {db_path}")
+    if workers > 1:
+        print(f"  Workers: {workers}")
     print(f"  Open {url}/help for setup instructions.")
     print("  Press Ctrl+C to stop.")
 
-    uvicorn.run(
-        "bug_trail.app:app",
-        host=args.host,
-        port=args.port,
-        reload=args.reload,
-        log_level="info" if not args.verbose else "debug",
-    )
+    monitor = None
+    if workers > 1 and db_path:
+        from bug_trail.wal_monitor import WalMonitor
+
+        monitor = WalMonitor(
+            db_path,
+            interval=profile.checkpoint_interval,
+            size_limit=profile.wal_size_limit,
+        )
+        monitor.start()
+    try:
+        uvicorn.run(
+            "bug_trail.app:app",
+            host=args.host,
+            port=args.port,
+            reload=args.reload,
+            workers=workers,
+            log_level="info" if not args.verbose else "debug",
+        )
+    finally:
+        if monitor is not None:
+            monitor.stop()
     return 0
 
 
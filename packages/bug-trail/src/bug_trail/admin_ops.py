@@ -2,27 +2,47 @@
 
 from __future__ import annotations
 
+import json
 import os
 import sqlite3
+from typing import Any
 
+from bug_trail_core.checkpoint import WalCheckpointer, wal_size
 from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.locals_index import (
+    LOCALS_TABLE,
+    drop_locals_index,
+    locals_index_exists,
+)
+from bug_trail_core.rollups import (
+    ROLLUP_TABLE,
+    drop_rollups,
+    rebuild_rollups,
+    rollups_exist,
+)
+from bug_trail_core.promoted_keys import promoted_columns
+from bug_trail_core.row_counts import STATS_TABLE, read_counts, recount
+from bug_trail_core.search_index import drop_search_index
 from bug_trail_core.sqlite3_utils import ALL_TABLES, truncate_table
+from bug_trail_core.stats import BUCKET_BOUNDS_NS, HISTOGRAMS, histogram_percentile
+
+from bug_trail.data_code import read_connection
 
 
 def clear_all(db_path: str) -> int:
     """Truncate every known table. Returns approximate rows removed."""
     if not os.path.exists(db_path):
         return 0
+    total = sum(table_counts(db_path).values())
     conn = sqlite3.connect(db_path)
     try:
-        total = 0
-        for table in ALL_TABLES:
-            try:
-                cur = conn.cursor()
-                cur.execute(f"SELECT count(*) FROM {table}")  # nosec
-                total += cur.fetchone()[0]
-            except sqlite3.OperationalError:
-                continue
+        if locals_index_exists(conn):
+            # Its rows point at traceback_info; first, so the VACUUMs below reclaim the space.
+            conn.execute(f"DELETE FROM {LOCALS_TABLE}")  # nosec
+            conn.commit()
+        if rollups_exist(conn):
+            conn.execute(f"DELETE FROM {ROLLUP_TABLE}")  # nosec
+            conn.commit()
         for table in ALL_TABLES:
             try:
                 truncate_table(conn, table)
@@ -34,39 +54,73 @@ def clear_all(db_path: str) -> int:
 
 
 def reset_all(db_path: str) -> None:
-    """Drop every known table and recreate the schema."""
+    """Drop every known table and recreate the schema, keeping promoted keys and the locals index."""
+    index_locals = False
+    promoted_keys: list[str] = []
     if os.path.exists(db_path):
         conn = sqlite3.connect(db_path)
         try:
+            index_locals = locals_index_exists(conn)
+            promoted_keys = list(promoted_columns(conn))
             for table in ALL_TABLES:
                 try:
                     conn.execute(f"DROP TABLE IF EXISTS {table}")  # nosec
                 except sqlite3.OperationalError:
                     continue
+            drop_search_index(conn)
+            drop_locals_index(conn)
+            drop_rollups(conn)
+            # Last: until their tables are gone, the count triggers write to it.
+            conn.execute(f"DROP TABLE IF EXISTS {STATS_TABLE}")  # nosec
             conn.commit()
         finally:
             conn.close()
     # Recreate schema by constructing a handler (idempotent).
-    BaseErrorLogHandler(db_path)
+    BaseErrorLogHandler(
+        db_path, promoted_keys=promoted_keys, index_locals=index_locals
+    ).close()
 
 
 def table_counts(db_path: str) -> dict[str, int]:
-    """Return row counts for each known table. Missing tables report 0."""
+    """
+    Return row counts for each known table. Missing tables report 0.
+
+    Counts come from table_stats; only tables it doesn't track are counted.
+    """
     result: dict[str, int] = {t: 0 for t in ALL_TABLES}
     if not os.path.exists(db_path):
         return result
-    conn = sqlite3.connect(db_path)
-    try:
+    with read_connection(db_path) as conn:
+        cached = read_counts(conn)
         for table in ALL_TABLES:
+            if table in cached:
+                result[table] = cached[table]
+                continue
             try:
                 cur = conn.cursor()
                 cur.execute(f"SELECT count(*) FROM {table}")  # nosec
                 result[table] = cur.fetchone()[0]
             except sqlite3.OperationalError:
                 result[table] = 0
+    return result
+
+
+def recount_tables(db_path: str) -> dict[str, int]:
+    """Recount every table with count(*) and store the results in table_stats, and rebuild the chart rollups."""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = recount(conn)
+        try:
+            rebuild_rollups(conn)
+            conn.commit()
+        except sqlite3.OperationalError:
+            # No logs table
+            conn.rollback()
+        return counts
     finally:
         conn.close()
-    return result
 
 
 def db_size(db_path: str) -> int:
@@ -75,3 +129,93 @@ def db_size(db_path: str) -> int:
         return os.path.getsize(db_path)
     except OSError:
         return 0
+
+
+def wal_status(
+    db_path: str, checkpointer: WalCheckpointer | None = None
+) -> dict[str, Any]:
+    """WAL size plus checkpoint counts, when the viewer is running checkpoints."""
+    if checkpointer is not None:
+        return checkpointer.as_dict()
+    return {
+        "wal_size": wal_size(db_path),
+        "size_limit": None,
+        "interval": None,
+        "counts": {},
+        "busy": 0,
+        "errors": 0,
+        "last_mode": None,
+        "last_duration_ms": None,
+        "last_at": None,
+    }
+
+
+def _format_ns(value: int | None) -> str:
+    if value is None:
+        return "-"
+    if value < 1_000_000:
+        return f"{value / 1_000:.0f} µs"
+    return f"{value / 1_000_000:.1f} ms"
+
+
+def bucket_labels() -> list[str]:
+    """Upper bound of each histogram bucket, for chart axes."""
+    return [_format_ns(bound) for bound in BUCKET_BOUNDS_NS] + ["slower"]
+
+
+def handler_stats(db_path: str) -> list[dict[str, Any]]:
+    """Latest persisted stats snapshot per (process, handler), newest first."""
+    if not os.path.exists(db_path):
+        return []
+    try:
+        with read_connection(db_path) as conn:
+            rows = conn.execute("""SELECT pid, process_name, handler, recorded_at, stats
+                   FROM handler_stats AS outer_stats
+                   WHERE id = (SELECT max(id) FROM handler_stats AS inner_stats
+                               WHERE inner_stats.pid = outer_stats.pid
+                               AND inner_stats.handler = outer_stats.handler)
+                   ORDER BY recorded_at DESC
+                   LIMIT 50""").fetchall()
+    except sqlite3.OperationalError:
+        return []
+
+    result = []
+    for pid, process_name, handler, recorded_at, raw in rows:
+        try:
+            stats = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+        latencies = []
+        for name in HISTOGRAMS:
+            histogram = stats.get("histograms", {}).get(name, {})
+            buckets = histogram.get("buckets") or []
+            peak = max(buckets) if buckets else 0
+            latencies.append(
+                {
+                    "name": name,
+                    "count": histogram.get("count", 0),
+                    "p50": _format_ns(histogram_percentile(buckets, 50)),
+                    "p95": _format_ns(histogram_percentile(buckets, 95)),
+                    "p99": _format_ns(histogram_percentile(buckets, 99)),
+                    "max": _format_ns(histogram.get("max_ns")),
+                    # bar heights in percent of the fullest bucket
+                    "bars": [
+                        round(100 * count / peak) if peak else 0 for count in buckets
+                    ],
+                }
+            )
+        result.append(
+            {
+                "pid": pid,
+                "process_name": process_name,
+                "handler": handler,
+                "recorded_at": recorded_at,
+                "counters": {
+                    key: value
+                    for key, value in stats.items()
+                    if isinstance(value, (int, float))
+                },
+                "latencies": latencies,
+            }
+        )
+    return result
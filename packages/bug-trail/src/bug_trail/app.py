@@ -2,17 +2,34 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import logging
 import os
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+)
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from bug_trail import async_data
+from bug_trail.async_data import ClientDisconnected, QueryTimeout
+from bug_trail.db_pool import ReadPool
 from bug_trail.db_watcher import DbWatcher
+from bug_trail.live_feed import LiveFeed
+from bug_trail.response_cache import ResponseCache
+from bug_trail.wal_monitor import WalMonitor
 
 logger = logging.getLogger(__name__)
 
@@ -24,15 +41,117 @@ class AppState:
     db_path: str = ""
     source_folder: str = ""
     watcher: DbWatcher | None = field(default=None)
+    wal_monitor: WalMonitor | None = field(default=None)
+    read_pool: ReadPool | None = field(default=None)
+    read_pool_size: int = 8
+    page_cache: ResponseCache | None = field(default=None)
+    live_feed: LiveFeed | None = field(default=None)
+    checkpoint_interval: float = 30.0
+    wal_size_limit: int = 64 * 1024 * 1024
+    # DbWatcher: least seconds between change notifications; "watch" or "poll"
+    watch_interval: float = 0.5
+    watch_mode: str = "watch"
+    # Seconds before a page's queries are interrupted and it gets a 504.
+    query_timeout: float = 10.0
+    # Concurrent /events connections per worker; more get a 503.
+    max_sse_clients: int = 1000
+    # False in multi-worker mode, where the `bug_trail start` process checkpoints for all workers.
+    wal_monitor_in_worker: bool = True
 
 
 STATE = AppState()
 
+# Settings that configure() also exports as BUG_TRAIL_<NAME>, so worker
+# processes started by uvicorn (--workers, --reload) import `app` configured.
+ENV_PREFIX = "BUG_TRAIL_"
+CONFIG_FIELDS = (
+    "db_path",
+    "source_folder",
+    "checkpoint_interval",
+    "wal_size_limit",
+    "watch_interval",
+    "watch_mode",
+    "max_sse_clients",
+    "query_timeout",
+    "wal_monitor_in_worker",
+)
+
 
-def configure(db_path: str, source_folder: str = "") -> None:
-    """Set runtime paths before uvicorn imports `app`."""
+def configure(
+    db_path: str,
+    source_folder: str = "",
+    checkpoint_interval: float = 30.0,
+    wal_size_limit: int = 64 * 1024 * 1024,
+    watch_interval: float = 0.5,
+    watch_mode: str = "watch",
+    max_sse_clients: int = 1000,
+    query_timeout: float = 10.0,
+    wal_monitor_in_worker: bool = True,
+) -> None:
+    """
+    Set runtime paths, WAL checkpoint, change detection, SSE and query settings
+    before uvicorn imports `app`, here and in any worker process started later.
+    """
     STATE.db_path = db_path
     STATE.source_folder = source_folder
+    STATE.checkpoint_interval = checkpoint_interval
+    STATE.wal_size_limit = wal_size_limit
+    STATE.watch_interval = watch_interval
+    STATE.watch_mode = watch_mode
+    STATE.max_sse_clients = max_sse_clients
+    STATE.query_timeout = query_timeout
+    STATE.wal_monitor_in_worker = wal_monitor_in_worker
+    os.environ.update(config_environ())
+
+
+def config_environ() -> dict[str, str]:
+    """STATE's settings as BUG_TRAIL_* environment variables."""
+    environ = {}
+    for name in CONFIG_FIELDS:
+        value = getattr(STATE, name)
+        if isinstance(value, bool):
+            value = int(value)
+        environ[ENV_PREFIX + name.upper()] = str(value)
+    return environ
+
+
+def configure_from_env(environ: Mapping[str, str] | None = None) -> bool:
+    """
+    Load settings from BUG_TRAIL_* variables, as set by configure() in the parent process.
+
+    Args:
+        environ (Mapping[str, str] | None): Variables to read, default os.environ
+
+    Returns:
+        bool: Whether any setting was found
+    """
+    environ = os.environ if environ is None else environ
+    found = False
+    for name in CONFIG_FIELDS:
+        raw = environ.get(ENV_PREFIX + name.upper())
+        if raw is None:
+            continue
+        default = getattr(AppState, name)
+        try:
+            if isinstance(default, bool):
+                value: object = raw.strip().lower() not in ("", "0", "false", "no")
+            else:
+                value = type(default)(raw)
+        except ValueError:
+            logger.warning(
+                "Ignoring %s%s=%r: not a %s",
+                ENV_PREFIX,
+                name.upper(),
+                raw,
+                type(default).__name__,
+            )
+            continue
+        setattr(STATE, name, value)
+        found = True
+    return found
+
+
+configure_from_env()
 
 
 def _package_dir() -> str:
@@ -49,17 +168,62 @@ def _templates() -> Jinja2Templates:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    from bug_trail import data_code
+
     db_path = STATE.db_path
+    if db_path and os.path.exists(db_path):
+        data_code.ensure_log_indexes(db_path)
+        data_code.ensure_row_counts(db_path)
+        # First start on an older database indexes its logs; after that a no-op.
+        data_code.ensure_search_index(db_path)
+        data_code.ensure_rollups(db_path)
     if db_path:
-        watch_dir = os.path.dirname(os.path.abspath(db_path)) or "."
-        os.makedirs(watch_dir, exist_ok=True)
-        STATE.watcher = DbWatcher(watch_dir, os.path.basename(db_path))
+        STATE.read_pool = ReadPool(db_path, size=STATE.read_pool_size)
+        # One reader thread per pooled connection, so threads never wait on the pool.
+        async_data.configure_reader(
+            max_workers=STATE.read_pool_size, timeout=STATE.query_timeout
+        )
+        data_code.register_pool(STATE.read_pool)
+        STATE.page_cache = ResponseCache(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)) or ".", exist_ok=True)
+        STATE.watcher = DbWatcher(
+            db_path, interval=STATE.watch_interval, mode=STATE.watch_mode
+        )
         STATE.watcher.start()
-        logger.info("Watching %s for changes", watch_dir)
+        logger.info("Watching %s for changes (%s mode)", db_path, STATE.watch_mode)
+        if STATE.wal_monitor_in_worker:
+            STATE.wal_monitor = WalMonitor(
+                db_path,
+                interval=STATE.checkpoint_interval,
+                size_limit=STATE.wal_size_limit,
+            )
+            STATE.wal_monitor.start()
+        from bug_trail.routes.logs import render_log_rows
+
+        STATE.live_feed = LiveFeed(
+            db_path, render_rows=render_log_rows, max_subscribers=STATE.max_sse_clients
+        )
+        feed_task = asyncio.create_task(STATE.live_feed.run(STATE.watcher.subscribe()))
     yield
+    if STATE.live_feed is not None:
+        feed_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await feed_task
+        STATE.live_feed = None
+    if STATE.wal_monitor is not None:
+        STATE.wal_monitor.stop()
+        STATE.wal_monitor = None
     if STATE.watcher is not None:
         STATE.watcher.stop()
         STATE.watcher = None
+    if STATE.page_cache is not None:
+        STATE.page_cache.close()
+        STATE.page_cache = None
+    async_data.shutdown_reader()
+    if STATE.read_pool is not None:
+        data_code.unregister_pool(STATE.read_pool)
+        STATE.read_pool.close()
+        STATE.read_pool = None
 
 
 app = FastAPI(title="Bug Trail", lifespan=lifespan)
@@ -90,9 +254,85 @@ def render(request: Request, name: str, **extra):
     return templates.TemplateResponse(request, name, _ctx(request, **extra))
 
 
+# Characters of HTML per chunk written by render_stream; Jinja yields much smaller pieces.
+STREAM_CHUNK_SIZE = 32 * 1024
+
+
+async def render_stream(request: Request, name: str, **extra) -> StreamingResponse:
+    """
+    Render a template with standard context while the client reads it, so memory
+    and time to first byte don't grow with the page. The template runs on the
+    reader threads and may loop over row iterators from data_code (see
+    iter_table_rows), which query as the page is written.
+
+    The first chunk is rendered before returning, so a failure before any output
+    still gets an error response.
+    """
+    context = {"request": request, **_ctx(request, **extra)}
+    chunks = async_data.iterate(
+        _joined(templates.get_template(name).generate(context), STREAM_CHUNK_SIZE)
+    )
+    first = await anext(chunks, "")
+    return StreamingResponse(_stream_body(name, first, chunks), media_type="text/html")
+
+
+def _joined(parts: Iterable[str], size: int) -> Iterator[str]:
+    buffered: list[str] = []
+    length = 0
+    for part in parts:
+        buffered.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffered)
+            buffered.clear()
+            length = 0
+    if buffered:
+        yield "".join(buffered)
+
+
+async def _stream_body(
+    name: str, first: str, chunks: AsyncGenerator[str, None]
+) -> AsyncIterator[str]:
+    yield first
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:  # noqa: BLE001
+        # Headers are gone; all that can be done is stop, leaving the page cut short.
+        logger.exception("Rendering %s failed part way", name)
+    finally:
+        await chunks.aclose()
+
+
+def cached_page(max_age: float | None = None) -> Callable:
+    """
+    Serve an async route through STATE.page_cache: unchanged pages come from memory
+    or as 304s until the database changes. Routes must take `request` by keyword.
+
+    Args:
+        max_age (float | None): Seconds before re-rendering anyway, for pages with
+            relative times ("5 minutes ago") in them
+    """
+
+    def decorate(route: Callable) -> Callable:
+        @functools.wraps(route)
+        async def wrapper(*args, **kwargs):
+            cache = STATE.page_cache
+            request = kwargs.get("request")
+            if cache is None or request is None:
+                return await route(*args, **kwargs)
+            return await cache.serve(request, lambda: route(*args, **kwargs), max_age)
+
+        return wrapper
+
+    return decorate
+
+
 def _nav_active(path: str) -> str:
-    if path == "/" or path.startswith("/log/"):
+    if path == "/" or path.startswith("/log/") or path.startswith("/search"):
         return "main"
+    if path.startswith("/locals"):
+        return "locals"
     if path.startswith("/environment"):
         return "environment"
     if path.startswith("/system"):
@@ -107,13 +347,30 @@ def _nav_active(path: str) -> str:
 # Import routes to register endpoints. Imports are at the bottom so that
 # `app` is defined and available to the route modules.
 from bug_trail.routes import admin as _admin_routes  # noqa: E402,F401
-from bug_trail.routes import \
-    environment as _environment_routes  # noqa: E402,F401
+from bug_trail.routes import charts as _charts_routes  # noqa: E402,F401
+from bug_trail.routes import environment as _environment_routes  # noqa: E402,F401
 from bug_trail.routes import events as _events_routes  # noqa: E402,F401
+from bug_trail.routes import frames as _frames_routes  # noqa: E402,F401
 from bug_trail.routes import help as _help_routes  # noqa: E402,F401
+from bug_trail.routes import local_values as _local_values_routes  # noqa: E402,F401
 from bug_trail.routes import logs as _logs_routes  # noqa: E402,F401
+from bug_trail.routes import search as _search_routes  # noqa: E402,F401
+
+
+@app.exception_handler(QueryTimeout)
+async def query_timeout(request: Request, error: QueryTimeout) -> Response:
+    logger.warning("%s %s: %s", request.method, request.url.path, error)
+    return HTMLResponse(
+        "The database took too long to answer. Try again shortly.", status_code=504
+    )
+
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected(request: Request, error: ClientDisconnected) -> Response:
+    # Nobody is listening; 499 as in nginx, for the access log.
+    return Response(status_code=499)
 
 
 @app.get("/health", response_class=HTMLResponse)
-def health() -> str:
+async def health() -> str:
     return "ok"
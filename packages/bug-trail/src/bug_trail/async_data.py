@@ -0,0 +1,235 @@
+"""
+Coroutines over the blocking data layer, for the async routes.
+
+Blocking functions (anything using `data_code.read_connection`) run on a
+dedicated, sized thread pool rather than Starlette's shared one. Each call
+has a timeout, and when it times out, is cancelled, or the client
+disconnects, the SQLite statements it is running are interrupted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+from collections.abc import AsyncGenerator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from starlette.requests import Request
+
+from bug_trail.data_code import CURRENT_QUERY, QueryHandle
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimeout(Exception):
+    """A query ran past its timeout and was interrupted."""
+
+
+class ClientDisconnected(Exception):
+    """The client went away while its query ran; the query was interrupted."""
+
+
+class AsyncReader:
+    """A thread pool for blocking reads, with timeouts and interruption."""
+
+    def __init__(self, max_workers: int = 8, timeout: float | None = 10.0) -> None:
+        """
+        Args:
+            max_workers (int): Reader threads, i.e. queries running at once
+            timeout (float | None): Default seconds before a query is interrupted
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.timeouts = 0
+        self.interrupted = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="bug-trail-reader"
+        )
+
+    async def run[T](
+        self,
+        function: Callable[..., T],
+        *args: Any,
+        request: Request | None = None,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Run `function(*args, **kwargs)` on a reader thread.
+
+        Args:
+            function (Callable[..., T]): Blocking function to run
+            *args: Positional arguments for `function`
+            request (Request | None): Interrupt the query if this client disconnects.
+                Only for requests without a body; this reads the ASGI receive channel.
+            timeout (float | None): Seconds before interrupting, default self.timeout;
+                0 waits however long it takes (for writes)
+            **kwargs: Keyword arguments for `function`
+
+        Raises:
+            QueryTimeout: The timeout passed
+            ClientDisconnected: The client disconnected
+        """
+        handle = QueryHandle()
+        context = contextvars.copy_context()
+        context.run(CURRENT_QUERY.set, handle)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor, functools.partial(context.run, function, *args, **kwargs)
+        )
+        waiting: set[asyncio.Future[Any]] = {future}
+        disconnect = None
+        if request is not None:
+            disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+            waiting.add(disconnect)
+        limit = self.timeout if timeout is None else timeout or None
+        try:
+            done, _ = await asyncio.wait(
+                waiting, timeout=limit, return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            self._interrupt(handle)
+            raise
+        finally:
+            if disconnect is not None:
+                disconnect.cancel()
+        if future in done:
+            return future.result()
+        self._interrupt(handle)
+        # Don't log the interrupted query's own error as unretrieved.
+        future.add_done_callback(_consume_result)
+        if disconnect is not None and disconnect in done:
+            raise ClientDisconnected(getattr(function, "__name__", repr(function)))
+        self.timeouts += 1
+        raise QueryTimeout(
+            f"{getattr(function, '__name__', repr(function))} took over {limit}s"
+        )
+
+    async def iterate[T](
+        self, iterator: Iterator[T], timeout: float | None = None
+    ) -> AsyncGenerator[T, None]:
+        """
+        Advance `iterator` on reader threads, one item per call, for responses that
+        stream. Its queries share one QueryHandle: a timeout (per item) or
+        cancellation (the client went away) interrupts whichever one is running.
+
+        Args:
+            iterator (Iterator[T]): Blocking iterator, e.g. a template's generate()
+            timeout (float | None): Seconds allowed per item, default self.timeout
+
+        Raises:
+            QueryTimeout: An item took longer than the timeout
+        """
+        handle = QueryHandle()
+        context = contextvars.copy_context()
+        context.run(CURRENT_QUERY.set, handle)
+        loop = asyncio.get_running_loop()
+        limit = self.timeout if timeout is None else timeout or None
+        future: asyncio.Future[Any] | None = None
+        try:
+            while True:
+                future = loop.run_in_executor(
+                    self._executor,
+                    functools.partial(context.run, next, iterator, _EXHAUSTED),
+                )
+                try:
+                    done, _ = await asyncio.wait({future}, timeout=limit)
+                except asyncio.CancelledError:
+                    self._interrupt(handle)
+                    raise
+                if not done:
+                    self._interrupt(handle)
+                    self.timeouts += 1
+                    raise QueryTimeout(
+                        f"streaming {iterator!r} took over {limit}s for one item"
+                    )
+                item = future.result()
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            if future is None or future.done():
+                _close(iterator)
+            else:
+                # Still running on a reader thread; a generator can't be closed mid-step.
+                future.add_done_callback(_consume_result)
+                future.add_done_callback(lambda _: _close(iterator))
+
+    def _interrupt(self, handle: QueryHandle) -> None:
+        self.interrupted += 1
+        handle.interrupt()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _consume_result(future: asyncio.Future[Any]) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+# next()'s default once an iterator is exhausted; StopIteration can't cross a Future.
+_EXHAUSTED = object()
+
+
+def _close(iterator: Iterator[Any]) -> None:
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+_reader: AsyncReader | None = None
+
+
+def configure_reader(max_workers: int = 8, timeout: float | None = 10.0) -> AsyncReader:
+    """Replace the process-wide reader, e.g. from the app's lifespan."""
+    global _reader
+    if _reader is not None:
+        _reader.shutdown()
+    _reader = AsyncReader(max_workers=max_workers, timeout=timeout)
+    return _reader
+
+
+def shutdown_reader() -> None:
+    global _reader
+    if _reader is not None:
+        _reader.shutdown()
+        _reader = None
+
+
+def reader() -> AsyncReader:
+    """The process-wide reader, created with defaults on first use."""
+    global _reader
+    if _reader is None:
+        _reader = AsyncReader()
+    return _reader
+
+
+async def query[T](
+    function: Callable[..., T],
+    *args: Any,
+    request: Request | None = None,
+    timeout: float | None = None,
+    **kwargs: Any,
+) -> T:
+    """AsyncReader.run on the process-wide reader."""
+    return await reader().run(
+        function, *args, request=request, timeout=timeout, **kwargs
+    )
+
+
+def iterate[T](
+    iterator: Iterator[T], timeout: float | None = None
+) -> AsyncGenerator[T, None]:
+    """AsyncReader.iterate on the process-wide reader."""
+    return reader().iterate(iterator, timeout=timeout)
@@ -0,0 +1,122 @@
+"""
+Fan-out of SSE messages to many subscribers with bounded memory.
+
+Every subscriber has a small buffer. A message that is already waiting in a
+buffer is not queued twice, and a buffer that overflows collapses into a
+single "refresh", so a stalled client costs at most `max_buffer` messages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+
+
+class HubFull(Exception):
+    """Raised by subscribe() when the hub already has max_subscribers."""
+
+
+class Subscription:
+    """One subscriber's buffer. Read it from the event loop the hub publishes on."""
+
+    def __init__(self, max_buffer: int, overflow_message: str) -> None:
+        self.max_buffer = max_buffer
+        self.overflow_message = overflow_message
+        self.dropped = 0
+        self._buffer: deque[str] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, message: str) -> None:
+        if message in self._buffer:
+            return
+        if len(self._buffer) >= self.max_buffer:
+            # Too far behind for increments to help: start over from a reload.
+            self.dropped += len(self._buffer)
+            self._buffer.clear()
+            message = self.overflow_message
+        self._buffer.append(message)
+        self._ready.set()
+
+    def empty(self) -> bool:
+        return not self._buffer
+
+    def qsize(self) -> int:
+        return len(self._buffer)
+
+    def get_nowait(self) -> str:
+        if not self._buffer:
+            raise asyncio.QueueEmpty
+        message = self._buffer.popleft()
+        if not self._buffer:
+            self._ready.clear()
+        return message
+
+    async def get(self) -> str:
+        """Wait for the next message. Safe to cancel (e.g. by asyncio.wait_for)."""
+        while not self._buffer:
+            await self._ready.wait()
+        return self.get_nowait()
+
+
+class BroadcastHub:
+    """Subscriptions plus a publish that touches each of them once."""
+
+    def __init__(
+        self,
+        max_buffer: int = 16,
+        max_subscribers: int | None = None,
+        overflow_message: str = "refresh",
+    ) -> None:
+        """
+        Args:
+            max_buffer (int): Messages kept per subscriber before it overflows
+            max_subscribers (int | None): Cap on concurrent subscribers, None for no cap
+            overflow_message (str): What an overflowing buffer collapses into
+        """
+        self.max_buffer = max_buffer
+        self.max_subscribers = max_subscribers
+        self.overflow_message = overflow_message
+        self._subscriptions: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Guards the set; subscribe/unsubscribe can come from other threads.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """The loop subscribers read on, for publish_threadsafe."""
+        self._loop = loop
+
+    def subscribe(self) -> Subscription:
+        with self._lock:
+            if (
+                self.max_subscribers is not None
+                and len(self._subscriptions) >= self.max_subscribers
+            ):
+                raise HubFull(f"{len(self._subscriptions)} subscribers already")
+            subscription = Subscription(self.max_buffer, self.overflow_message)
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, message: str) -> None:
+        """Deliver to every subscriber. Call on the subscribers' event loop."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.push(message)
+
+    def publish_threadsafe(self, message: str) -> None:
+        """publish() from another thread: one loop wakeup however many subscribers there are."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self.publish, message)
+        except RuntimeError:
+            # Loop closed during shutdown
+            pass
@@ -2,17 +2,47 @@
 Functions to fetch data from the SQLite database.
 """
 
+from __future__ import annotations
+
 import logging
+import os
+import re
 import sqlite3
+import threading
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields, replace
 from typing import Any
 
-from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.exceptions import (
+    create_exception_indexes,
+    create_traceback_info_table,
+)
+from bug_trail_core.handlers import BaseErrorLogHandler, create_logs_indexes
+from bug_trail_core.locals_index import (
+    LOCALS_TABLE,
+    LOCALS_VALUE_LIMIT,
+    locals_index_exists,
+)
+from bug_trail_core.promoted_keys import PROMOTED_PREFIX, promoted_columns
+from bug_trail_core.rollups import (
+    ROLLUP_DIMENSIONS,
+    ROLLUP_RESOLUTIONS,
+    ROLLUP_TABLE,
+    create_rollups,
+)
+from bug_trail_core.row_counts import create_table_stats, read_counts
+from bug_trail_core.search_index import SEARCH_TABLE, create_search_index
+
+from bug_trail.db_pool import ReadPool
 
 logger = logging.getLogger(__name__)
 
 ALL_TABLES = [
     "exception_instance",
     "exception_type",
+    "handler_stats",
     "logs",
     "python_libraries",
     "system_info",
@@ -35,27 +65,304 @@ ENTIRE_LOG_SET = (
     "ORDER BY created DESC"
 )
 
+# Same columns as ENTIRE_LOG_SET, for one page of logs picked in the subquery.
+# The subquery walks ix_logs_created, so a page costs the same at any depth. It
+# only reads rowids, so when a filter's index needs a sort, the sort runs on
+# index entries and just the page's rows are read from the table.
+LOG_PAGE_SET = (
+    "SELECT logs.*, "
+    "exception_instance.args as exception_args, "
+    "exception_instance.str_repr as exception_str, "
+    "exception_instance.comments as comments, "
+    "exception_type.name as exception_name, "
+    "exception_type.docstring as exception_docstring, "
+    "exception_type.hierarchy as exception_hierarchy "
+    "FROM (SELECT logs.rowid AS page_rowid FROM logs {where} "
+    "ORDER BY logs.created {order}, logs.record_id {order} LIMIT ?) AS page "
+    "JOIN logs ON logs.rowid = page.page_rowid "
+    "left outer join exception_instance "
+    "on logs.record_id = exception_instance.record_id "
+    "left outer join exception_type "
+    "on exception_instance.type_id = exception_type.id "
+    "ORDER BY logs.created DESC, logs.record_id DESC"
+)
+
+# Rows written after a rowid high-water mark, for the live feed. Insertion order,
+# newest first, so a client can prepend them as they come.
+LOG_SINCE_SET = (
+    "SELECT logs.*, "
+    "exception_instance.args as exception_args, "
+    "exception_instance.str_repr as exception_str, "
+    "exception_instance.comments as comments, "
+    "exception_type.name as exception_name, "
+    "exception_type.docstring as exception_docstring, "
+    "exception_type.hierarchy as exception_hierarchy "
+    "FROM (SELECT rowid AS log_rowid, * FROM logs WHERE rowid > ? ORDER BY rowid LIMIT ?) AS logs "
+    "left outer join exception_instance "
+    "on logs.record_id = exception_instance.record_id "
+    "left outer join exception_type "
+    "on exception_instance.type_id = exception_type.id "
+    "ORDER BY logs.log_rowid DESC"
+)
+
+
+# One record for the detail page, by primary key or the legacy created|filename|lineno key.
+LOG_DETAIL_SET = (
+    "SELECT logs.*, "
+    "exception_instance.args as exception_args, "
+    "exception_instance.str_repr as exception_str, "
+    "exception_instance.comments as comments, "
+    "exception_type.name as exception_name, "
+    "exception_type.docstring as exception_docstring, "
+    "exception_type.hierarchy as exception_hierarchy "
+    "FROM logs "
+    "left outer join exception_instance "
+    "on logs.record_id = exception_instance.record_id "
+    "left outer join exception_type "
+    "on exception_instance.type_id = exception_type.id "
+    "WHERE {where} "
+    "ORDER BY logs.created DESC, logs.record_id DESC LIMIT 1"
+)
+
+# Full-text matches with an excerpt around the hits. The excerpt's markers are
+# control characters so the text can be HTML-escaped before they become <mark>.
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+LOG_SEARCH_SET = (
+    "SELECT logs.rowid AS log_rowid, logs.record_id, logs.created, logs.msecs, "
+    "logs.levelname, logs.name, logs.module, logs.funcName, logs.filename, logs.lineno, "
+    "logs.msg, logs.args, "
+    f"snippet({SEARCH_TABLE}, -1, ?, ?, '…', 24) AS snippet "
+    f"FROM {SEARCH_TABLE} JOIN logs ON logs.rowid = {SEARCH_TABLE}.rowid "
+    f"WHERE {SEARCH_TABLE} MATCH ? AND {SEARCH_TABLE}.rowid >= ? "
+    "ORDER BY {order} LIMIT ? OFFSET ?"
+)
+# "rank" is bm25 with the weights create_search_index configured; rowid order
+# reads the doclists in index order and stops at LIMIT, however common the words.
+SEARCH_ORDERS = {"rank": "rank", "newest": f"{SEARCH_TABLE}.rowid DESC"}
+# Matches counted, ranked and paged through at most: the newest this many. Past
+# it the count shows as "1000+" and ranking a million matches never happens.
+SEARCH_MATCH_CAP = 1000
+
+
+# One page of local_values matches, newest first, with their log records.
+LOCALS_SEARCH_SET = (
+    "SELECT page.frame_id, page.name AS local_name, page.value AS local_value, "
+    "traceback_info.frame_number, logs.record_id, logs.created, logs.msecs, logs.levelname, "
+    "logs.name, logs.filename, logs.lineno, logs.msg, logs.args "
+    f"FROM (SELECT name, value, frame_id FROM {LOCALS_TABLE} WHERE {{where}} "
+    "ORDER BY frame_id DESC LIMIT ?) AS page "
+    "JOIN traceback_info ON traceback_info.id = page.frame_id "
+    "JOIN logs ON logs.record_id = traceback_info.exception_instance_id "
+    "ORDER BY page.frame_id DESC"
+)
+LOCALS_OPERATORS = ("=", "<", "<=", ">", ">=")
+# Matches counted at most; past it the count shows as "1000+".
+LOCALS_MATCH_CAP = 1000
+
+# Values given their own chart series; the rest are summed.
+ROLLUP_TOP = 6
+
+# A record's frames without their locals and globals; ix_traceback_info_instance covers it.
+FRAME_LIST_SET = (
+    "SELECT frame_number, filename, function, lineno FROM traceback_info "
+    "WHERE exception_instance_id = ? ORDER BY frame_number LIMIT ? OFFSET ?"
+)
+FRAME_SCOPES = {"locals": "f_locals", "globals": "f_globals"}
+# Characters of each value in a listing of a frame's locals or globals.
+FRAME_PREVIEW_LIMIT = 200
+# Characters of one value shown when expanded in full.
+FRAME_VALUE_LIMIT = 100_000
+# Most entries listed per request.
+FRAME_ENTRY_LIMIT = 100
+# The `File "x", line N, in f` lines of a formatted traceback.
+_TRACEBACK_FRAME = re.compile(
+    r'^  File "(?P<filename>.*)", line (?P<lineno>\d+), in (?P<function>.*)$',
+    re.MULTILINE,
+)
+
+
+@dataclass(frozen=True)
+class LogCursor:
+    """Position in the log list: the (created, record_id) of a row."""
+
+    created: float
+    record_id: str
+
+    def encode(self) -> str:
+        """URL form, `created:record_id`. repr() round-trips the float exactly."""
+        return f"{self.created!r}:{self.record_id}"
+
+    @classmethod
+    def decode(cls, value: str) -> LogCursor:
+        """Parse `encode` output. Raises ValueError on anything else."""
+        created, _, record_id = value.partition(":")
+        if not record_id:
+            raise ValueError(f"Bad cursor {value!r}")
+        return cls(float(created), record_id)
+
+    @classmethod
+    def of(cls, row: dict[str, Any]) -> LogCursor:
+        """Cursor for a row returned by fetch_log_page."""
+        return cls(row["created"], row["record_id"])
+
+
+@dataclass(frozen=True)
+class LogFilter:
+    """
+    Server-side filters for the log list. None means "don't filter on this".
+
+    Each filter becomes a parameterized condition that an index can serve:
+    module, logger name and level have (column, created, record_id) indexes,
+    so a filtered page is still read in list order; exception type goes
+    through the exception tables' indexes; the time window is a range of
+    ix_logs_created. A promoted extra key (see bug_trail_core.promoted_keys)
+    is looked up in its own index; any other user_data key narrows a walk of
+    ix_logs_created.
+    """
+
+    min_level: int | None = None
+    max_level: int | None = None
+    # Logger name prefix: "app" matches "app", "app.db" and "apple"
+    logger: str | None = None
+    module: str | None = None
+    # exception_type.name, e.g. "KeyError"
+    exception: str | None = None
+    # Unix times, since inclusive and until exclusive
+    since: float | None = None
+    until: float | None = None
+    # A top-level key in the record's extra fields and its value, compared as text
+    user_key: str | None = None
+    user_value: str | None = None
+    # The generated column for user_key when it is promoted, set by `promoted`
+    user_column: str | None = None
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, field.name) is not None for field in fields(self))
+
+    def json_only(self) -> bool:
+        """True when an unpromoted user_data key is the only filter, which no index covers."""
+        return (
+            bool(self.user_key)
+            and not self.user_column
+            and not replace(self, user_key=None, user_value=None)
+        )
+
+    def promoted(self, columns: dict[str, str]) -> LogFilter:
+        """
+        This filter reading user_key from its generated column, if the database has one.
+
+        Args:
+            columns (dict[str, str]): From fetch_promoted_keys
+        """
+        if not self.user_key:
+            return self
+        return replace(self, user_column=columns.get(self.user_key))
+
+    def where(self) -> tuple[list[str], list[Any]]:
+        """SQL conditions on `logs` (to be ANDed) and their parameters."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        if self.min_level is not None:
+            clauses.append("logs.levelno >= ?")
+            params.append(self.min_level)
+        if self.max_level is not None:
+            clauses.append("logs.levelno <= ?")
+            params.append(self.max_level)
+        if self.logger:
+            # A range rather than LIKE, which would need case_sensitive_like to use the index.
+            clauses.append("logs.name >= ? AND logs.name < ?")
+            params.extend([self.logger, _prefix_upper_bound(self.logger)])
+        if self.module is not None:
+            clauses.append("logs.module = ?")
+            params.append(self.module)
+        if self.exception is not None:
+            clauses.append(
+                "logs.record_id IN (SELECT exception_instance.record_id FROM exception_instance "
+                "JOIN exception_type ON exception_type.id = exception_instance.type_id "
+                "WHERE exception_type.name = ?)"
+            )
+            params.append(self.exception)
+        if self.since is not None:
+            clauses.append("logs.created >= ?")
+            params.append(self.since)
+        if self.until is not None:
+            clauses.append("logs.created < ?")
+            params.append(self.until)
+        if self.user_column:
+            # The column has TEXT affinity, so this matches what the CAST below would.
+            # `=` rather than IS lets the partial (IS NOT NULL) index serve it.
+            clauses.append(
+                f'logs."{self.user_column}" {"IS" if self.user_value is None else "="} ?'
+            )
+            params.append(self.user_value)
+        elif self.user_key:
+            clauses.append("CAST(json_extract(logs.user_data, ?) AS TEXT) IS ?")
+            params.extend(
+                ['$."' + self.user_key.replace('"', '\\"') + '"', self.user_value]
+            )
+        return clauses, params
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """The smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _and_where(clauses: list[str], filters: LogFilter | None) -> tuple[str, list[Any]]:
+    """`WHERE a AND b ...` from keyset clauses plus the filter's, and the filter's parameters."""
+    params: list[Any] = []
+    if filters:
+        filter_clauses, params = filters.where()
+        clauses = clauses + filter_clauses
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def count_logs(
+    db_path: str, filters: LogFilter | None = None, cap: int | None = None
+) -> int:
+    """
+    Rows matching `filters`, counting at most `cap` + 1 of them.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        filters (LogFilter | None): None or empty for every row (the cached count)
+        cap (int | None): Stop counting past this, for filters matching most of a large table
+    """
+    if not filters:
+        return table_row_count(db_path, "logs")
+    query, params = _count_query(filters, cap)
+    with read_connection(db_path) as conn:
+        cursor = conn.cursor()
+        execute_safely(cursor, query, db_path, params)
+        return cursor.fetchone()[0]
+
+
+def _count_query(filters: LogFilter, cap: int | None) -> tuple[str, list[Any]]:
+    where, params = _and_where([], filters)
+    query = f"SELECT 1 FROM logs {where}"
+    if filters.json_only():
+        # Along ix_logs_created, like the page, rather than a scan of the table.
+        query += " ORDER BY logs.created DESC"
+    if cap is not None:
+        query += " LIMIT ?"
+        params.append(cap + 1)
+    return f"SELECT count(*) FROM ({query})", params
+
 
 def table_row_count(db_path: str, table_name: str) -> int:
     if table_name not in ALL_TABLES:
         raise TypeError("Bad table name.")
-    conn = connect(db_path)
-    try:
+    with read_connection(db_path) as conn:
+        # Maintained by triggers, see bug_trail_core.row_counts
+        cached = read_counts(conn).get(table_name)
+        if cached is not None:
+            return cached
         cursor = conn.cursor()
-    except sqlite3.ProgrammingError as ex:
-        if "closed" in str(ex):
-            # unexpectedly closed.
-            conn = connect(db_path)
-            cursor = conn.cursor()
-        else:
-            raise
-
-    # table name restricted above
-    cursor.execute(f"SELECT count(*) FROM {table_name};")  # nosec
-    try:
-        return cursor.fetchone()[0]
-    except IndexError:
-        return 0
+        # table name restricted above
+        execute_safely(cursor, f"SELECT count(*) FROM {table_name};", db_path)  # nosec
+        row = cursor.fetchone()
+    return row[0] if row else 0
 
 
 def connect(db_path: str) -> sqlite3.Connection:
@@ -64,6 +371,89 @@ def connect(db_path: str) -> sqlite3.Connection:
     return sqlite3.connect(db_path)
 
 
+# Read pools registered by the running viewer, by database path.
+_POOLS: dict[str, ReadPool] = {}
+
+
+def register_pool(pool: ReadPool) -> None:
+    """Serve reads of `pool.db_path` from `pool` until unregistered."""
+    _POOLS[pool.db_path] = pool
+
+
+def unregister_pool(pool: ReadPool) -> None:
+    if _POOLS.get(pool.db_path) is pool:
+        del _POOLS[pool.db_path]
+
+
+class QueryHandle:
+    """
+    The connections one unit of work (see bug_trail.async_data) is using, so
+    another thread can stop it with `sqlite3.Connection.interrupt`.
+    """
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._connections: set[sqlite3.Connection] = set()
+        # Held while interrupting so a connection can't go back to the pool mid-call.
+        self._lock = threading.Lock()
+
+    def attach(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise sqlite3.OperationalError("interrupted")
+            self._connections.add(conn)
+
+    def detach(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._connections.discard(conn)
+
+    def interrupt(self) -> None:
+        """Abort running statements and refuse new connections."""
+        with self._lock:
+            self.cancelled = True
+            for conn in self._connections:
+                conn.interrupt()
+
+
+# Set by async_data for the duration of a query running on its reader threads.
+CURRENT_QUERY: ContextVar[QueryHandle | None] = ContextVar(
+    "bug_trail_query", default=None
+)
+
+
+@contextmanager
+def _interruptible(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    handle = CURRENT_QUERY.get()
+    if handle is None:
+        yield conn
+        return
+    handle.attach(conn)
+    try:
+        yield conn
+    finally:
+        handle.detach(conn)
+
+
+@contextmanager
+def read_connection(db_path: str) -> Iterator[sqlite3.Connection]:
+    """
+    A connection for reading `db_path`: pooled and read-only while the viewer is
+    running, otherwise a fresh one that is closed afterwards.
+    """
+    pool = _POOLS.get(db_path)
+    # mode=ro can't create the file; let connect() do that as it always has.
+    if pool is not None and os.path.exists(db_path):
+        with pool.checkout() as conn, _interruptible(conn):
+            yield conn
+        return
+    conn = connect(db_path)
+    try:
+        with _interruptible(conn):
+            yield conn
+    finally:
+        conn.close()
+
+
 def fetch_log_data(
     db_path: str, limit: int = -1, offset: int = -1
 ) -> list[dict[str, Any]]:
@@ -79,38 +469,604 @@ def fetch_log_data(
     Returns:
         list[dict[str, Any]]: A list of dictionaries containing all log records
     """
-    # Connect to the SQLite database
-    conn = connect(db_path)
-    logger.debug(f"Connected to {db_path}")
-    try:
-        cursor = conn.cursor()
-    except sqlite3.ProgrammingError as ex:
-        if "closed" in str(ex):
-            # unexpectedly closed.
-            conn = connect(db_path)
-            cursor = conn.cursor()
-        else:
-            raise
-
     # Query to fetch all rows from the logs table
     query = ENTIRE_LOG_SET
+    params: tuple[int, ...] = ()
     if limit != -1:
-        query += f" LIMIT {limit} OFFSET {offset}"
-    execute_safely(cursor, query, db_path)
+        query += " LIMIT ? OFFSET ?"
+        params = (limit, offset)
+    with read_connection(db_path) as conn:
+        cursor = conn.cursor()
+        execute_safely(cursor, query, db_path, params)
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+
+    # Convert each row to a dictionary
+    return [dict(zip(columns, row, strict=True)) for row in rows]
+
+
+def fetch_log_page(
+    db_path: str,
+    limit: int = 100,
+    before: LogCursor | None = None,
+    after: LogCursor | None = None,
+    oldest: bool = False,
+    filters: LogFilter | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Fetch one page of log records, newest first, by keyset rather than OFFSET.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        limit (int): Page size
+        before (LogCursor): Rows older than this (the next page)
+        after (LogCursor): Rows newer than this (the previous page)
+        oldest (bool): The last page, i.e. the oldest `limit` rows
+        filters (LogFilter | None): Only rows matching these
+
+    Returns:
+        list[dict[str, Any]]: Rows shaped like fetch_log_data's
+    """
+    params: list[Any] = []
+    clauses: list[str] = []
+    # Walk the index towards the rows we want; the outer query restores newest-first.
+    order = "DESC"
+    if before is not None:
+        clauses = ["(logs.created, logs.record_id) < (?, ?)"]
+        params = [before.created, before.record_id]
+    elif after is not None:
+        clauses = ["(logs.created, logs.record_id) > (?, ?)"]
+        params = [after.created, after.record_id]
+        order = "ASC"
+    elif oldest:
+        order = "ASC"
+    where, filter_params = _and_where(clauses, filters)
+    params.extend(filter_params)
+    params.append(limit)
+
+    with read_connection(db_path) as conn:
+        cursor = conn.cursor()
+        execute_safely(
+            cursor, LOG_PAGE_SET.format(where=where, order=order), db_path, params
+        )
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+
+
+def fetch_log_keys(
+    db_path: str,
+    start: LogCursor,
+    count: int,
+    older: bool = True,
+    filters: LogFilter | None = None,
+) -> list[LogCursor]:
+    """
+    Cursors of the `count` rows past `start`, read from the index alone.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        start (LogCursor): Exclusive starting point
+        count (int): Most keys to return
+        older (bool): Walk towards older rows (True) or newer rows (False)
+        filters (LogFilter | None): Only rows matching these
+
+    Returns:
+        list[LogCursor]: Nearest to `start` first
+    """
+    comparison, order = ("<", "DESC") if older else (">", "ASC")
+    where, filter_params = _and_where(
+        [f"(logs.created, logs.record_id) {comparison} (?, ?)"], filters
+    )
+    query = (
+        f"SELECT logs.created, logs.record_id FROM logs {where} "
+        f"ORDER BY logs.created {order}, logs.record_id {order} LIMIT ?"
+    )
+    with read_connection(db_path) as conn:
+        cursor = conn.cursor()
+        execute_safely(
+            cursor,
+            query,
+            db_path,
+            [start.created, start.record_id, *filter_params, count],
+        )
+        return [
+            LogCursor(created, record_id) for created, record_id in cursor.fetchall()
+        ]
+
+
+def max_log_rowid(db_path: str) -> int:
+    """Highest rowid in logs, 0 when empty. One step down the rowid b-tree."""
+    with read_connection(db_path) as conn:
+        try:
+            row = conn.execute("SELECT max(rowid) FROM logs").fetchone()
+        except sqlite3.OperationalError:
+            # No logs table yet
+            return 0
+    return row[0] or 0
 
-    # Fetching column names from the cursor
-    columns = [description[0] for description in cursor.description]
 
-    # Fetch all rows, and convert each row to a dictionary
-    rows = cursor.fetchall()
-    log_data = []
-    for row in rows:
-        log_record = dict(zip(columns, row, strict=True))
-        log_data.append(log_record)
+def fetch_logs_since(
+    db_path: str, rowid: int, limit: int = 100
+) -> list[dict[str, Any]]:
+    """
+    Log records inserted after `rowid`, newest first.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        rowid (int): High-water mark, e.g. from max_log_rowid
+        limit (int): Most rows returned, the oldest `limit` after the mark
+
+    Returns:
+        list[dict[str, Any]]: Rows shaped like fetch_log_page's plus `log_rowid`
+    """
+    with read_connection(db_path) as conn:
+        cursor = conn.cursor()
+        execute_safely(cursor, LOG_SINCE_SET, db_path, (rowid, limit))
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+
+
+def ensure_log_indexes(db_path: str) -> None:
+    """Add indexes the viewer relies on to databases written by older handlers."""
+    conn = connect(db_path)
+    try:
+        create_logs_indexes(conn)
+        # Frame locations are columns older handlers didn't write.
+        create_traceback_info_table(conn)
+        create_exception_indexes(conn)
+        conn.commit()
+    except sqlite3.OperationalError as error:
+        # No logs table yet (a handler will create it with the indexes), or read-only.
+        logger.debug("Could not create log indexes: %s", error)
+    finally:
+        conn.close()
+
+
+def fetch_promoted_keys(db_path: str) -> dict[str, str]:
+    """Extra keys with their own indexed column in this database, mapped to the column."""
+    with read_connection(db_path) as conn:
+        try:
+            return promoted_columns(conn)
+        except sqlite3.OperationalError:
+            return {}
+
+
+def ensure_row_counts(db_path: str) -> None:
+    """Add table_stats and its triggers to databases written by older handlers."""
+    conn = connect(db_path)
+    try:
+        create_table_stats(conn)
+        conn.commit()
+    except sqlite3.OperationalError as error:
+        logger.debug("Could not create table_stats: %s", error)
+    finally:
+        conn.close()
+
+
+def search_query(text: str) -> str:
+    """
+    An FTS5 MATCH expression for what someone typed: every word must appear.
+
+    Words are quoted, so punctuation in tracebacks ("KeyError:", "a.b()") is
+    searched for rather than read as query syntax. A trailing * matches prefixes.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_logs(
+    db_path: str, text: str, limit: int = 50, offset: int = 0, order: str = "rank"
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Log records matching `text` in their message, traceback or exception.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        text (str): Words to look for, see search_query
+        limit (int): Most rows returned
+        offset (int): Rows skipped, for paging
+        order (str): "rank" (best match first) or "newest"
+
+    Returns:
+        tuple[list[dict[str, Any]], int]: The rows, each with a `snippet`, and the
+            number of matches up to SEARCH_MATCH_CAP + 1. Past the cap only the newest
+            SEARCH_MATCH_CAP matches are ranked and returned.
+
+    Raises:
+        sqlite3.OperationalError: No search index (SQLite without FTS5)
+    """
+    match = search_query(text)
+    if not match:
+        return [], 0
+    sql = LOG_SEARCH_SET.format(order=SEARCH_ORDERS.get(order, SEARCH_ORDERS["rank"]))
+    with read_connection(db_path) as conn:
+        # Newest-first rowids of the matches, one past the cap: cheap, FTS5 walks doclists in rowid order.
+        newest = [
+            row[0]
+            for row in conn.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? ORDER BY rowid DESC LIMIT ?",  # nosec
+                (match, SEARCH_MATCH_CAP + 1),
+            )
+        ]
+        total = len(newest)
+        floor = newest[SEARCH_MATCH_CAP - 1] if total > SEARCH_MATCH_CAP else 0
+        cursor = conn.execute(
+            sql, (SNIPPET_START, SNIPPET_END, match, floor, limit, offset)
+        )
+        columns = [description[0] for description in cursor.description]
+        rows = [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+    return rows, total
+
+
+def ensure_search_index(db_path: str) -> bool:
+    """Add the full-text index to databases written by older handlers, indexing their logs."""
+    conn = connect(db_path)
+    try:
+        available = create_search_index(conn)
+        conn.commit()
+        return available
+    except sqlite3.OperationalError as error:
+        logger.debug("Could not create the search index: %s", error)
+        return False
+    finally:
+        conn.close()
+
+
+def ensure_rollups(db_path: str) -> None:
+    """Add the chart rollups to databases written by older handlers, counting their logs."""
+    conn = connect(db_path)
+    try:
+        create_rollups(conn)
+        conn.commit()
+    except sqlite3.OperationalError as error:
+        logger.debug("Could not create the rollups: %s", error)
+    finally:
+        conn.close()
+
+
+def fetch_rollups(
+    db_path: str,
+    resolution: str,
+    dimension: str,
+    buckets: int,
+    end: float,
+    top: int = ROLLUP_TOP,
+) -> dict[str, Any]:
+    """
+    Record counts per bucket up to the one holding `end`, read from log_rollups only.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        resolution (str): A key of ROLLUP_RESOLUTIONS
+        dimension (str): One of ROLLUP_DIMENSIONS
+        buckets (int): How many buckets, the last one holding `end`
+        end (float): Unix time
+        top (int): Values with their own series, by total; the rest are summed as `other`
+
+    Returns:
+        dict[str, Any]: `buckets` (start times), `series` (value, counts, total), `other`
+            and `totals` (counts per bucket)
+
+    Raises:
+        ValueError: An unknown resolution or dimension
+    """
+    if resolution not in ROLLUP_RESOLUTIONS or dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(
+            f"Unknown resolution {resolution!r} or dimension {dimension!r}"
+        )
+    seconds = ROLLUP_RESOLUTIONS[resolution]
+    last = int(end // seconds) * seconds
+    first = last - (buckets - 1) * seconds
+    with read_connection(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT value, bucket, count FROM {ROLLUP_TABLE} "  # nosec
+            "WHERE resolution = ? AND dimension = ? AND bucket BETWEEN ? AND ?",
+            (seconds, dimension, first, last),
+        ).fetchall()
+    counts: dict[str, list[int]] = {}
+    for value, bucket, count in rows:
+        counts.setdefault(value, [0] * buckets)[(bucket - first) // seconds] += count
+    ranked = sorted(counts.items(), key=lambda item: (-sum(item[1]), item[0]))
+    other = [0] * buckets
+    for _, series in ranked[top:]:
+        other = [a + b for a, b in zip(other, series, strict=True)]
+    totals = [0] * buckets
+    for _, series in ranked:
+        totals = [a + b for a, b in zip(totals, series, strict=True)]
+    return {
+        "resolution": resolution,
+        "seconds": seconds,
+        "dimension": dimension,
+        "buckets": [first + i * seconds for i in range(buckets)],
+        "series": [
+            {"value": value, "counts": series, "total": sum(series)}
+            for value, series in ranked[:top]
+        ],
+        "other": other if len(ranked) > top else None,
+        "totals": totals,
+    }
+
+
+def parse_local_value(text: str) -> int | float | str:
+    """
+    What a typed value means: a number, or text ("quoted" to search for digits
+    as text, e.g. an order id kept in a str).
+    """
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    # nan and inf aren't JSON, so no indexed value is one
+    return number if number - number == 0 else text
+
+
+def _locals_where(
+    name: str, operator: str, value: int | float | str
+) -> tuple[str, list[Any]]:
+    """The local_values condition for `name <operator> value`, a range of its key either way."""
+    if operator not in LOCALS_OPERATORS:
+        raise ValueError(f"Unknown operator {operator!r}")
+    if isinstance(value, str):
+        # Stored values are cut at LOCALS_VALUE_LIMIT characters
+        value = value[:LOCALS_VALUE_LIMIT]
+    where = f"name = ? AND value {operator} ?"
+    # Numbers sort before all text, so bound the open end of a range to the same type.
+    if isinstance(value, str) and operator in ("<", "<="):
+        where += " AND value >= ''"
+    elif not isinstance(value, str) and operator in (">", ">="):
+        where += " AND value < ''"
+    return where, [name, value]
+
+
+def search_locals(
+    db_path: str,
+    name: str,
+    operator: str,
+    value: int | float | str,
+    limit: int = 50,
+    before: int | None = None,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Log records whose traceback had a local `name` matching `value`, newest first.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        name (str): Local variable, or a path into one such as `order.id` or `items[0]`
+        operator (str): One of LOCALS_OPERATORS
+        value: From parse_local_value
+        limit (int): Most rows returned
+        before (int | None): `frame_id` of the last row of the previous page
+
+    Returns:
+        tuple[list[dict[str, Any]], int]: One row per matching frame, and the number
+            of matches up to LOCALS_MATCH_CAP + 1
+
+    Raises:
+        ValueError: An unknown operator
+        sqlite3.OperationalError: The locals index is off
+    """
+    where, params = _locals_where(name, operator, value)
+    with read_connection(db_path) as conn:
+        row = conn.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {LOCALS_TABLE} WHERE {where} LIMIT ?)",  # nosec
+            (*params, LOCALS_MATCH_CAP + 1),
+        ).fetchone()
+        if before is not None:
+            where += " AND frame_id < ?"
+            params.append(before)
+        cursor = conn.execute(LOCALS_SEARCH_SET.format(where=where), (*params, limit))
+        columns = [description[0] for description in cursor.description]
+        rows = [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+    return rows, row[0]
+
+
+def locals_index_enabled(db_path: str) -> bool:
+    """Whether the handler writing this database indexes traceback locals."""
+    with read_connection(db_path) as conn:
+        return locals_index_exists(conn)
+
+
+def fetch_frames(
+    db_path: str, record_id: str, offset: int = 0, limit: int = 50
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    A page of a record's traceback frames: number, file, function and line, but
+    not the locals and globals.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        record_id (str): The log record
+        offset (int): Frames skipped, outermost first
+        limit (int): Most frames returned
+
+    Returns:
+        tuple[list[dict[str, Any]], int]: The frames, and how many the record has
+    """
+    with read_connection(db_path) as conn:
+        total = conn.execute(
+            "SELECT count(*) FROM traceback_info WHERE exception_instance_id = ?",
+            (record_id,),
+        ).fetchone()[0]
+        cursor = conn.execute(FRAME_LIST_SET, (record_id, limit, offset))
+        columns = [description[0] for description in cursor.description]
+        frames = [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+        if any(frame["filename"] is None for frame in frames):
+            row = conn.execute(
+                "SELECT traceback FROM logs WHERE record_id = ?", (record_id,)
+            ).fetchone()
+            _fill_frame_locations(frames, total, row[0] if row else None)
+    return frames, total
+
+
+def _fill_frame_locations(
+    frames: list[dict[str, Any]], total: int, traceback_text: str | None
+) -> None:
+    """
+    Older handlers didn't store where a frame was. The formatted traceback has it,
+    if it lists every frame: it shortens repeated recursion, and chained
+    exceptions come before the one whose frames were stored.
+    """
+    if not traceback_text:
+        return
+    last = traceback_text.rfind("Traceback (most recent call last):")
+    locations = [
+        match.groupdict()
+        for match in _TRACEBACK_FRAME.finditer(traceback_text, max(last, 0))
+    ]
+    if len(locations) != total:
+        return
+    for frame in frames:
+        if frame["filename"] is None and 0 <= frame["frame_number"] < total:
+            location = locations[frame["frame_number"]]
+            frame.update(
+                filename=location["filename"],
+                function=location["function"],
+                lineno=int(location["lineno"]),
+            )
+
+
+def fetch_frame_values(
+    db_path: str,
+    record_id: str,
+    frame_number: int,
+    scope: str,
+    path: str = "$",
+    offset: int = 0,
+    limit: int = FRAME_ENTRY_LIMIT,
+) -> dict[str, Any] | None:
+    """
+    One level of a frame's locals or globals, each value cut to FRAME_PREVIEW_LIMIT
+    characters. SQLite walks the JSON, so a large frame never reaches Python whole.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        record_id (str): The log record
+        frame_number (int): The frame, 0 is outermost
+        scope (str): "locals" or "globals"
+        path (str): JSON path of a dict or list within them, `$` for the top
+        offset (int): Entries skipped
+        limit (int): Most entries returned
+
+    Returns:
+        dict[str, Any] | None: `entries` (key, path, type, preview, size, count), `total`,
+            or `invalid` with the start of the raw text if it isn't JSON. None if there
+            is no such frame or path.
 
-    # Close the connection
-    conn.close()
-    return log_data
+    Raises:
+        ValueError: An unknown scope
+        sqlite3.OperationalError: A malformed path
+    """
+    column = FRAME_SCOPES.get(scope)
+    if column is None:
+        raise ValueError(f"Unknown scope {scope!r}")
+    where = "exception_instance_id = ? AND frame_number = ?"
+    with read_connection(db_path) as conn:
+        row = conn.execute(
+            f"SELECT id, json_valid({column}), substr({column}, 1, ?) FROM traceback_info WHERE {where}",  # nosec
+            (FRAME_PREVIEW_LIMIT, record_id, frame_number),
+        ).fetchone()
+        if row is None:
+            return None
+        frame_id, valid, start = row
+        if not valid:
+            # NaN and Infinity are written by json.dumps but aren't JSON
+            return {
+                "path": path,
+                "invalid": True,
+                "preview": start,
+                "entries": [],
+                "total": 0,
+                "offset": 0,
+            }
+        found = conn.execute(
+            f"SELECT json_type({column}, ?) FROM traceback_info WHERE id = ?",
+            (path, frame_id),  # nosec
+        ).fetchone()[0]
+        if found is None:
+            return None
+        cursor = conn.execute(
+            f"""SELECT entry.key, entry.fullkey AS path, entry.type,
+                       substr(entry.value, 1, ?) AS preview, length(entry.value) AS size,
+                       CASE entry.type WHEN 'array' THEN json_array_length(entry.value)
+                            WHEN 'object' THEN (SELECT count(*) FROM json_each(entry.value)) END AS count,
+                       count(*) OVER () AS total
+                  FROM traceback_info, json_each(traceback_info.{column}, ?) AS entry
+                 WHERE traceback_info.id = ?
+                 LIMIT ? OFFSET ?""",  # nosec
+            (FRAME_PREVIEW_LIMIT, path, frame_id, limit, offset),
+        )
+        columns = [description[0] for description in cursor.description]
+        entries = [
+            dict(zip(columns, entry, strict=True)) for entry in cursor.fetchall()
+        ]
+    total = entries[0].pop("total") if entries else 0
+    for entry in entries[1:]:
+        entry.pop("total")
+    return {
+        "path": path,
+        "invalid": False,
+        "entries": entries,
+        "total": total,
+        "offset": offset,
+    }
+
+
+def fetch_frame_value(
+    db_path: str, record_id: str, frame_number: int, scope: str, path: str
+) -> dict[str, Any] | None:
+    """
+    One value of a frame's locals or globals, up to FRAME_VALUE_LIMIT characters;
+    dicts and lists as JSON.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        record_id (str): The log record
+        frame_number (int): The frame, 0 is outermost
+        scope (str): "locals" or "globals"
+        path (str): JSON path of the value, from fetch_frame_values
+
+    Returns:
+        dict[str, Any] | None: path, type, value, size, and whether it was truncated.
+            None if there is no such frame or path, or the frame's JSON doesn't parse.
+
+    Raises:
+        ValueError: An unknown scope
+        sqlite3.OperationalError: A malformed path
+    """
+    column = FRAME_SCOPES.get(scope)
+    if column is None:
+        raise ValueError(f"Unknown scope {scope!r}")
+    with read_connection(db_path) as conn:
+        row = conn.execute(
+            f"""SELECT json_type(document, ?), substr(json_extract(document, ?), 1, ?),
+                       length(json_extract(document, ?))
+                  FROM (SELECT CASE WHEN json_valid({column}) THEN {column} END AS document
+                          FROM traceback_info
+                         WHERE exception_instance_id = ? AND frame_number = ?)""",  # nosec
+            (path, path, FRAME_VALUE_LIMIT, path, record_id, frame_number),
+        ).fetchone()
+    if row is None or row[0] is None:
+        return None
+    value_type, value, size = row
+    return {
+        "path": path,
+        "type": value_type,
+        "value": value,
+        "size": size,
+        "truncated": (size or 0) > FRAME_VALUE_LIMIT,
+    }
 
 
 def fetch_table_as_list_of_dict(db_path: str, table: str) -> list[dict[str, Any]]:
@@ -127,36 +1083,56 @@ def fetch_table_as_list_of_dict(db_path: str, table: str) -> list[dict[str, Any]
     if table not in ALL_TABLES:
         raise TypeError("Don't know that table.")
 
-    # Connect to the SQLite database
-    conn = connect(db_path)
-    logger.debug(f"Connected to {db_path}")
-    try:
+    # Query to fetch all rows from the table
+    query = f"SELECT * FROM {table}"  # nosec: table name restricted above
+    with read_connection(db_path) as conn:
         cursor = conn.cursor()
-    except sqlite3.ProgrammingError as ex:
-        if "closed" in str(ex):
-            # unexpectedly closed.
-            conn = connect(db_path)
-            cursor = conn.cursor()
-        else:
-            raise
+        execute_safely(cursor, query, db_path)
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
 
-    # Query to fetch all rows from the logs table
-    query = f"SELECT * FROM {table}"  # nosec: table name restricted above
-    execute_safely(cursor, query, db_path)
+    # Convert each row to a dictionary
+    return [dict(zip(columns, row, strict=True)) for row in rows]
 
-    # Fetching column names from the cursor
-    columns = [description[0] for description in cursor.description]
 
-    # Fetch all rows, and convert each row to a dictionary
-    rows = cursor.fetchall()
-    data = []
-    for row in rows:
-        record = dict(zip(columns, row, strict=True))
-        data.append(record)
+def iter_table_rows(
+    db_path: str, table: str, chunk_size: int = 500
+) -> Iterator[dict[str, Any]]:
+    """
+    The rows of a table as dictionaries, read `chunk_size` at a time in rowid order,
+    for pages that render while they stream. No connection is held between chunks,
+    so a slow client doesn't keep one from the pool, and the next chunk can be read
+    on another thread.
 
-    # Close the connection
-    conn.close()
-    return data
+    Args:
+        db_path (str): Path to the SQLite database
+        table (str): Table to query
+        chunk_size (int): Rows read per query
+
+    Returns:
+        Iterator[dict[str, Any]]: The rows, as fetch_table_as_list_of_dict has them
+    """
+    if table not in ALL_TABLES:
+        raise TypeError("Don't know that table.")
+    # Rowids are positive; a row added meanwhile comes along if it sorts after the last one read.
+    last = 0
+    while True:
+        with read_connection(db_path) as conn:
+            cursor = conn.cursor()
+            execute_safely(
+                cursor,
+                f"SELECT rowid AS _chunk_rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",  # nosec
+                db_path,
+                (last, chunk_size),
+            )
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        for row in rows:
+            record = dict(zip(columns, row, strict=True))
+            last = record.pop("_chunk_rowid")
+            yield record
+        if len(rows) < chunk_size:
+            return
 
 
 def fetch_log_data_grouped(db_path: str) -> Any:
@@ -169,111 +1145,155 @@ def fetch_log_data_grouped(db_path: str) -> Any:
     Returns:
         Any: A nested dictionary containing all log records
     """
-    # Connect to the SQLite database
-    conn = connect(db_path)
-    logger.debug(f"Connected to {db_path}")
+    with read_connection(db_path) as conn:
+        cursor = conn.cursor()
+        execute_safely(cursor, ENTIRE_LOG_SET, db_path)
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+
+    # Convert each row to a grouped dictionary
+    return [_group_log_record(dict(zip(columns, row, strict=True))) for row in rows]
+
+
+def fetch_log_detail(db_path: str, record_id: str) -> dict[str, Any] | None:
+    """
+    Fetch one log record by primary key, grouped like fetch_log_data_grouped.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        record_id (str): The record's primary key
+
+    Returns:
+        dict[str, Any] | None: The grouped record, or None if there is no such record
+    """
+    return _fetch_one_grouped(db_path, "logs.record_id = ?", (record_id,))
+
+
+def fetch_log_detail_by_legacy_key(
+    db_path: str, legacy_key: str
+) -> dict[str, Any] | None:
+    """
+    Resolve an old `created|filename|lineno` detail key. Uses ix_logs_created.
+
+    Such keys can collide; the newest matching record wins.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        legacy_key (str): The key as it appeared in old detail URLs
+
+    Returns:
+        dict[str, Any] | None: The grouped record, or None if nothing matches
+    """
+    created_text, _, rest = legacy_key.partition("|")
+    filename, _, lineno_text = rest.rpartition("|")
     try:
+        created = float(created_text)
+    except ValueError:
+        return None
+    lineno: int | None = int(lineno_text) if lineno_text.lstrip("-").isdigit() else None
+    return _fetch_one_grouped(
+        db_path,
+        "logs.created = ? AND logs.filename IS ? AND logs.lineno IS ?",
+        (created, filename or None, lineno),
+    )
+
+
+def _fetch_one_grouped(
+    db_path: str, where: str, params: Sequence[Any]
+) -> dict[str, Any] | None:
+    with read_connection(db_path) as conn:
         cursor = conn.cursor()
-    except sqlite3.ProgrammingError as ex:
-        if "closed" in str(ex):
-            # unexpectedly closed.
-            conn = connect(db_path)
-            cursor = conn.cursor()
-        else:
-            raise
+        execute_safely(cursor, LOG_DETAIL_SET.format(where=where), db_path, params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        columns = [description[0] for description in cursor.description]
+        return _group_log_record(dict(zip(columns, row, strict=True)))
 
-    # Query to fetch all rows from the logs table
-    query = ENTIRE_LOG_SET
-    execute_safely(cursor, query, db_path)
-
-    # Fetching column names from the cursor
-    columns = [description[0] for description in cursor.description]
-
-    # Fetch all rows, and convert each row to a grouped dictionary
-    rows = cursor.fetchall()
-    log_data = []
-    for row in rows:
-        log_record = dict(zip(columns, row, strict=True))
-
-        # Grouping the log record
-        grouped_record = {
-            "MessageDetails": {
-                key: log_record[key] for key in ["msg", "args", "levelname", "levelno"]
-            },
-            "SourceContext": {
-                key: log_record[key]
-                for key in [
-                    "name",
-                    "pathname",
-                    "filename",
-                    "module",
-                    "funcName",
-                    "lineno",
-                ]
-            },
-            "TemporalDetails": {
-                key: log_record[key] for key in ["created", "msecs", "relativeCreated"]
-            },
-            "ProcessThreadContext": {
-                key: log_record[key]
-                for key in ["process", "processName", "thread", "threadName"]
-            },
-            "ExceptionDetails": {
-                key: log_record.get(key)
-                for key in [
-                    "exc_info",
-                    "exc_text",
-                    "exception_args",
-                    "exception_str",
-                    "comments",
-                    "exception_name",
-                    "exception_docstring",
-                    "exception_hierarchy",
-                ]
-            },
-            "StackDetails": {key: log_record[key] for key in ["stack_info"]},
-            "UserData": {
-                key: log_record[key]
-                for key in log_record.keys()
-                - {
-                    "msg",
-                    "args",
-                    "levelname",
-                    "levelno",
-                    "name",
-                    "pathname",
-                    "filename",
-                    "module",
-                    "funcName",
-                    "lineno",
-                    "created",
-                    "msecs",
-                    "relativeCreated",
-                    "process",
-                    "processName",
-                    "thread",
-                    "threadName",
-                    "exc_info",
-                    "exc_text",
-                    "stack_info",
-                    # exception table
-                    "exception_args",
-                    "exception_str",
-                    "comments",
-                    "exception_name",
-                    "exception_docstring",
-                    "exception_hierarchy",
-                }
-            },
-        }
-        log_data.append(grouped_record)
-
-    # Close the connection
-    conn.close()
-    return log_data
-
-
-def execute_safely(cursor: sqlite3.Cursor, query: str, db_path: str) -> None:
+
+def _group_log_record(log_record: dict[str, Any]) -> dict[str, Any]:
+    """Group a flat logs row (plus exception columns) into the sections the detail page shows."""
+    # Promoted extra_ columns repeat what user_data holds.
+    log_record = {
+        key: value
+        for key, value in log_record.items()
+        if not key.startswith(PROMOTED_PREFIX)
+    }
+    return {
+        "MessageDetails": {
+            key: log_record[key] for key in ["msg", "args", "levelname", "levelno"]
+        },
+        "SourceContext": {
+            key: log_record[key]
+            for key in [
+                "name",
+                "pathname",
+                "filename",
+                "module",
+                "funcName",
+                "lineno",
+            ]
+        },
+        "TemporalDetails": {
+            key: log_record[key] for key in ["created", "msecs", "relativeCreated"]
+        },
+        "ProcessThreadContext": {
+            key: log_record[key]
+            for key in ["process", "processName", "thread", "threadName"]
+        },
+        "ExceptionDetails": {
+            key: log_record.get(key)
+            for key in [
+                "exc_info",
+                "exc_text",
+                "exception_args",
+                "exception_str",
+                "comments",
+                "exception_name",
+                "exception_docstring",
+                "exception_hierarchy",
+            ]
+        },
+        "StackDetails": {key: log_record[key] for key in ["stack_info"]},
+        "UserData": {
+            key: log_record[key]
+            for key in log_record.keys()
+            - {
+                "msg",
+                "args",
+                "levelname",
+                "levelno",
+                "name",
+                "pathname",
+                "filename",
+                "module",
+                "funcName",
+                "lineno",
+                "created",
+                "msecs",
+                "relativeCreated",
+                "process",
+                "processName",
+                "thread",
+                "threadName",
+                "exc_info",
+                "exc_text",
+                "stack_info",
+                # exception table
+                "exception_args",
+                "exception_str",
+                "comments",
+                "exception_name",
+                "exception_docstring",
+                "exception_hierarchy",
+            }
+        },
+    }
+
+
+def execute_safely(
+    cursor: sqlite3.Cursor, query: str, db_path: str, params: Sequence[Any] = ()
+) -> None:
     """
     Execute a query safely, creating the table if it doesn't exist
 
@@ -281,14 +1301,15 @@ def execute_safely(cursor: sqlite3.Cursor, query: str, db_path: str) -> None:
         cursor (sqlite3.Cursor): The cursor to use
         query (str): The query to execute
         db_path (str): The path to the database
+        params (Sequence[Any]): Bound parameters for the query
     """
     try:
         logger.debug(query)
-        cursor.execute(query)
+        cursor.execute(query, params)
     except sqlite3.OperationalError as se:
         if "no such table" in str(se):
             handler = BaseErrorLogHandler(db_path)
             handler.create_table()
-            cursor.execute(query)
+            cursor.execute(query, params)
         else:
             raise
@@ -0,0 +1,128 @@
+"""Pool of read-only SQLite connections shared by the viewer's request handlers."""
+
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from urllib.parse import quote
+
+
+class ReadPool:
+    """
+    Up to `size` read-only connections, opened on demand and reused.
+
+    Connections are opened with `mode=ro` and `query_only`, so nothing checked
+    out of the pool can write, and are shared across threads (one at a time).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size: int = -16384,
+        timeout: float = 5.0,
+    ) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database
+            size (int): Most connections open at once
+            mmap_size (int): PRAGMA mmap_size for each connection, in bytes
+            cache_size (int): PRAGMA cache_size for each connection (negative is KiB)
+            timeout (float): Seconds to wait for a free connection, and for locks
+        """
+        self.db_path = db_path
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{quote(self.db_path)}?mode=ro",
+            uri=True,
+            timeout=self.timeout,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        return conn
+
+    @contextmanager
+    def checkout(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection. It goes back to the pool unless a database error broke it."""
+        if self._closed:
+            raise RuntimeError("ReadPool is closed")
+        conn = self._acquire()
+        healthy = True
+        try:
+            yield conn
+        except sqlite3.OperationalError:
+            # Locked, missing table, interrupted: the connection itself is fine.
+            raise
+        except sqlite3.DatabaseError:
+            healthy = False
+            raise
+        finally:
+            self._release(conn, healthy)
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except BaseException:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No free connection to {self.db_path} after {self.timeout}s"
+            ) from None
+
+    def _release(self, conn: sqlite3.Connection, healthy: bool) -> None:
+        if healthy and not self._closed:
+            try:
+                # Never hand out a connection that is still inside a read transaction.
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+                return
+            except sqlite3.Error:
+                pass
+        conn.close()
+        with self._lock:
+            self._opened -= 1
+
+    def stats(self) -> dict[str, int]:
+        """Connections open and idle, for debugging."""
+        return {"size": self.size, "open": self._opened, "idle": self._idle.qsize()}
+
+    def close(self) -> None:
+        """Close idle connections; ones still checked out are closed when returned."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
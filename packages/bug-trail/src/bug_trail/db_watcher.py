@@ -1,76 +1,181 @@
-"""Watchdog-backed DB change detector that notifies async SSE listeners."""
+"""
+DB change detector that notifies async SSE listeners.
+
+File events (watchdog) or a timer only wake the detector up. A change counts
+when `PRAGMA data_version` on the detector's own connection moves, which it
+does for every commit by any other connection, in any process. Notifications
+are coalesced to at most one per `interval`.
+"""
 
 from __future__ import annotations
 
 import asyncio
 import logging
+import os
+import sqlite3
 import threading
-from typing import Any
-
-from watchdog.events import FileModifiedEvent, FileSystemEventHandler
-from watchdog.observers import Observer
-from watchdog.observers.api import BaseObserver
+import time
+from typing import TYPE_CHECKING, Any
+from urllib.parse import quote
 
-logger = logging.getLogger(__name__)
+from bug_trail.broadcast import BroadcastHub, Subscription
 
+if TYPE_CHECKING:
+    from watchdog.observers.api import BaseObserver
 
-class _Handler(FileSystemEventHandler):
-    def __init__(self, owner: DbWatcher, filename: str) -> None:
-        super().__init__()
-        self._owner = owner
-        self._filename = filename
+logger = logging.getLogger(__name__)
 
-    def on_modified(self, event: Any) -> None:
-        if not isinstance(event, FileModifiedEvent):
-            return
-        src = str(event.src_path)
-        if src.endswith(self._filename) or src.endswith(".db") or src.endswith(".db-wal"):
-            self._owner.notify()
+WATCH_MODES = ("watch", "poll")
 
 
 class DbWatcher:
-    """Watches a directory and broadcasts to async queues on change."""
+    """Watches one SQLite database and broadcasts "refresh" to subscribers on change."""
 
-    def __init__(self, watch_dir: str, filename: str) -> None:
-        self.watch_dir = watch_dir
-        self.filename = filename
+    def __init__(
+        self, db_path: str, interval: float = 0.5, mode: str = "watch"
+    ) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database
+            interval (float): Least time between notifications, and the poll period
+            mode (str): "watch" for filesystem events, "poll" for network
+                filesystems and containers where inotify doesn't work
+        """
+        if mode not in WATCH_MODES:
+            raise ValueError(f"mode must be one of {WATCH_MODES}, got {mode!r}")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.db_path = db_path
+        self.interval = interval
+        self.mode = mode
+        self.filenames = {os.path.basename(db_path), os.path.basename(db_path) + "-wal"}
+        self.notifications = 0
         self._observer: BaseObserver | None = None
-        self._listeners: set[asyncio.Queue[str]] = set()
-        self._listeners_lock = threading.Lock()
-        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        # Subscribers only need to know that something changed; one pending "refresh" says it.
+        self._hub = BroadcastHub(max_buffer=1)
+        self._conn: sqlite3.Connection | None = None
+        self._inode: int | None = None
+        self._version: tuple[int, int] | None = None
 
     def start(self) -> None:
-        self._loop = asyncio.get_event_loop()
-        handler = _Handler(self, self.filename)
-        obs = Observer()
-        obs.schedule(handler, self.watch_dir, recursive=False)
-        obs.start()
-        self._observer = obs
+        """Start watching. Call on the event loop, e.g. from the app's lifespan."""
+        self._hub.bind(asyncio.get_running_loop())
+        self._version = self._read_version()
+        if self.mode == "watch":
+            self._start_observer()
+        self._thread = threading.Thread(
+            target=self._run, name="bug-trail-db-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def _start_observer(self) -> None:
+        # Only watch mode needs watchdog.
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event: Any) -> None:
+                if event.is_directory:
+                    return
+                paths = (event.src_path, getattr(event, "dest_path", ""))
+                if any(
+                    os.path.basename(str(path)) in watcher.filenames
+                    for path in paths
+                    if path
+                ):
+                    watcher.wake()
+
+        watch_dir = os.path.dirname(os.path.abspath(self.db_path)) or "."
+        observer = Observer()
+        observer.schedule(_Handler(), watch_dir, recursive=False)
+        observer.start()
+        self._observer = observer
 
     def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
         if self._observer is not None:
             self._observer.stop()
             self._observer.join(timeout=2.0)
             self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
 
-    def subscribe(self) -> asyncio.Queue[str]:
-        queue: asyncio.Queue[str] = asyncio.Queue()
-        with self._listeners_lock:
-            self._listeners.add(queue)
-        return queue
+    def subscribe(self) -> Subscription:
+        return self._hub.subscribe()
 
-    def unsubscribe(self, queue: asyncio.Queue[str]) -> None:
-        with self._listeners_lock:
-            self._listeners.discard(queue)
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._hub.unsubscribe(subscription)
 
-    def notify(self) -> None:
-        """Called from a watchdog background thread."""
-        if self._loop is None:
-            return
-        with self._listeners_lock:
-            listeners = list(self._listeners)
-        for queue in listeners:
+    def wake(self) -> None:
+        """Something may have changed; check soon. Cheap, call it as often as you like."""
+        self._wakeup.set()
+
+    def _read_version(self) -> tuple[int, int] | None:
+        """(inode, data_version) of the database, None if it doesn't exist yet."""
+        try:
+            inode = os.stat(self.db_path).st_ino
+        except OSError:
+            return None
+        try:
+            if self._conn is None or self._inode != inode:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = sqlite3.connect(
+                    f"file:{quote(self.db_path)}?mode=ro",
+                    uri=True,
+                    timeout=1.0,
+                    check_same_thread=False,
+                )
+                self._inode = inode
+            return inode, self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as error:
+            logger.debug("data_version check failed: %s", error)
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            return None
+
+    def check(self) -> bool:
+        """Notify listeners if the database changed since the last check. Returns True if it did."""
+        version = self._read_version()
+        if version == self._version:
+            return False
+        self._version = version
+        self.notify()
+        return True
+
+    def _run(self) -> None:
+        last_check = 0.0
+        follow_up = False
+        while not self._stop.is_set():
+            if self.mode == "watch":
+                # A file event can arrive just before the commit is visible, so each
+                # burst of events gets one more check an interval after it ends.
+                follow_up = self._wakeup.wait(self.interval if follow_up else None)
+            # At most one check per interval; whatever arrives meanwhile is folded in.
+            delay = last_check + self.interval - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            last_check = time.monotonic()
             try:
-                self._loop.call_soon_threadsafe(queue.put_nowait, "refresh")
-            except RuntimeError:
-                pass
+                self.check()
+            except Exception as error:  # noqa: BLE001
+                logger.warning("DB change check failed: %s", error)
+
+    def notify(self) -> None:
+        """Broadcast "refresh" to every subscriber. Safe to call from any thread."""
+        self.notifications += 1
+        self._hub.publish_threadsafe("refresh")
@@ -0,0 +1,121 @@
+"""
+New log rows pushed to the /events stream.
+
+The feed keeps a high-water mark (the highest logs rowid it has announced).
+On each change notification it fetches the rows past the mark once, renders
+them once, and hands the same SSE message to every subscriber.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+
+from bug_trail import data_code as data
+from bug_trail.broadcast import BroadcastHub, Subscription
+
+logger = logging.getLogger(__name__)
+
+# More new rows than this and clients are told to reload instead.
+MAX_PUSHED_ROWS = 100
+
+
+def sse_message(
+    payload: str, event: str | None = None, event_id: int | None = None
+) -> str:
+    """Format one server-sent event. `payload` must not contain newlines."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {payload}")
+    return "\n".join(lines) + "\n\n"
+
+
+class LiveFeed:
+    """Turns change notifications into `rows` (or `refresh`) events for SSE clients."""
+
+    def __init__(
+        self,
+        db_path: str,
+        render_rows: Callable[[list[dict]], str],
+        max_rows: int = MAX_PUSHED_ROWS,
+        max_subscribers: int | None = None,
+        max_buffer: int = 16,
+    ) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database
+            render_rows (Callable[[list[dict]], str]): Renders rows as the list page's <tr> elements
+            max_rows (int): Most rows pushed in one event
+            max_subscribers (int | None): Cap on connected SSE clients
+            max_buffer (int): Events buffered per client before it is told to reload
+        """
+        self.db_path = db_path
+        self.render_rows = render_rows
+        self.max_rows = max_rows
+        self.last_id = 0
+        self.hub = BroadcastHub(
+            max_buffer=max_buffer,
+            max_subscribers=max_subscribers,
+            overflow_message=sse_message("refresh"),
+        )
+
+    def subscribe(self) -> Subscription:
+        """Raises broadcast.HubFull when max_subscribers are already connected."""
+        return self.hub.subscribe()
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.hub.unsubscribe(subscription)
+
+    def message_since(self, since: int) -> tuple[int, str | None]:
+        """
+        The event bringing a client from `since` to now, and the mark after it.
+        The event is None if there is nothing new. Blocking; run it in a thread
+        from async code.
+        """
+        newest = data.max_log_rowid(self.db_path)
+        if newest < since:
+            # Rows were deleted (clear/reset): the client's page is out of date.
+            return newest, sse_message("refresh", event_id=newest)
+        if newest == since:
+            return newest, None
+        rows = data.fetch_logs_since(self.db_path, since, self.max_rows + 1)
+        if len(rows) > self.max_rows:
+            return newest, sse_message("refresh", event_id=newest)
+        if not rows:
+            return newest, None
+        last_id = max(row["log_rowid"] for row in rows)
+        payload = json.dumps(
+            {
+                "last_id": last_id,
+                "count": len(rows),
+                "row_count": data.table_row_count(self.db_path, "logs"),
+                "html": self.render_rows(rows),
+            }
+        )
+        return last_id, sse_message(payload, event="rows", event_id=last_id)
+
+    def publish(self, message: str) -> None:
+        self.hub.publish(message)
+
+    async def run(self, changes: Subscription) -> None:
+        """Consume change notifications (e.g. from DbWatcher.subscribe) until cancelled."""
+        self.last_id = await asyncio.to_thread(data.max_log_rowid, self.db_path)
+        while True:
+            await changes.get()
+            # Everything that piled up while we were busy is one change.
+            while not changes.empty():
+                changes.get_nowait()
+            try:
+                self.last_id, message = await asyncio.to_thread(
+                    self.message_since, self.last_id
+                )
+            except Exception as error:  # noqa: BLE001
+                logger.warning("Live feed update failed: %s", error)
+                continue
+            if message is not None:
+                self.publish(message)
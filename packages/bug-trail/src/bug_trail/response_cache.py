@@ -0,0 +1,236 @@
+"""Rendered pages kept in memory until the database changes, with ETag revalidation."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+# Browsers revalidate on every load instead of guessing a freshness lifetime.
+CACHE_CONTROL = "no-cache"
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """A 200 response body and the database version it was rendered from."""
+
+    version: Hashable
+    body: bytes
+    media_type: str | None
+    etag: str
+    last_modified: float
+    rendered_at: float
+
+
+class ResponseCache:
+    """
+    LRU of rendered pages keyed by URL.
+
+    An entry is valid while the database version is unchanged: the file's
+    inode and mtime plus `PRAGMA data_version` on a dedicated connection,
+    which moves whenever any other connection (in any process) commits.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 128) -> None:
+        """
+        Args:
+            db_path (str): Path to the SQLite database the pages are rendered from
+            max_entries (int): Most pages kept
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedPage] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._inode: int | None = None
+
+    def version(self) -> Hashable | None:
+        """Current database version, or None if there is no database to cache against."""
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        with self._lock:
+            try:
+                if self._conn is None or self._inode != stat.st_ino:
+                    # A new file at the same path (deleted and recreated)
+                    self._close_connection()
+                    self._conn = sqlite3.connect(
+                        f"file:{quote(self.db_path)}?mode=ro",
+                        uri=True,
+                        check_same_thread=False,
+                    )
+                    self._inode = stat.st_ino
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error:
+                self._close_connection()
+                return None
+        return stat.st_ino, stat.st_mtime_ns, data_version
+
+    def last_modified(self) -> float:
+        """Newest mtime of the database and its WAL, for Last-Modified."""
+        newest = 0.0
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                newest = max(newest, os.path.getmtime(path))
+            except OSError:
+                continue
+        return newest
+
+    async def serve(
+        self,
+        request: Request,
+        render: Callable[[], Awaitable[Response]],
+        max_age: float | None = None,
+    ) -> Response:
+        """
+        Answer from the cache, with 304 when the client's copy is current.
+        Streamed pages (StreamingResponse) aren't kept, but still revalidate.
+
+        Args:
+            request (Request): The incoming request, for its URL and validators
+            render (Callable[[], Awaitable[Response]]): Produces the page on a miss
+            max_age (float | None): Re-render after this many seconds even if the
+                database is unchanged, for pages that show relative times
+        """
+        version = self.version()
+        if version is None:
+            return await render()
+        key = str(request.url.path) + "?" + str(request.url.query)
+        entry = self._get(key, version, max_age)
+        if entry is None:
+            # Only a streamed response of this page carries this tag.
+            streamed_etag = _version_etag(key, version, max_age)
+            if _etag_matches(request, streamed_etag):
+                self.hits += 1
+                return Response(
+                    status_code=304,
+                    headers=_validators(streamed_etag, self.last_modified()),
+                )
+            self.misses += 1
+            response = await render()
+            if response.status_code != 200:
+                return response
+            if isinstance(response, StreamingResponse):
+                # Never held whole, so not kept, and tagged by database version rather than content.
+                response.headers.update(
+                    _validators(streamed_etag, self.last_modified())
+                )
+                return response
+            if not isinstance(getattr(response, "body", None), bytes):
+                return response
+            body = bytes(response.body)
+            entry = CachedPage(
+                version=version,
+                body=body,
+                media_type=response.media_type,
+                etag='W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"',
+                last_modified=self.last_modified(),
+                rendered_at=time.monotonic(),
+            )
+            self._put(key, entry)
+        else:
+            self.hits += 1
+
+        headers = _validators(entry.etag, entry.last_modified)
+        if _not_modified(request, entry):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=entry.body, media_type=entry.media_type, headers=headers
+        )
+
+    def _get(
+        self, key: str, version: Hashable, max_age: float | None
+    ) -> CachedPage | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expired = (
+                max_age is not None and time.monotonic() - entry.rendered_at > max_age
+            )
+            if entry.version != version or expired:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: str, entry: CachedPage) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _close_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._inode = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._close_connection()
+
+
+def _validators(etag: str, last_modified: float) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def _version_etag(key: str, version: Hashable, max_age: float | None) -> str:
+    """A streamed page's tag: its URL and the database version, renewed every max_age seconds."""
+    period = int(time.time() // max_age) if max_age else 0
+    digest = hashlib.blake2b(
+        repr((key, version, period)).encode(), digest_size=12
+    ).hexdigest()
+    return 'W/"v' + digest + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    # Weak comparison: W/"x" matches "x"
+    return etag in tags or etag[2:] in tags
+
+
+def _not_modified(request: Request, entry: CachedPage) -> bool:
+    """RFC 9110 precedence: If-None-Match decides when present, else If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return "*" in {
+            tag.strip() for tag in if_none_match.split(",")
+        } or _etag_matches(request, entry.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(entry.last_modified) <= since
+    return False
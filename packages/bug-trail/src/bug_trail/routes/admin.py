@@ -7,8 +7,18 @@ import logging
 from fastapi import Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 
-from bug_trail.admin_ops import clear_all, db_size, reset_all, table_counts
+from bug_trail.admin_ops import (
+    bucket_labels,
+    clear_all,
+    db_size,
+    handler_stats,
+    recount_tables,
+    reset_all,
+    table_counts,
+    wal_status,
+)
 from bug_trail.app import STATE, app, render
+from bug_trail.async_data import query
 
 logger = logging.getLogger(__name__)
 
@@ -22,35 +32,56 @@ def _format_size(n: float) -> str:
 
 
 @app.get("/admin", response_class=HTMLResponse)
-def admin_index(request: Request) -> HTMLResponse:
+async def admin_index(request: Request) -> HTMLResponse:
     db_path = STATE.db_path or ""
-    counts = table_counts(db_path)
+    context = await query(_load_admin, db_path, request=request)
+    return render(request, "view_admin.jinja", **context)
+
+
+def _load_admin(db_path: str) -> dict:
+    """The dashboard's counts and stats, on a reader thread."""
     size_bytes = db_size(db_path)
-    return render(
-        request,
-        "view_admin.jinja",
-        db_path=db_path,
-        db_size=_format_size(size_bytes),
-        db_size_bytes=size_bytes,
-        counts=counts,
-    )
+    monitor = STATE.wal_monitor
+    wal = wal_status(db_path, monitor.checkpointer if monitor is not None else None)
+    return {
+        "db_path": db_path,
+        "db_size": _format_size(size_bytes),
+        "db_size_bytes": size_bytes,
+        "wal": wal,
+        "wal_size": _format_size(wal["wal_size"]),
+        "wal_size_limit": (
+            _format_size(wal["size_limit"]) if wal["size_limit"] else None
+        ),
+        "counts": table_counts(db_path),
+        "handler_stats": handler_stats(db_path),
+        "bucket_labels": bucket_labels(),
+    }
 
 
 @app.post("/admin/clear")
-def admin_clear(confirm: str = Form("")) -> RedirectResponse:
+async def admin_clear(confirm: str = Form("")) -> RedirectResponse:
     if confirm != "yes":
         return RedirectResponse(url="/admin", status_code=303)
     db_path = STATE.db_path or ""
-    removed = clear_all(db_path)
+    # Writes: no timeout, so they are never interrupted halfway.
+    removed = await query(clear_all, db_path, timeout=0)
     logger.info("admin clear removed %s rows from %s", removed, db_path)
     return RedirectResponse(url="/admin", status_code=303)
 
 
+@app.post("/admin/recount")
+async def admin_recount() -> RedirectResponse:
+    db_path = STATE.db_path or ""
+    counts = await query(recount_tables, db_path, timeout=0)
+    logger.info("admin recount for %s: %s", db_path, counts)
+    return RedirectResponse(url="/admin", status_code=303)
+
+
 @app.post("/admin/reset")
-def admin_reset(confirm: str = Form("")) -> RedirectResponse:
+async def admin_reset(confirm: str = Form("")) -> RedirectResponse:
     if confirm != "yes":
         return RedirectResponse(url="/admin", status_code=303)
     db_path = STATE.db_path or ""
-    reset_all(db_path)
+    await query(reset_all, db_path, timeout=0)
     logger.info("admin reset completed for %s", db_path)
     return RedirectResponse(url="/admin", status_code=303)
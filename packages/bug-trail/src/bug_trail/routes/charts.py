@@ -0,0 +1,47 @@
+"""JSON route for the log list's charts: record counts over time from the rollup tables."""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any
+
+from fastapi import HTTPException, Query, Request
+
+from bug_trail import data_code as data
+from bug_trail.app import STATE, app
+from bug_trail.async_data import query
+
+# Buckets shown when none are asked for, and the most that may be.
+DEFAULT_BUCKETS = {"minute": 60, "hour": 48, "day": 30}
+MAX_BUCKETS = {"minute": 24 * 60, "hour": 31 * 24, "day": 366}
+
+
+@app.get("/rollups")
+async def rollups(
+    request: Request,
+    resolution: str = "hour",
+    dimension: str = "level",
+    buckets: int | None = Query(None, ge=1),
+    top: int = Query(data.ROLLUP_TOP, ge=1, le=20),
+) -> dict[str, Any]:
+    if resolution not in DEFAULT_BUCKETS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown resolution {resolution!r}."
+        )
+    if dimension not in data.ROLLUP_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown dimension {dimension!r}.")
+    db_path = STATE.db_path
+    if not db_path or not os.path.exists(db_path):
+        raise HTTPException(status_code=404, detail="No database available.")
+    count = min(buckets or DEFAULT_BUCKETS[resolution], MAX_BUCKETS[resolution])
+    return await query(
+        data.fetch_rollups,
+        db_path,
+        resolution,
+        dimension,
+        count,
+        time.time(),
+        top,
+        request=request,
+    )
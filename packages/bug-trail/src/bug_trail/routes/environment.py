@@ -5,43 +5,69 @@ from __future__ import annotations
 import json
 import logging
 import os
+from collections.abc import Iterator
 
 from fastapi import Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 
-from bug_trail.app import STATE, app, render
-from bug_trail.data_code import fetch_table_as_list_of_dict
+from bug_trail.app import STATE, app, cached_page, render, render_stream
+from bug_trail.async_data import ClientDisconnected, QueryTimeout, query
+from bug_trail.data_code import (
+    fetch_table_as_list_of_dict,
+    iter_table_rows,
+    table_row_count,
+)
 
 logger = logging.getLogger(__name__)
 
 
 @app.get("/environment", response_class=HTMLResponse)
-def environment(request: Request) -> HTMLResponse:
+@cached_page()
+async def environment(request: Request) -> Response:
     db_path = STATE.db_path
-    rows: list[dict] = []
+    count = 0
     if db_path and os.path.exists(db_path):
         try:
-            rows = fetch_table_as_list_of_dict(db_path, "python_libraries")
+            count = await query(
+                table_row_count, db_path, "python_libraries", request=request
+            )
+        except (QueryTimeout, ClientDisconnected):
+            raise
         except Exception as e:  # noqa: BLE001
             logger.warning("python_libraries read failed: %s", e)
+    # Thousands of rows in a big virtualenv: read and written out a chunk at a time.
+    libraries = (
+        _with_urls(iter_table_rows(db_path, "python_libraries")) if count else iter(())
+    )
+    return await render_stream(
+        request, "view_python_environment.jinja", logs=libraries, library_count=count
+    )
+
+
+def _with_urls(rows: Iterator[dict]) -> Iterator[dict]:
     for row in rows:
         raw = row.get("urls")
         try:
             row["urls"] = json.loads(raw) if raw else {}
         except (ValueError, TypeError):
             row["urls"] = {}
-    return render(request, "view_python_environment.jinja", logs=rows)
+        yield row
 
 
 @app.get("/system", response_class=HTMLResponse)
-def system(request: Request) -> HTMLResponse:
+@cached_page()
+async def system(request: Request) -> HTMLResponse:
     db_path = STATE.db_path
     log: dict = {}
     if db_path and os.path.exists(db_path):
         try:
-            rows = fetch_table_as_list_of_dict(db_path, "system_info")
+            rows = await query(
+                fetch_table_as_list_of_dict, db_path, "system_info", request=request
+            )
             if rows:
                 log = rows[0]
+        except (QueryTimeout, ClientDisconnected):
+            raise
         except Exception as e:  # noqa: BLE001
             logger.warning("system_info read failed: %s", e)
     return render(request, "view_system_info.jinja", log=log)
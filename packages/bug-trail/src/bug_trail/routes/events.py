@@ -1,4 +1,4 @@
-"""SSE /events endpoint — pushes 'refresh' when DB changes."""
+"""SSE /events endpoint — pushes new log rows, or 'refresh', when the DB changes."""
 
 from __future__ import annotations
 
@@ -6,35 +6,63 @@ import asyncio
 import logging
 
 from fastapi import Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 from bug_trail.app import STATE, app
+from bug_trail.broadcast import HubFull
 
 logger = logging.getLogger(__name__)
 
 
+def _resume_from(request: Request, since: int | None) -> int | None:
+    """The client's high-water mark: Last-Event-ID on reconnect, else ?since=."""
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        return int(last_event_id)
+    return since
+
+
 @app.get("/events")
-async def events(request: Request) -> StreamingResponse:
-    watcher = STATE.watcher
+async def events(request: Request, since: int | None = None) -> Response:
+    feed = STATE.live_feed
+    resume_from = _resume_from(request, since)
+    if feed is None:
+        # No watcher configured — send a heartbeat and close.
+        return StreamingResponse(
+            iter([": no watcher\n\n"]), media_type="text/event-stream"
+        )
+    # Subscribe first so nothing lands between the catch-up and the feed.
+    try:
+        subscription = feed.subscribe()
+    except HubFull:
+        logger.warning("Refusing SSE client: %s already connected", len(feed.hub))
+        return Response(
+            "Too many live connections.", status_code=503, headers={"Retry-After": "30"}
+        )
 
     async def stream():
-        if watcher is None:
-            # No watcher configured — send a heartbeat and close.
-            yield ": no watcher\n\n"
-            return
-        queue = watcher.subscribe()
         try:
             yield ": connected\n\n"
+            if resume_from is not None and resume_from != feed.last_id:
+                _, catch_up = await asyncio.to_thread(feed.message_since, resume_from)
+                if catch_up is not None:
+                    yield catch_up
             while True:
                 if await request.is_disconnected():
                     break
                 try:
-                    msg = await asyncio.wait_for(queue.get(), timeout=15.0)
-                    yield f"data: {msg}\n\n"
+                    msg = await asyncio.wait_for(subscription.get(), timeout=15.0)
+                    yield msg
                 except TimeoutError:
                     # keep-alive
                     yield ": keep-alive\n\n"
         finally:
-            watcher.unsubscribe(queue)
+            feed.unsubscribe(subscription)
 
-    return StreamingResponse(stream(), media_type="text/event-stream")
+    # Also unsubscribe if the response ends before the stream ever started.
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        background=BackgroundTask(feed.unsubscribe, subscription),
+    )
@@ -0,0 +1,90 @@
+"""JSON routes behind the detail page's frame explorer: frame lists, then locals and globals on demand."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from typing import Any
+
+from fastapi import HTTPException, Query, Request
+
+from bug_trail import data_code as data
+from bug_trail.app import STATE, app
+from bug_trail.async_data import query
+from bug_trail.routes.logs import FRAME_PAGE_SIZE, load_frame_page
+
+# Most frames one request may ask for.
+FRAME_PAGE_LIMIT = 500
+
+
+def _db_path() -> str:
+    db_path = STATE.db_path
+    if not db_path or not os.path.exists(db_path):
+        raise HTTPException(status_code=404, detail="No database available.")
+    return db_path
+
+
+@app.get("/log/{log_key}/frames")
+async def log_frames(
+    request: Request,
+    log_key: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(FRAME_PAGE_SIZE, ge=1, le=FRAME_PAGE_LIMIT),
+) -> dict[str, Any]:
+    return await query(
+        load_frame_page, _db_path(), log_key, offset, limit, request=request
+    )
+
+
+@app.get("/log/{log_key}/frames/{frame_number}/{scope}")
+async def frame_values(
+    request: Request,
+    log_key: str,
+    frame_number: int,
+    scope: str,
+    path: str = "$",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(data.FRAME_ENTRY_LIMIT, ge=1, le=data.FRAME_ENTRY_LIMIT),
+) -> dict[str, Any]:
+    if scope not in data.FRAME_SCOPES:
+        raise HTTPException(status_code=404, detail=f"Unknown scope {scope!r}.")
+    try:
+        values = await query(
+            data.fetch_frame_values,
+            _db_path(),
+            log_key,
+            frame_number,
+            scope,
+            path,
+            offset,
+            limit,
+            request=request,
+        )
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Bad path {path!r}: {e}") from None
+    if values is None:
+        raise HTTPException(status_code=404, detail="No such frame or path.")
+    return values
+
+
+@app.get("/log/{log_key}/frames/{frame_number}/{scope}/value")
+async def frame_value(
+    request: Request, log_key: str, frame_number: int, scope: str, path: str
+) -> dict[str, Any]:
+    if scope not in data.FRAME_SCOPES:
+        raise HTTPException(status_code=404, detail=f"Unknown scope {scope!r}.")
+    try:
+        value = await query(
+            data.fetch_frame_value,
+            _db_path(),
+            log_key,
+            frame_number,
+            scope,
+            path,
+            request=request,
+        )
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Bad path {path!r}: {e}") from None
+    if value is None:
+        raise HTTPException(status_code=404, detail="No such frame or path.")
+    return value
@@ -0,0 +1,95 @@
+"""Route for /locals — errors by the value a local variable had in their traceback."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+
+from bug_trail import data_code as data
+from bug_trail.app import STATE, app, cached_page, render
+from bug_trail.async_data import query
+from bug_trail.routes.logs import RELATIVE_TIME_MAX_AGE, _log_key
+from bug_trail.view_shared import humanize_time, replace_msg_args
+
+logger = logging.getLogger(__name__)
+
+LOCALS_PAGE_SIZE = 50
+
+
+@app.get("/locals", response_class=HTMLResponse)
+@cached_page(max_age=RELATIVE_TIME_MAX_AGE)
+async def locals_search(
+    request: Request,
+    name: str = "",
+    op: str = "=",
+    value: str = "",
+    before: int | None = None,
+) -> HTMLResponse:
+    op = op if op in data.LOCALS_OPERATORS else "="
+    results: list[dict] = []
+    total = 0
+    error = None
+    enabled = True
+    db_path = STATE.db_path
+    if db_path and os.path.exists(db_path):
+        enabled = await query(data.locals_index_enabled, db_path, request=request)
+        if enabled and name.strip() and value.strip():
+            try:
+                results, total = await query(
+                    data.search_locals,
+                    db_path,
+                    name.strip(),
+                    op,
+                    data.parse_local_value(value),
+                    limit=LOCALS_PAGE_SIZE,
+                    before=before,
+                    request=request,
+                )
+            except ValueError as e:
+                error = str(e)
+            except sqlite3.OperationalError as e:
+                logger.warning("locals search for %r failed: %s", name, e)
+                error = "The locals index can't be read."
+    for entry in results:
+        entry["detail_key"] = _log_key(entry)
+        try:
+            entry["created"] = humanize_time(
+                entry.get("created") or 0, entry.get("msecs") or 0
+            )
+        except Exception:  # noqa: BLE001
+            entry["created"] = str(entry.get("created", ""))
+        try:
+            replace_msg_args(entry)
+        except Exception:  # noqa: BLE001
+            pass
+
+    older_href = None
+    if len(results) == LOCALS_PAGE_SIZE:
+        older_href = "/locals?" + urlencode(
+            {"name": name, "op": op, "value": value, "before": results[-1]["frame_id"]}
+        )
+    return render(
+        request,
+        "view_locals.jinja",
+        variable=name,
+        op=op,
+        value=value,
+        operators=data.LOCALS_OPERATORS,
+        enabled=enabled,
+        results=results,
+        total=total,
+        capped=total > data.LOCALS_MATCH_CAP,
+        match_cap=data.LOCALS_MATCH_CAP,
+        first_href=(
+            "/locals?" + urlencode({"name": name, "op": op, "value": value})
+            if before is not None
+            else None
+        ),
+        older_href=older_href,
+        error=error,
+    )
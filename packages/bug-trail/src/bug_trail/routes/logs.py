@@ -2,47 +2,284 @@
 
 from __future__ import annotations
 
+import datetime
 import json
 import logging
 import os
-from urllib.parse import quote
+from typing import Any
+from urllib.parse import quote, urlencode
 
-from fastapi import HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 
 from bug_trail import data_code as data
-from bug_trail.app import STATE, app, render
-from bug_trail.view_shared import (humanize_time, humanize_time_span,
-                                   replace_msg_args)
+from bug_trail.app import STATE, app, cached_page, render, render_stream, templates
+from bug_trail.async_data import query
+from bug_trail.view_shared import humanize_time, humanize_time_span, replace_msg_args
 
 logger = logging.getLogger(__name__)
 
 PAGE_SIZE = 100
-
-
-def _log_key_raw(entry: dict) -> str:
-    return f"{entry.get('created', '')}|{entry.get('filename', '')}|{entry.get('lineno', '')}"
+# Page numbers shown either side of the current one.
+NAV_WINDOW = 2
+# Rows show relative times, so cached pages are re-rendered at least this often.
+RELATIVE_TIME_MAX_AGE = 30.0
+# A filtered list counts its matches up to this many, then shows "10,000+".
+FILTERED_COUNT_CAP = 10_000
+# Levels offered by the filter form
+LEVEL_CHOICES = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+# Frames rendered with the detail page, and fetched per "show earlier frames".
+FRAME_PAGE_SIZE = 50
 
 
 def _log_key(entry: dict) -> str:
     """URL-safe detail key for the list view."""
-    return quote(_log_key_raw(entry), safe="")
+    return quote(str(entry.get("record_id", "")), safe="")
+
+
+def _page_href(
+    page: int,
+    before: data.LogCursor | None = None,
+    after: data.LogCursor | None = None,
+    filter_query: str = "",
+) -> str:
+    # filter_query is already URL-encoded, e.g. "&module=db"
+    if before is not None:
+        return f"/?before={quote(before.encode(), safe='')}&page={page}{filter_query}"
+    if after is not None and page > 0:
+        return f"/?after={quote(after.encode(), safe='')}&page={page}{filter_query}"
+    return "/?" + filter_query[1:] if filter_query else "/"
+
+
+def _page_window(
+    db_path: str,
+    rows: list[dict],
+    page: int,
+    total_pages: int | None,
+    filters: data.LogFilter | None = None,
+    filter_query: str = "",
+) -> list[dict]:
+    """
+    First/prev, up to NAV_WINDOW page numbers either side, next/last.
+
+    Cursors for the neighbouring pages come from index-only key lookups, so
+    building the navigator costs the same on page 3 and page 30,000.
+    total_pages is None when a filtered count stopped at its cap.
+    """
+    if not rows or (total_pages is not None and total_pages <= 1):
+        return []
+    first_row, last_row = data.LogCursor.of(rows[0]), data.LogCursor.of(rows[-1])
+    needed = (NAV_WINDOW - 1) * PAGE_SIZE + 1
+
+    newer_hrefs: list[tuple[int, str]] = []
+    if page > 0:
+        newer = data.fetch_log_keys(
+            db_path, first_row, needed, older=False, filters=filters
+        )
+        for step in range(1, NAV_WINDOW + 1):
+            if page - step < 0 or len(newer) <= (step - 1) * PAGE_SIZE:
+                break
+            cursor = first_row if step == 1 else newer[(step - 1) * PAGE_SIZE - 1]
+            newer_hrefs.append(
+                (
+                    page - step,
+                    _page_href(page - step, after=cursor, filter_query=filter_query),
+                )
+            )
+
+    older_hrefs: list[tuple[int, str]] = []
+    if len(rows) == PAGE_SIZE:
+        older = data.fetch_log_keys(
+            db_path, last_row, needed, older=True, filters=filters
+        )
+        for step in range(1, NAV_WINDOW + 1):
+            if len(older) <= (step - 1) * PAGE_SIZE:
+                break
+            cursor = last_row if step == 1 else older[(step - 1) * PAGE_SIZE - 1]
+            older_hrefs.append(
+                (
+                    page + step,
+                    _page_href(page + step, before=cursor, filter_query=filter_query),
+                )
+            )
+
+    links = [
+        {
+            "label": "First",
+            "href": _page_href(0, filter_query=filter_query) if page > 0 else None,
+            "active": False,
+        },
+        {
+            "label": "Newer",
+            "href": newer_hrefs[0][1] if newer_hrefs else None,
+            "active": False,
+        },
+    ]
+    for number, href in reversed(newer_hrefs):
+        links.append({"label": str(number + 1), "href": href, "active": False})
+    links.append({"label": str(page + 1), "href": None, "active": True})
+    for number, href in older_hrefs:
+        links.append({"label": str(number + 1), "href": href, "active": False})
+    links.append(
+        {
+            "label": "Older",
+            "href": older_hrefs[0][1] if older_hrefs else None,
+            "active": False,
+        }
+    )
+    # Without a full count the last page's number is unknown.
+    last_href = (
+        f"/?last=1{filter_query}" if older_hrefs and total_pages is not None else None
+    )
+    links.append({"label": "Last", "href": last_href, "active": False})
+    return links
 
 
-def _grouped_key_raw(entry: dict) -> str:
-    return (
-        f"{entry['TemporalDetails'].get('created', '')}|"
-        f"{entry['SourceContext'].get('filename', '')}|"
-        f"{entry['SourceContext'].get('lineno', '')}"
+def _decode_cursor(value: str | None) -> data.LogCursor | None:
+    if not value:
+        return None
+    try:
+        return data.LogCursor.decode(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Bad page cursor.") from None
+
+
+def _parse_level(value: str, name: str) -> int | None:
+    """A level name ("WARNING") or number ("30")."""
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise HTTPException(status_code=400, detail=f"Unknown {name} {value!r}.")
+    return level
+
+
+def _parse_time(value: str, name: str) -> float | None:
+    """ISO 8601 (a datetime-local input sends 2024-05-01T12:30) or a Unix time. Naive means local."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Bad {name} time {value!r}."
+        ) from None
+
+
+def _parse_filters(
+    level: str,
+    max_level: str,
+    logger_name: str,
+    module: str,
+    exception: str,
+    since: str,
+    until: str,
+    user: str,
+) -> data.LogFilter:
+    user_key, user_value = None, None
+    if user:
+        user_key, separator, user_value = user.partition("=")
+        if not separator or not user_key:
+            raise HTTPException(
+                status_code=400, detail="user filter must be key=value."
+            )
+    return data.LogFilter(
+        min_level=_parse_level(level, "level"),
+        max_level=_parse_level(max_level, "max_level"),
+        logger=logger_name or None,
+        module=module or None,
+        exception=exception or None,
+        since=_parse_time(since, "since"),
+        until=_parse_time(until, "until"),
+        user_key=user_key,
+        user_value=user_value,
     )
 
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request, page: int = 0) -> HTMLResponse:
+@cached_page(max_age=RELATIVE_TIME_MAX_AGE)
+async def index(
+    request: Request,
+    before: str | None = None,
+    after: str | None = None,
+    page: int = 0,
+    last: bool = False,
+    q: str | None = None,
+    order: str = "rank",
+    level: str = "",
+    max_level: str = "",
+    logger_name: str = Query("", alias="logger"),
+    module: str = "",
+    exception: str = "",
+    since: str = "",
+    until: str = "",
+    user: str = "",
+) -> HTMLResponse:
+    if q is not None:
+        from bug_trail.routes.search import search_page
+
+        return await search_page(request, q, page, order)
     db_path = STATE.db_path
     if not db_path or not os.path.exists(db_path):
         return render(request, "view_empty.jinja")
+    before_cursor = _decode_cursor(before)
+    after_cursor = _decode_cursor(after)
+    filters = _parse_filters(
+        level, max_level, logger_name, module, exception, since, until, user
+    )
+    # As given, for the form and the page links
+    filter_values = {
+        "level": level,
+        "max_level": max_level,
+        "logger": logger_name,
+        "module": module,
+        "exception": exception,
+        "since": since,
+        "until": until,
+        "user": user,
+    }
+    filter_query = urlencode(
+        {key: value for key, value in filter_values.items() if value}
+    )
+    context = await query(
+        _load_index,
+        db_path,
+        before_cursor,
+        after_cursor,
+        page,
+        last,
+        filters,
+        "&" + filter_query if filter_query else "",
+        request=request,
+    )
+    if context is None:
+        return render(request, "view_empty.jinja")
+    return render(
+        request,
+        "view_main.jinja",
+        filters=filter_values,
+        filtered=bool(filters),
+        level_choices=LEVEL_CHOICES,
+        **context,
+    )
 
+
+def _load_index(
+    db_path: str,
+    before_cursor: data.LogCursor | None,
+    after_cursor: data.LogCursor | None,
+    page: int,
+    last: bool,
+    filters: data.LogFilter | None = None,
+    filter_query: str = "",
+) -> dict | None:
+    """The list page's queries, on a reader thread. None when there are no logs at all."""
     try:
         row_count = data.table_row_count(db_path, "logs")
     except Exception as e:  # noqa: BLE001
@@ -50,18 +287,70 @@ def index(request: Request, page: int = 0) -> HTMLResponse:
         row_count = 0
 
     if row_count == 0:
-        return render(request, "view_empty.jinja")
+        return None
+
+    promoted = data.fetch_promoted_keys(db_path)
+    capped = False
+    if filters:
+        filters = filters.promoted(promoted)
+        row_count = data.count_logs(db_path, filters, cap=FILTERED_COUNT_CAP)
+        capped = row_count > FILTERED_COUNT_CAP
+    total_pages = None if capped else max(1, (row_count + PAGE_SIZE - 1) // PAGE_SIZE)
+    # Read before the page: rows landing in between are pushed again, not skipped.
+    last_id = data.max_log_rowid(db_path)
+    # `page` is only a label carried along with the cursor; the cursor decides the rows.
+    if last and total_pages is not None:
+        page = total_pages - 1
+        log_data = data.fetch_log_page(db_path, PAGE_SIZE, oldest=True, filters=filters)
+    elif before_cursor is not None:
+        log_data = data.fetch_log_page(
+            db_path, PAGE_SIZE, before=before_cursor, filters=filters
+        )
+    elif after_cursor is not None:
+        log_data = data.fetch_log_page(
+            db_path, PAGE_SIZE, after=after_cursor, filters=filters
+        )
+        if len(log_data) < PAGE_SIZE:
+            # Near the top a page counted back from the cursor comes up short.
+            page = 0
+            log_data = data.fetch_log_page(db_path, PAGE_SIZE, filters=filters)
+    else:
+        page = 0
+        log_data = data.fetch_log_page(db_path, PAGE_SIZE, filters=filters)
+    page = max(0, page) if total_pages is None else min(max(0, page), total_pages - 1)
+    navigator = _page_window(
+        db_path, log_data, page, total_pages, filters, filter_query
+    )
+
+    _prepare_list_rows(log_data)
+
+    return {
+        "logs": log_data,
+        "navigator": navigator,
+        "current_page": page,
+        "total_pages": total_pages,
+        "row_count": f"{FILTERED_COUNT_CAP:,}+" if capped else row_count,
+        # Only the newest, unfiltered page takes live rows; others would skip a page's
+        # worth or show rows outside the filter.
+        "live_since": last_id if page == 0 and not filters else None,
+        # Offered by the extra field input; these filters are index lookups.
+        "promoted_keys": sorted(promoted),
+    }
 
-    offset = max(0, page) * PAGE_SIZE
-    log_data = data.fetch_log_data(db_path, limit=PAGE_SIZE, offset=offset)
 
+def _prepare_list_rows(log_data: list[dict]) -> None:
+    """Add the display fields view_log_rows.jinja uses, in place."""
     for entry in log_data:
         entry["detail_key"] = _log_key(entry)
         lineno = entry.get("lineno")
         fname = entry.get("filename") or "(unknown)"
-        entry["filename_display"] = f"{fname} ({lineno})" if lineno is not None else fname
+        entry["filename_display"] = (
+            f"{fname} ({lineno})" if lineno is not None else fname
+        )
         try:
-            entry["created"] = humanize_time(entry.get("created") or 0, entry.get("msecs") or 0)
+            entry["created"] = humanize_time(
+                entry.get("created") or 0, entry.get("msecs") or 0
+            )
         except Exception:  # noqa: BLE001
             entry["created"] = str(entry.get("created", ""))
         try:
@@ -69,40 +358,74 @@ def index(request: Request, page: int = 0) -> HTMLResponse:
         except Exception:  # noqa: BLE001
             pass
 
-    total_pages = (row_count + PAGE_SIZE - 1) // PAGE_SIZE
-    pages = list(range(total_pages))
 
-    return render(
-        request,
-        "view_main.jinja",
-        logs=log_data,
-        pages=pages,
-        current_page=page,
-        row_count=row_count,
-    )
+def render_log_rows(log_data: list[dict]) -> str:
+    """The list page's <tr> elements for `log_data`, for the live feed."""
+    _prepare_list_rows(log_data)
+    return templates.get_template("view_log_rows.jinja").render(logs=log_data)
 
 
 @app.get("/log/{log_key}", response_class=HTMLResponse)
-def log_detail(request: Request, log_key: str) -> HTMLResponse:
+@cached_page(max_age=RELATIVE_TIME_MAX_AGE)
+async def log_detail(request: Request, log_key: str) -> Response:
     db_path = STATE.db_path
     if not db_path or not os.path.exists(db_path):
         raise HTTPException(status_code=404, detail="No database available.")
 
-    all_logs = data.fetch_log_data_grouped(db_path)
-
-    # FastAPI has already URL-decoded log_key, so compare against the raw form.
-    selected = None
-    for entry in all_logs:
-        if _grouped_key_raw(entry) == log_key:
-            selected = entry
-            break
-
+    # FastAPI has already URL-decoded log_key.
+    selected, moved_to = await query(_load_detail, db_path, log_key, request=request)
+    if moved_to is not None:
+        return RedirectResponse(url=moved_to, status_code=301)
     if selected is None:
         raise HTTPException(status_code=404, detail="Log entry not found.")
+    record_id = str(selected["UserData"].get("record_id") or log_key)
+    # Only where each frame was; locals and globals are fetched when opened.
+    frames = await query(load_frame_page, db_path, record_id, request=request)
+    # Tracebacks and extra fields can run to megabytes; written out as rendered.
+    return await render_stream(
+        request,
+        "view_detail.jinja",
+        log=selected,
+        frames=frames,
+        frames_url=f"/log/{quote(record_id, safe='')}/frames",
+        frame_page_size=FRAME_PAGE_SIZE,
+    )
 
-    _prepare_detail_view(selected)
 
-    return render(request, "view_detail.jinja", log=selected)
+def _load_detail(db_path: str, log_key: str) -> tuple[dict | None, str | None]:
+    """The detail page's entry, or where a legacy key now lives, on a reader thread."""
+    selected = data.fetch_log_detail(db_path, log_key)
+    if selected is None and "|" in log_key:
+        # Bookmarks from before detail URLs used record_id: created|filename|lineno
+        legacy = data.fetch_log_detail_by_legacy_key(db_path, log_key)
+        if legacy is not None and legacy["UserData"].get("record_id"):
+            return None, f"/log/{quote(str(legacy['UserData']['record_id']), safe='')}"
+        selected = legacy
+    if selected is not None:
+        _prepare_detail_view(selected)
+    return selected, None
+
+
+def load_frame_page(
+    db_path: str,
+    record_id: str,
+    offset: int | None = None,
+    limit: int = FRAME_PAGE_SIZE,
+) -> dict[str, Any]:
+    """
+    A page of frames with their rendered rows. offset None is the innermost page,
+    where the error was raised, which is what a deep recursion's reader wants first.
+    """
+    frames, total = data.fetch_frames(db_path, record_id, offset or 0, limit)
+    if offset is None and total > limit:
+        offset = total - limit
+        frames, total = data.fetch_frames(db_path, record_id, offset, limit)
+    return {
+        "total": total,
+        "offset": offset or 0,
+        "frames": frames,
+        "html": templates.get_template("view_frame_rows.jinja").render(frames=frames),
+    }
 
 
 def _prepare_detail_view(selected_log: dict) -> None:
@@ -158,6 +481,8 @@ def _prepare_detail_view(selected_log: dict) -> None:
         to_delete = [k for k, v in section.items() if v is None or v == ""]
         for k in to_delete:
             del section[k]
-    to_delete = [name for name, v in selected_log.items() if isinstance(v, dict) and not v]
+    to_delete = [
+        name for name, v in selected_log.items() if isinstance(v, dict) and not v
+    ]
     for name in to_delete:
         del selected_log[name]
@@ -0,0 +1,98 @@
+"""Route for /search — full-text search over messages, tracebacks and exceptions."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from markupsafe import Markup, escape
+
+from bug_trail import data_code as data
+from bug_trail.app import STATE, app, cached_page, render
+from bug_trail.async_data import query
+from bug_trail.routes.logs import RELATIVE_TIME_MAX_AGE, _log_key
+from bug_trail.view_shared import humanize_time, replace_msg_args
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 50
+
+
+def highlight(snippet: str | None) -> Markup:
+    """HTML for a search excerpt: the text escaped, the matched words in <mark>."""
+    html = str(escape(snippet or ""))
+    return Markup(
+        html.replace(data.SNIPPET_START, "<mark>").replace(data.SNIPPET_END, "</mark>")
+    )
+
+
+@app.get("/search", response_class=HTMLResponse)
+@cached_page(max_age=RELATIVE_TIME_MAX_AGE)
+async def search(
+    request: Request, q: str = "", page: int = 0, order: str = "rank"
+) -> HTMLResponse:
+    return await search_page(request, q, page, order)
+
+
+async def search_page(request: Request, q: str, page: int, order: str) -> HTMLResponse:
+    """The results page; also what / shows when given q=."""
+    order = order if order in data.SEARCH_ORDERS else "rank"
+    # Pages past the match cap would need ever larger OFFSETs; the count stops there too.
+    last_page = (data.SEARCH_MATCH_CAP - 1) // SEARCH_PAGE_SIZE
+    page = min(max(0, page), last_page)
+    results: list[dict] = []
+    total = 0
+    error = None
+    db_path = STATE.db_path
+    if q.strip() and db_path and os.path.exists(db_path):
+        try:
+            results, total = await query(
+                data.search_logs,
+                db_path,
+                q,
+                limit=SEARCH_PAGE_SIZE,
+                offset=page * SEARCH_PAGE_SIZE,
+                order=order,
+                request=request,
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning("search for %r failed: %s", q, e)
+            error = (
+                "Search isn't available for this database (it needs SQLite with FTS5)."
+            )
+    for entry in results:
+        entry["detail_key"] = _log_key(entry)
+        entry["snippet"] = highlight(entry.get("snippet"))
+        try:
+            entry["created"] = humanize_time(
+                entry.get("created") or 0, entry.get("msecs") or 0
+            )
+        except Exception:  # noqa: BLE001
+            entry["created"] = str(entry.get("created", ""))
+        try:
+            replace_msg_args(entry)
+        except Exception:  # noqa: BLE001
+            pass
+
+    def href(to_page: int) -> str:
+        return "/search?" + urlencode({"q": q, "page": to_page, "order": order})
+
+    more = total > (page + 1) * SEARCH_PAGE_SIZE and page < last_page
+    return render(
+        request,
+        "view_search.jinja",
+        q=q,
+        order=order,
+        results=results,
+        total=total,
+        capped=total > data.SEARCH_MATCH_CAP,
+        match_cap=data.SEARCH_MATCH_CAP,
+        page=page,
+        newer_href=href(page - 1) if page > 0 else None,
+        older_href=href(page + 1) if more else None,
+        error=error,
+    )
@@ -0,0 +1,93 @@
+"""Background WAL checkpoints for the database the viewer is watching."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from bug_trail_core.checkpoint import WalCheckpointer, wal_size
+
+logger = logging.getLogger(__name__)
+
+
+class WalMonitor:
+    """
+    Ticks a `WalCheckpointer` every `poll_interval` seconds on its own thread.
+
+    The database counts as idle when the -wal file is the same size and age as
+    on the previous tick, which is when a TRUNCATE checkpoint gets to run.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        interval: float = 30.0,
+        size_limit: int = 64 * 1024 * 1024,
+        poll_interval: float = 5.0,
+    ) -> None:
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.checkpointer = WalCheckpointer(
+            db_path, interval=interval, size_limit=size_limit
+        )
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_seen: tuple[int, float] | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="bug-trail-wal-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _wal_state(self) -> tuple[int, float]:
+        try:
+            return wal_size(self.db_path), os.path.getmtime(self.db_path + "-wal")
+        except OSError:
+            return 0, 0.0
+
+    def tick(self, conn: sqlite3.Connection) -> None:
+        """Checkpoint if due. Public so tests can drive it without the thread."""
+        state = self._wal_state()
+        idle = state == self._last_seen
+        result = self.checkpointer.tick(conn, idle=idle)
+        if result is not None:
+            logger.debug(
+                "%s checkpoint: %s/%s frames in %.1f ms%s",
+                result.mode,
+                result.checkpointed_frames,
+                result.wal_frames,
+                result.duration_s * 1000,
+                " (busy)" if result.busy else "",
+            )
+        self._last_seen = self._wal_state()
+
+    def _run(self) -> None:
+        conn: sqlite3.Connection | None = None
+        try:
+            while not self._stop.wait(self.poll_interval):
+                if conn is None:
+                    if not os.path.exists(self.db_path):
+                        continue
+                    # mode=rw: never create the database, that is the handler's job
+                    conn = sqlite3.connect(
+                        f"file:{quote(self.db_path)}?mode=rw", uri=True, timeout=1.0
+                    )
+                try:
+                    self.tick(conn)
+                except sqlite3.Error as error:
+                    logger.warning("WAL checkpoint failed: %s", error)
+                    conn.close()
+                    conn = None
+        finally:
+            if conn is not None:
+                conn.close()
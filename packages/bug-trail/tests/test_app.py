@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import sqlite3
 
 import pytest
 from fastapi.testclient import TestClient
@@ -70,6 +71,254 @@ def test_detail_page(configured_db):
     assert "Basic Data" in detail.text
 
 
+def test_index_filters_are_applied_and_kept_in_links(tmp_path, monkeypatch):
+    import re
+
+    from bug_trail_core.handlers import BaseErrorLogHandler
+
+    db_path = str(tmp_path / "filters.db")
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelno, levelname, module) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (
+                f"id-{i:04d}",
+                1000.0 + i,
+                f"row {i}",
+                50 if i % 2 else 40,
+                "CRITICAL" if i % 2 else "ERROR",
+                "db",
+            )
+            for i in range(250)
+        ],
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app_module.STATE, "db_path", db_path)
+    client = TestClient(app)
+
+    r = client.get("/", params={"level": "critical", "module": "db"})
+    assert r.status_code == 200
+    assert "(125)" in r.text
+    assert "row 248" not in r.text and "row 249" in r.text
+    assert '<option value="CRITICAL" selected>' in r.text
+    older = re.search(r'href="(/\?before=[^"]+)">Older', r.text).group(1)
+    assert "level=critical" in older and "module=db" in older
+    r = client.get(older.replace("&amp;", "&"))
+    assert "row 49" in r.text and "row 48" not in r.text and "row 249" not in r.text
+
+    assert (
+        "No logs match these filters."
+        in client.get("/", params={"module": "nowhere"}).text
+    )
+    assert client.get("/", params={"level": "LOUD"}).status_code == 400
+    assert client.get("/", params={"user": "no-separator"}).status_code == 400
+
+
+def test_search_highlights_matches(configured_db):
+    client = TestClient(app)
+    r = client.get("/search", params={"q": "boom"})
+    assert r.status_code == 200
+    assert "1 match\n" in r.text
+    assert "<mark>boom</mark>" in r.text
+    assert "/log/" in r.text
+
+    # Same results from q= on the log list; punctuation is not query syntax.
+    r = client.get("/", params={"q": 'broke: "boom'})
+    assert "<mark>broke</mark>" in r.text
+    assert "0 matches" in client.get("/search", params={"q": "nowhere"}).text
+
+
+def test_locals_search_finds_errors_by_variable_value(configured_db):
+    from bug_trail_core.handlers import BugTrailHandler
+
+    client = TestClient(app)
+    assert "aren't indexed" in client.get("/locals").text
+
+    handler = BugTrailHandler(configured_db, index_locals=True)
+    logger = logging.getLogger("bt-locals-test")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    def charge(order_id, amount):
+        raise ValueError("card declined")
+
+    try:
+        # Not named like charge's arguments, or this frame's locals would match too
+        for order, total in ((12345, -5), (777, 10)):
+            try:
+                charge(order, total)
+            except ValueError:
+                logger.exception("charge failed")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    r = client.get("/locals", params={"name": "order_id", "value": "12345"})
+    assert r.status_code == 200
+    assert "1 matching frame." in r.text
+    assert "order_id = 12345" in r.text
+    assert "/log/" in r.text
+    r = client.get("/locals", params={"name": "amount", "op": "<", "value": "0"})
+    assert "amount = -5" in r.text and "amount = 10" not in r.text
+    # Digits in quotes are text, which no int local equals
+    assert (
+        "0 matching frames"
+        in client.get("/locals", params={"name": "order_id", "value": '"12345"'}).text
+    )
+
+
+def test_frame_explorer_lists_frames_and_loads_values_on_demand(configured_db):
+    from bug_trail_core.handlers import BugTrailHandler
+
+    from bug_trail.routes.frames import FRAME_PAGE_SIZE
+
+    handler = BugTrailHandler(configured_db)
+    logger = logging.getLogger("bt-frames-test")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    def recurse(depth, note, settings):
+        if not depth:
+            raise RecursionError("too deep")
+        return recurse(depth - 1, note, settings)
+
+    try:
+        recurse(
+            FRAME_PAGE_SIZE + 10,
+            "n" * 300,
+            {"retries": [1, 2, {"backoff": "x" * 500}], "debug": True},
+        )
+    except RecursionError:
+        logger.exception("recursed")
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    conn = sqlite3.connect(configured_db)
+    (record_id,) = conn.execute(
+        "SELECT record_id FROM logs WHERE msg = 'recursed'"
+    ).fetchone()
+    conn.close()
+
+    client = TestClient(app)
+    detail = client.get(f"/log/{record_id}")
+    # The innermost page only, where the error was raised
+    assert detail.text.count("data-frame=") == FRAME_PAGE_SIZE
+    assert "Show earlier frames (12 more)" in detail.text
+    earlier = client.get(
+        f"/log/{record_id}/frames", params={"offset": 0, "limit": 12}
+    ).json()
+    assert earlier["total"] == FRAME_PAGE_SIZE + 12
+    assert (
+        earlier["frames"][0]["function"]
+        == "test_frame_explorer_lists_frames_and_loads_values_on_demand"
+    )
+    assert earlier["frames"][1]["function"] == "recurse"
+
+    innermost = FRAME_PAGE_SIZE + 11
+    values = client.get(f"/log/{record_id}/frames/{innermost}/locals").json()
+    entries = {entry["key"]: entry for entry in values["entries"]}
+    assert entries["depth"]["preview"] == "0"
+    assert len(entries["note"]["preview"]) < entries["note"]["size"] == 300
+    assert entries["settings"]["count"] == 2
+    nested = client.get(
+        f"/log/{record_id}/frames/{innermost}/locals",
+        params={"path": "$.settings.retries"},
+    ).json()
+    assert [entry["type"] for entry in nested["entries"]] == [
+        "integer",
+        "integer",
+        "object",
+    ]
+    full = client.get(
+        f"/log/{record_id}/frames/{innermost}/locals/value",
+        params={"path": "$.settings.retries[2].backoff"},
+    ).json()
+    assert full["value"] == "x" * 500 and not full["truncated"]
+    assert (
+        client.get(
+            f"/log/{record_id}/frames/{innermost}/globals", params={"limit": 1}
+        ).json()["total"]
+        > 1
+    )
+
+    assert (
+        client.get(
+            f"/log/{record_id}/frames/{innermost}/locals", params={"path": "$.missing"}
+        ).status_code
+        == 404
+    )
+    assert (
+        client.get(
+            f"/log/{record_id}/frames/{innermost}/locals", params={"path": "$[["}
+        ).status_code
+        == 400
+    )
+    assert client.get(f"/log/{record_id}/frames/999/locals").status_code == 404
+    assert client.get(f"/log/{record_id}/frames/0/builtins").status_code == 404
+
+
+def test_frames_written_without_locations_are_read_from_the_traceback(configured_db):
+    conn = sqlite3.connect(configured_db)
+    conn.execute(
+        "UPDATE logs SET traceback = ?",
+        (
+            'Traceback (most recent call last):\n  File "app.py", line 3, in <module>\n    main()\n'
+            '  File "app.py", line 9, in main\n    raise ValueError\nValueError\n',
+        ),
+    )
+    (record_id,) = conn.execute("SELECT record_id FROM logs").fetchone()
+    conn.executemany(
+        "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals, f_globals) VALUES (?, ?, '{}', '{}')",
+        [(record_id, 0), (record_id, 1)],
+    )
+    conn.commit()
+    conn.close()
+
+    frames = TestClient(app).get(f"/log/{record_id}/frames").json()["frames"]
+    assert [(frame["function"], frame["lineno"]) for frame in frames] == [
+        ("<module>", 3),
+        ("main", 9),
+    ]
+
+
+def test_rollups_feed_the_charts_without_reading_logs(configured_db):
+    client = TestClient(app)
+    assert 'id="activity"' in client.get("/").text
+
+    conn = sqlite3.connect(configured_db)
+    # Chart queries read the rollups only: logs could be gone for all they know.
+    conn.execute("DELETE FROM logs")
+    conn.commit()
+    conn.close()
+
+    r = client.get(
+        "/rollups", params={"resolution": "minute", "dimension": "level", "buckets": 5}
+    )
+    assert r.status_code == 200
+    chart = r.json()
+    assert chart["seconds"] == 60 and len(chart["buckets"]) == 5
+    assert chart["buckets"][1] - chart["buckets"][0] == 60
+    assert [(series["value"], series["total"]) for series in chart["series"]] == [
+        ("ERROR", 1)
+    ]
+    # In the current minute, or the one before if the clock just turned
+    assert chart["totals"][-2] + chart["totals"][-1] == sum(chart["totals"]) == 1
+    assert chart["other"] is None
+    assert (
+        client.get("/rollups", params={"dimension": "logger"}).json()["series"][0][
+            "value"
+        ]
+        == "bt-test"
+    )
+    assert (
+        client.get("/rollups", params={"dimension": "exception"}).json()["series"] == []
+    )
+    assert client.get("/rollups", params={"resolution": "week"}).status_code == 400
+    assert client.get("/rollups", params={"dimension": "msg"}).status_code == 400
+
+
 def test_admin_page_lists_counts(configured_db):
     client = TestClient(app)
     r = client.get("/admin")
@@ -77,6 +326,13 @@ def test_admin_page_lists_counts(configured_db):
     assert "Row counts" in r.text
 
 
+def test_admin_page_shows_handler_metrics(configured_db):
+    client = TestClient(app)
+    r = client.get("/admin")
+    assert "Handler metrics" in r.text
+    assert "<code>db_write</code>" in r.text
+
+
 def test_admin_clear_requires_confirm(configured_db):
     client = TestClient(app)
     # Missing confirm returns a redirect without clearing.
@@ -89,14 +345,44 @@ def test_admin_clear_requires_confirm(configured_db):
 
 def test_admin_clear_then_empty(configured_db):
     client = TestClient(app)
-    r = client.post(
-        "/admin/clear", data={"confirm": "yes"}, follow_redirects=False
-    )
+    r = client.post("/admin/clear", data={"confirm": "yes"}, follow_redirects=False)
     assert r.status_code == 303
     r2 = client.get("/")
     assert "No log data yet" in r2.text
 
 
+def test_admin_recount_repairs_cached_counts(configured_db):
+    conn = sqlite3.connect(configured_db)
+    conn.execute("UPDATE table_stats SET row_count = 42 WHERE table_name = 'logs'")
+    conn.commit()
+    conn.close()
+    client = TestClient(app)
+    # The index reads the cached count, not count(*)
+    assert "(42)" in client.get("/").text
+
+    r = client.post("/admin/recount", follow_redirects=False)
+    assert r.status_code == 303
+    assert "(1)" in client.get("/").text
+
+
+def test_admin_reset_restarts_counts(configured_db):
+    from bug_trail_core.handlers import BaseErrorLogHandler
+    from bug_trail_core.promoted_keys import promoted_columns
+
+    BaseErrorLogHandler(configured_db, promoted_keys=["request_id"]).close()
+    client = TestClient(app)
+    client.post("/admin/reset", data={"confirm": "yes"}, follow_redirects=False)
+    conn = sqlite3.connect(configured_db)
+    try:
+        assert conn.execute(
+            "SELECT row_count FROM table_stats WHERE table_name = 'logs'"
+        ).fetchone() == (0,)
+        # The rebuilt logs table keeps its promoted columns, so filters keep their index.
+        assert promoted_columns(conn) == {"request_id": "extra_request_id"}
+    finally:
+        conn.close()
+
+
 def test_environment_and_system_render(configured_db):
     client = TestClient(app)
     assert client.get("/environment").status_code == 200
@@ -108,3 +394,320 @@ def test_health_endpoint():
     r = client.get("/health")
     assert r.status_code == 200
     assert r.text == "ok"
+
+
+def test_admin_page_shows_wal_status(configured_db, monkeypatch):
+    from bug_trail.wal_monitor import WalMonitor
+
+    monitor = WalMonitor(configured_db, interval=0)
+    conn = sqlite3.connect(configured_db)
+    try:
+        conn.execute("PRAGMA wal_autocheckpoint = 0")
+        conn.execute("INSERT INTO logs (record_id, msg) VALUES ('x', 'grow the wal')")
+        conn.commit()
+        monitor.tick(conn)
+    finally:
+        conn.close()
+    monkeypatch.setattr(app_module.STATE, "wal_monitor", monitor)
+    client = TestClient(app)
+    r = client.get("/admin")
+    assert r.status_code == 200
+    assert "WAL size" in r.text
+    assert "PASSIVE: 1" in r.text
+
+
+def test_index_keyset_navigation(tmp_path, monkeypatch):
+    from bug_trail_core.handlers import BaseErrorLogHandler
+
+    db_path = str(tmp_path / "many.db")
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname) VALUES (?, ?, ?, 'ERROR')",
+        [(f"id-{i:05d}", 1000.0 + i, f"row number {i}") for i in range(1050)],
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app_module.STATE, "db_path", db_path)
+    client = TestClient(app)
+
+    first = client.get("/")
+    assert "row number 1049" in first.text
+    assert "Page 1 of 11" in first.text
+    # windowed: no link to every page
+    assert ">11</a>" not in first.text
+
+    import html
+    import re
+
+    older = re.search(r'href="(/\?before=[^"]+page=1)"', first.text)
+    assert older
+    second = client.get(html.unescape(older.group(1)))
+    assert "row number 949" in second.text
+    assert "row number 950" not in second.text
+    assert "Page 2 of 11" in second.text
+
+    last = client.get("/?last=1")
+    assert "row number 0<" in last.text
+    assert "Page 11 of 11" in last.text
+
+    assert client.get("/?before=garbage").status_code == 400
+
+
+def test_detail_by_record_id_and_legacy_redirect(configured_db):
+    conn = sqlite3.connect(configured_db)
+    record_id, created, filename, lineno = conn.execute(
+        "SELECT record_id, created, filename, lineno FROM logs"
+    ).fetchone()
+    conn.close()
+    client = TestClient(app)
+    assert client.get(f"/log/{record_id}").status_code == 200
+    legacy = client.get(
+        f"/log/{created}%7C{filename}%7C{lineno}", follow_redirects=False
+    )
+    assert legacy.status_code == 301
+    assert legacy.headers["location"] == f"/log/{record_id}"
+    assert client.get("/log/does-not-exist").status_code == 404
+
+
+def test_lifespan_serves_reads_from_pool(configured_db):
+    from bug_trail import data_code
+
+    with TestClient(app) as client:
+        pool = app_module.STATE.read_pool
+        assert pool is not None
+        assert client.get("/").status_code == 200
+        assert pool.stats()["open"] >= 1
+    assert app_module.STATE.read_pool is None
+    assert configured_db not in data_code._POOLS
+
+
+def test_pages_revalidate_until_the_database_changes(configured_db, monkeypatch):
+    from bug_trail import data_code
+
+    with TestClient(app) as client:
+        first = client.get("/environment")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "no-cache"
+        assert (
+            client.get("/environment", headers={"If-None-Match": etag}).status_code
+            == 304
+        )
+
+        # A hit doesn't query the logs at all.
+        assert "something broke" in client.get("/").text
+        fetch_log_page = data_code.fetch_log_page
+
+        def fail(*args, **kwargs):
+            raise AssertionError("page was re-rendered")
+
+        monkeypatch.setattr(data_code, "fetch_log_page", fail)
+        assert "something broke" in client.get("/").text
+        monkeypatch.setattr(data_code, "fetch_log_page", fetch_log_page)
+
+        conn = sqlite3.connect(configured_db)
+        conn.execute(
+            "INSERT INTO python_libraries (library_name, version) VALUES ('extra', '1.0')"
+        )
+        conn.commit()
+        conn.close()
+        changed = client.get("/environment", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert "extra" in changed.text
+        assert changed.headers["etag"] != etag
+
+
+def test_environment_page_streams_in_chunks(configured_db):
+    conn = sqlite3.connect(configured_db)
+    conn.executemany(
+        "INSERT INTO python_libraries (library_name, version, urls) VALUES (?, '1.0', ?)",
+        [
+            (f"library-{i:05d}", '{"Homepage": "https://example.com"}')
+            for i in range(3000)
+        ],
+    )
+    conn.commit()
+    (count,) = conn.execute("SELECT count(*) FROM python_libraries").fetchone()
+    conn.close()
+
+    # The test client joins the body up, so count the ASGI messages it's sent in.
+    import asyncio
+
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(60)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/environment",
+        "raw_path": b"/environment",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("test", 1),
+        "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    assert start["status"] == 200
+    assert b"content-length" not in dict(start["headers"])
+    bodies = [message["body"].decode() for message in messages[1:] if message["body"]]
+    assert len(bodies) > 3
+    page = "".join(bodies)
+    assert f'Python Environment <small class="text-muted">({count})</small>' in page
+    assert page.index("library-00000") < page.index("library-02999")
+    assert page.count('href="https://example.com"') == 3000
+    assert page.rstrip().endswith("</html>")
+
+
+def test_live_feed_pushes_new_rows_once_per_change(configured_db):
+    import asyncio
+    import json
+
+    from bug_trail import data_code
+    from bug_trail.live_feed import LiveFeed
+    from bug_trail.routes.logs import render_log_rows
+
+    client = TestClient(app)
+    since = data_code.max_log_rowid(configured_db)
+    assert f'data-live-since="{since}"' in client.get("/").text
+
+    feed = LiveFeed(configured_db, render_rows=render_log_rows)
+
+    async def scenario() -> list[str]:
+        changes: asyncio.Queue[str] = asyncio.Queue()
+        first, second = feed.subscribe(), feed.subscribe()
+        task = asyncio.create_task(feed.run(changes))
+        await asyncio.sleep(0.05)
+        conn = sqlite3.connect(configured_db)
+        conn.execute(
+            "INSERT INTO logs (record_id, created, msg, levelname) "
+            "VALUES ('live-1', 2e9, 'pushed row', 'ERROR')"
+        )
+        conn.commit()
+        conn.close()
+        for _ in range(3):
+            changes.put_nowait("refresh")
+        messages = [
+            await asyncio.wait_for(first.get(), 2),
+            await asyncio.wait_for(second.get(), 2),
+        ]
+        await asyncio.sleep(0.05)
+        task.cancel()
+        assert first.empty()
+        return messages
+
+    messages = asyncio.run(scenario())
+    assert messages[0] is messages[1]
+    header, _, data_line = messages[0].strip().rpartition("\n")
+    assert header == f"id: {since + 1}\nevent: rows"
+    payload = json.loads(data_line.removeprefix("data: "))
+    assert payload["count"] == 1 and payload["row_count"] == 2
+    assert (
+        'data-record-id="live-1"' in payload["html"] and "pushed row" in payload["html"]
+    )
+
+    # Too far behind: reload instead
+    feed.max_rows = 0
+    assert feed.message_since(0) == (since + 1, f"id: {since + 1}\ndata: refresh\n\n")
+
+
+@pytest.mark.parametrize("mode", ["watch", "poll"])
+def test_watcher_coalesces_a_burst_into_one_notification(tmp_path, mode):
+    import asyncio
+
+    from bug_trail.db_watcher import DbWatcher
+
+    db_path = str(tmp_path / "watched.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+    # Unrelated files in the same directory don't count.
+    (tmp_path / "other.db").write_bytes(b"x")
+
+    async def scenario() -> tuple[int, int]:
+        watcher = DbWatcher(db_path, interval=0.3, mode=mode)
+        queue = watcher.subscribe()
+        watcher.start()
+        try:
+            for i in range(200):
+                conn.execute("INSERT INTO t VALUES (?)", (i,))
+                conn.commit()
+            await asyncio.sleep(1.2)
+            burst = queue.qsize()
+            (tmp_path / "other.db").write_bytes(b"y")
+            await asyncio.sleep(0.8)
+            return burst, queue.qsize()
+        finally:
+            watcher.stop()
+
+    burst, after_unrelated = asyncio.run(scenario())
+    conn.close()
+    assert 1 <= burst <= 2
+    assert after_unrelated == burst
+
+
+def test_broadcast_hub_bounds_buffers_and_subscribers():
+    import asyncio
+
+    from bug_trail.broadcast import BroadcastHub, HubFull
+
+    async def scenario() -> None:
+        hub = BroadcastHub(max_buffer=3, max_subscribers=2, overflow_message="refresh")
+        slow, fast = hub.subscribe(), hub.subscribe()
+        with pytest.raises(HubFull):
+            hub.subscribe()
+
+        hub.publish("refresh")
+        hub.publish("refresh")
+        assert await fast.get() == "refresh"
+        assert fast.empty()
+
+        for i in range(5):
+            hub.publish(f"rows {i}")
+        # 1 refresh + 2 rows filled the buffer; the third collapsed it into a reload.
+        assert [slow.get_nowait() for _ in range(slow.qsize())] == [
+            "refresh",
+            "rows 3",
+            "rows 4",
+        ]
+        assert slow.dropped == 3
+
+        hub.unsubscribe(fast)
+        hub.subscribe()
+
+    asyncio.run(scenario())
+
+
+def test_configuration_reaches_worker_processes(tmp_path, monkeypatch):
+    """Workers re-import the app; configure() exports what they need to the environment."""
+    import subprocess
+    import sys
+
+    # Registered with monkeypatch so the exported variables and STATE are restored afterwards.
+    for name in app_module.CONFIG_FIELDS:
+        monkeypatch.setenv(app_module.ENV_PREFIX + name.upper(), "")
+        monkeypatch.setattr(app_module.STATE, name, getattr(app_module.STATE, name))
+    db_path = str(tmp_path / "workers.db")
+    app_module.configure(
+        db_path, query_timeout=2.5, watch_mode="poll", wal_monitor_in_worker=False
+    )
+
+    script = (
+        "from bug_trail.app import STATE; "
+        "print(STATE.db_path, STATE.query_timeout, STATE.watch_mode, STATE.wal_monitor_in_worker)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.split() == [db_path, "2.5", "poll", "False"]
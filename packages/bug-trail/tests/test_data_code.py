@@ -1,7 +1,11 @@
 import datetime
+import sqlite3
 
+from bug_trail_core.handlers import BaseErrorLogHandler
 from bug_trail_core.sqlite3_utils import serialize_to_sqlite_supported
 
+from bug_trail import data_code
+
 
 def test_serialize_to_sqlite_supported_none():
     assert serialize_to_sqlite_supported(None) is None
@@ -29,3 +33,430 @@ def test_serialize_to_sqlite_supported_other():
     custom_obj = CustomObject()
     assert serialize_to_sqlite_supported(custom_obj) == "custom_object"
     assert serialize_to_sqlite_supported([1, 2, 3]) == "[1, 2, 3]"
+
+
+def _seed_logs(db_path: str, count: int) -> None:
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    # Pairs of identical timestamps check the record_id tie-break.
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname) VALUES (?, ?, ?, 'ERROR')",
+        [(f"id-{i:05d}", 1000.0 + i // 2, f"message {i}") for i in range(count)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_keyset_pages_cover_every_row_once(tmp_path):
+    db_path = str(tmp_path / "pages.db")
+    _seed_logs(db_path, 95)
+
+    seen = []
+    page = data_code.fetch_log_page(db_path, limit=10)
+    while page:
+        seen.extend(row["record_id"] for row in page)
+        page = data_code.fetch_log_page(
+            db_path, limit=10, before=data_code.LogCursor.of(page[-1])
+        )
+    assert len(seen) == 95
+    assert len(set(seen)) == 95
+    assert seen[0] == "id-00094"
+
+    oldest = data_code.fetch_log_page(db_path, limit=10, oldest=True)
+    assert oldest[-1]["record_id"] == "id-00000"
+    newer = data_code.fetch_log_page(
+        db_path, limit=10, after=data_code.LogCursor.of(oldest[0])
+    )
+    assert [row["record_id"] for row in newer] == seen[-20:-10]
+
+
+def test_log_keys_and_cursor_round_trip(tmp_path):
+    db_path = str(tmp_path / "keys.db")
+    _seed_logs(db_path, 30)
+    start = data_code.LogCursor(1010.0, "id-00020")
+    assert data_code.LogCursor.decode(start.encode()) == start
+    keys = data_code.fetch_log_keys(db_path, start, 3, older=True)
+    assert [key.record_id for key in keys] == ["id-00019", "id-00018", "id-00017"]
+    keys = data_code.fetch_log_keys(db_path, start, 2, older=False)
+    assert [key.record_id for key in keys] == ["id-00021", "id-00022"]
+
+
+def test_fetch_log_detail_by_record_id_and_legacy_key(tmp_path):
+    db_path = str(tmp_path / "detail.db")
+    _seed_logs(db_path, 10)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "UPDATE logs SET filename = 'a|b.py', lineno = 7 WHERE record_id = 'id-00004'"
+    )
+    conn.commit()
+    conn.close()
+
+    detail = data_code.fetch_log_detail(db_path, "id-00004")
+    assert detail["MessageDetails"]["msg"] == "message 4"
+    assert data_code.fetch_log_detail(db_path, "nope") is None
+
+    legacy = data_code.fetch_log_detail_by_legacy_key(db_path, "1002.0|a|b.py|7")
+    assert legacy["UserData"]["record_id"] == "id-00004"
+    assert data_code.fetch_log_detail_by_legacy_key(db_path, "garbage") is None
+
+
+def test_detail_queries_use_indexes(tmp_path):
+    db_path = str(tmp_path / "plan.db")
+    _seed_logs(db_path, 1)
+    conn = sqlite3.connect(db_path)
+    try:
+        for where, index in (
+            ("logs.record_id = ?", "sqlite_autoindex_logs_1"),
+            (
+                "logs.created = ? AND logs.filename IS ? AND logs.lineno IS ?",
+                "ix_logs_created",
+            ),
+        ):
+            query = data_code.LOG_DETAIL_SET.format(where=where)
+            plan = " ".join(
+                row[-1]
+                for row in conn.execute(
+                    "EXPLAIN QUERY PLAN " + query, [None] * query.count("?")
+                )
+            )
+            assert f"SEARCH logs USING INDEX {index}" in plan
+    finally:
+        conn.close()
+
+
+FILTER_EXAMPLES = {
+    "min_level": {"min_level": 30},
+    "max_level": {"max_level": 40},
+    "logger": {"logger": "app.db"},
+    "module": {"module": "db"},
+    "exception": {"exception": "KeyError"},
+    "since": {"since": 1000.0},
+    "until": {"until": 2000.0},
+    "user": {"user_key": "tenant", "user_value": "acme"},
+}
+
+
+def _filter_plans(
+    conn: sqlite3.Connection, filters: data_code.LogFilter
+) -> list[list[str]]:
+    """Query plans of the list page (first and next), the page navigator's key walk and the count."""
+    plans = []
+    for keyset in ([], ["(logs.created, logs.record_id) < (?, ?)"]):
+        where, params = data_code._and_where(keyset, filters)
+        query = data_code.LOG_PAGE_SET.format(where=where, order="DESC")
+        arguments = [0.0, ""] * len(keyset) + params + [100]
+        plans.append(
+            [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, arguments)]
+        )
+        keys = f"SELECT logs.created, logs.record_id FROM logs {where} ORDER BY logs.created DESC LIMIT ?"
+        plans.append(
+            [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + keys, arguments)]
+        )
+    count, params = data_code._count_query(filters, cap=10)
+    plans.append(
+        [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + count, params)]
+    )
+    return plans
+
+
+def test_every_filter_combination_is_index_backed(tmp_path):
+    import itertools
+    import re
+
+    db_path = str(tmp_path / "filters.db")
+    _seed_logs(db_path, 1)
+    conn = sqlite3.connect(db_path)
+    try:
+        names = list(FILTER_EXAMPLES)
+        for size in range(1, len(names) + 1):
+            for combination in itertools.combinations(names, size):
+                arguments = {}
+                for name in combination:
+                    arguments.update(FILTER_EXAMPLES[name])
+                filters = data_code.LogFilter(**arguments)
+                for plan in _filter_plans(conn, filters):
+                    # The first step reading logs is an index search or an ordered index walk, never a table scan.
+                    logs_step = next(
+                        step for step in plan if re.match(r"(SEARCH|SCAN) logs\b", step)
+                    )
+                    assert re.match(
+                        r"(SEARCH|SCAN) logs USING (COVERING )?INDEX", logs_step
+                    ), (combination, plan)
+                    if "exception" in combination:
+                        assert any(
+                            "USING COVERING INDEX ix_exception_type_name" in step
+                            for step in plan
+                        )
+                        assert any(
+                            "USING INDEX ix_exception_instance_type" in step
+                            for step in plan
+                        )
+                    if "module" in combination:
+                        assert "ix_logs_module_created" in logs_step, (
+                            combination,
+                            plan,
+                        )
+    finally:
+        conn.close()
+
+
+def test_promoted_key_filters_use_their_index(tmp_path):
+    import re
+
+    from bug_trail_core.promoted_keys import promote_keys
+
+    db_path = str(tmp_path / "promoted.db")
+    _seed_logs(db_path, 1)
+    conn = sqlite3.connect(db_path)
+    try:
+        promote_keys(conn, ["request_id"])
+        conn.commit()
+        columns = data_code.fetch_promoted_keys(db_path)
+        for extra in ({}, {"min_level": 40}, {"since": 1000.0}):
+            filters = data_code.LogFilter(
+                user_key="request_id", user_value="r-1", **extra
+            ).promoted(columns)
+            assert filters.user_column == "extra_request_id"
+            plans = _filter_plans(conn, filters)
+            for plan in plans:
+                logs_step = next(
+                    step for step in plan if re.match(r"(SEARCH|SCAN) logs\b", step)
+                )
+                assert "USING INDEX ix_logs_extra_request_id" in logs_step, (
+                    extra,
+                    plan,
+                )
+            if not extra:
+                # The key walks come out of the index already in list order.
+                for keys_plan in (plans[1], plans[3]):
+                    assert not any(
+                        "TEMP B-TREE" in step for step in keys_plan
+                    ), keys_plan
+        # Keys that aren't promoted stay on the JSON path
+        assert (
+            data_code.LogFilter(user_key="tenant", user_value="x")
+            .promoted(columns)
+            .user_column
+            is None
+        )
+    finally:
+        conn.close()
+
+
+def test_log_filters_select_matching_rows(tmp_path):
+    import json
+
+    db_path = str(tmp_path / "filtered.db")
+    BaseErrorLogHandler(db_path, promoted_keys=["tenant"])
+    conn = sqlite3.connect(db_path)
+    rows = [
+        # record_id, created, levelno, name, module, user_data
+        ("a", 1000.0, 40, "app.db", "db", {"tenant": "acme"}),
+        ("b", 1001.0, 30, "app.web", "views", {"tenant": "other"}),
+        ("c", 1002.0, 50, "worker", "db", None),
+        ("d", 1003.0, 40, "app.db.pool", "pool", {"tenant": "acme", "retries": 3}),
+    ]
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, levelno, name, module, user_data) VALUES (?, ?, ?, ?, ?, ?)",
+        [(*row[:5], json.dumps(row[5]) if row[5] else None) for row in rows],
+    )
+    conn.execute(
+        "INSERT INTO exception_type (id, name, module) VALUES (1, 'KeyError', 'builtins')"
+    )
+    conn.execute("INSERT INTO exception_instance (record_id, type_id) VALUES ('c', 1)")
+    conn.commit()
+    conn.close()
+
+    promoted = data_code.fetch_promoted_keys(db_path)
+    assert promoted == {"tenant": "extra_tenant"}
+
+    def ids(**arguments) -> list[str]:
+        matches = []
+        # The same rows whether the key is read from its column or from the JSON
+        for filters in (
+            data_code.LogFilter(**arguments),
+            data_code.LogFilter(**arguments).promoted(promoted),
+        ):
+            page = data_code.fetch_log_page(db_path, 10, filters=filters)
+            assert data_code.count_logs(db_path, filters) == len(page)
+            matches.append([row["record_id"] for row in page])
+        assert matches[0] == matches[1]
+        return matches[0]
+
+    assert ids() == ["d", "c", "b", "a"]
+    assert ids(min_level=40) == ["d", "c", "a"]
+    assert ids(min_level=40, max_level=40) == ["d", "a"]
+    assert ids(logger="app.db") == ["d", "a"]
+    assert ids(module="db") == ["c", "a"]
+    assert ids(exception="KeyError") == ["c"]
+    assert ids(since=1001.0, until=1003.0) == ["c", "b"]
+    assert ids(user_key="tenant", user_value="acme") == ["d", "a"]
+    assert ids(user_key="retries", user_value="3") == ["d"]
+    assert ids(user_key="tenant", user_value="acme", min_level=40) == ["d", "a"]
+    assert ids(module="db", min_level=50) == ["c"]
+    # Keyset paging carries the filter along.
+    first = data_code.fetch_log_page(
+        db_path, 1, filters=data_code.LogFilter(min_level=40)
+    )
+    keys = data_code.fetch_log_keys(
+        db_path,
+        data_code.LogCursor.of(first[0]),
+        5,
+        filters=data_code.LogFilter(min_level=40),
+    )
+    assert [key.record_id for key in keys] == ["c", "a"]
+
+
+def test_read_pool_reuses_read_only_connections(tmp_path):
+    from bug_trail.db_pool import ReadPool
+
+    db_path = str(tmp_path / "pool.db")
+    _seed_logs(db_path, 5)
+    pool = ReadPool(db_path, size=2)
+    data_code.register_pool(pool)
+    try:
+        assert data_code.table_row_count(db_path, "logs") == 5
+        assert len(data_code.fetch_log_page(db_path, limit=3)) == 3
+        assert pool.stats() == {"size": 2, "open": 1, "idle": 1}
+
+        with data_code.read_connection(db_path) as conn:
+            try:
+                conn.execute("DELETE FROM logs")
+            except sqlite3.OperationalError as error:
+                assert "readonly" in str(error)
+            else:
+                raise AssertionError("pooled connection accepted a write")
+        assert data_code.table_row_count(db_path, "logs") == 5
+    finally:
+        data_code.unregister_pool(pool)
+        pool.close()
+    assert pool.stats()["open"] == 0
+
+
+def test_read_pool_blocks_when_exhausted(tmp_path):
+    from bug_trail.db_pool import ReadPool
+
+    db_path = str(tmp_path / "pool.db")
+    _seed_logs(db_path, 1)
+    pool = ReadPool(db_path, size=1, timeout=0.05)
+    with pool.checkout():
+        try:
+            with pool.checkout():
+                raise AssertionError("pool handed out more than size connections")
+        except TimeoutError:
+            pass
+    pool.close()
+
+
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+    "SELECT count(*) FROM n"
+)
+
+
+def _slow_count(db_path: str) -> int:
+    with data_code.read_connection(db_path) as conn:
+        return conn.execute(SLOW_QUERY).fetchone()[0]
+
+
+def test_async_reader_interrupts_on_timeout_and_cancel(tmp_path):
+    import asyncio
+    import time
+
+    import pytest
+
+    from bug_trail.async_data import AsyncReader, QueryTimeout
+
+    db_path = str(tmp_path / "slow.db")
+    _seed_logs(db_path, 1)
+    reader = AsyncReader(max_workers=2, timeout=0.2)
+
+    async def scenario() -> None:
+        started = time.perf_counter()
+        with pytest.raises(QueryTimeout):
+            await reader.run(_slow_count, db_path)
+        assert time.perf_counter() - started < 1.0
+
+        task = asyncio.create_task(reader.run(_slow_count, db_path, timeout=30))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # Both queries were stopped, so the reader threads are free again.
+        assert (
+            await reader.run(data_code.table_row_count, db_path, "logs", timeout=1.0)
+            == 1
+        )
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        reader.shutdown()
+    assert reader.timeouts == 1
+    assert reader.interrupted == 2
+
+
+def test_streamed_rows_are_read_in_chunks_and_interrupted_per_item(tmp_path):
+    import asyncio
+
+    import pytest
+
+    from bug_trail.async_data import AsyncReader, QueryTimeout
+
+    db_path = str(tmp_path / "stream.db")
+    _seed_logs(db_path, 10)
+    rows = list(data_code.iter_table_rows(db_path, "logs", chunk_size=3))
+    assert [row["record_id"] for row in rows] == [
+        row["record_id"]
+        for row in data_code.fetch_table_as_list_of_dict(db_path, "logs")
+    ]
+    assert "_chunk_rowid" not in rows[0]
+
+    closed = []
+
+    def slow_second_item():
+        try:
+            yield "first"
+            yield _slow_count(db_path)
+        finally:
+            closed.append(True)
+
+    reader = AsyncReader(max_workers=2, timeout=0.2)
+
+    async def scenario() -> list:
+        received = []
+        with pytest.raises(QueryTimeout):
+            async for item in reader.iterate(slow_second_item()):
+                received.append(item)
+        # The generator is closed once the interrupted query returns.
+        for _ in range(50):
+            if closed:
+                break
+            await asyncio.sleep(0.02)
+        return received
+
+    try:
+        assert asyncio.run(scenario()) == ["first"]
+    finally:
+        reader.shutdown()
+    assert reader.timeouts == 1 and reader.interrupted == 1
+    assert closed == [True]
+
+
+def test_search_query_quotes_words_and_caps_matches(tmp_path, monkeypatch):
+    assert (
+        data_code.search_query('KeyError: "a.b()" conn*')
+        == '"KeyError:" """a.b()""" "conn"*'
+    )
+    assert data_code.search_query("  * ") == ""
+
+    db_path = str(tmp_path / "search.db")
+    _seed_logs(db_path, 30)
+    monkeypatch.setattr(data_code, "SEARCH_MATCH_CAP", 10)
+    rows, total = data_code.search_logs(db_path, "message", limit=5, order="newest")
+    assert total == 11
+    assert [row["msg"] for row in rows] == [f"message {i}" for i in range(29, 24, -1)]
+    # Ranking only looks at the newest SEARCH_MATCH_CAP matches.
+    rows, _ = data_code.search_logs(db_path, "message", limit=50)
+    assert sorted(row["log_rowid"] for row in rows) == list(range(21, 31))
@@ -0,0 +1,85 @@
+"""
+Event-loop lag during an error burst, with and without bug_trail handlers.
+
+A ticker coroutine asks to wake every millisecond and records how late it was.
+Meanwhile a burst of coroutines each call `logger.exception`.
+
+    python tests_performance/asyncio_loop_lag.py
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import bug_trail_core
+
+BURST = 500
+TICK = 0.001
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def ticker(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - started - TICK) * 1000)
+
+
+async def failing(logger: logging.Logger, i: int) -> None:
+    try:
+        raise ValueError(f"burst {i}")
+    except ValueError:
+        logger.exception("request failed")
+
+
+async def run(logger: logging.Logger, handler: logging.Handler | None) -> list[float]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(0.05)
+    for i in range(BURST):
+        await failing(logger, i)
+        # let the ticker in between requests, like a busy server would
+        await asyncio.sleep(0)
+    if isinstance(handler, bug_trail_core.AsyncBugTrailHandler):
+        await handler.aflush()
+    stop.set()
+    await tick_task
+    return lags
+
+
+def main() -> None:
+    scenarios = ["no handler", "BugTrailHandler", "AsyncBugTrailHandler"]
+    with tempfile.TemporaryDirectory() as folder:
+        for name in scenarios:
+            db_path = os.path.join(folder, f"{name.replace(' ', '_')}.db")
+            logger = logging.getLogger(f"lag.{name}")
+            logger.propagate = False
+            logger.setLevel(logging.ERROR)
+            handler: logging.Handler | None = None
+            if name == "BugTrailHandler":
+                handler = bug_trail_core.BugTrailHandler(db_path)
+            elif name == "AsyncBugTrailHandler":
+                handler = bug_trail_core.AsyncBugTrailHandler(db_path)
+            logger.addHandler(handler or logging.NullHandler())
+            lags = asyncio.run(run(logger, handler))
+            if handler is not None:
+                handler.close()
+            print(
+                f"{name:22} ticks={len(lags):5} "
+                f"p50={percentile(lags, 50):7.2f}ms p95={percentile(lags, 95):7.2f}ms "
+                f"p99={percentile(lags, 99):7.2f}ms max={max(lags):7.2f}ms "
+                f"mean={statistics.fmean(lags):6.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
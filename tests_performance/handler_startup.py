@@ -0,0 +1,79 @@
+"""
+Startup cost of bug_trail_core for CLI tools.
+
+Reports the time to import the package (fresh interpreter, via -X importtime)
+and to construct BugTrailHandler against a new and an existing database.
+
+    python tests_performance/handler_startup.py
+"""
+
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 15
+
+
+def import_time_ms(code: str) -> float:
+    timings = []
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        total = 0
+        after_site = False
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative_us, name = line.split("|")
+            if name.strip() == "site" and not name.startswith("  "):
+                after_site = True
+            elif after_site and not name.startswith("  "):
+                total += int(cumulative_us)
+        timings.append(total / 1000)
+    return statistics.median(timings)
+
+
+def construction_ms(db_path: str, fresh: bool) -> float:
+    from bug_trail_core import BugTrailHandler
+
+    timings = []
+    for _ in range(RUNS):
+        if fresh:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+        started = time.perf_counter()
+        handler = BugTrailHandler(db_path, minimum_level=logging.ERROR)
+        timings.append((time.perf_counter() - started) * 1000)
+        handler.close()
+    return statistics.median(timings)
+
+
+def main() -> None:
+    print(
+        f"import bug_trail_core                : {import_time_ms('import bug_trail_core'):7.1f} ms"
+    )
+    print(
+        "import + BugTrailHandler class       : "
+        f"{import_time_ms('import bug_trail_core; bug_trail_core.BugTrailHandler'):7.1f} ms"
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "startup.db")
+        print(
+            f"BugTrailHandler(...) new database    : {construction_ms(db_path, fresh=True):7.1f} ms"
+        )
+        print(
+            f"BugTrailHandler(...) existing database: {construction_ms(db_path, fresh=False):7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
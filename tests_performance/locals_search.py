@@ -0,0 +1,138 @@
+"""
+Searching captured local variables with and without the locals index.
+
+Seeds N traceback frames, each with a dozen locals (a nested dict among them),
+times writing them with and without the index's trigger, the backfill of an
+existing database, and a page of matches for an exact value and for a range.
+The comparison is json_extract over every frame, which is all a query could do
+before.
+
+    python tests_performance/locals_search.py [N]
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.locals_index import create_locals_index, drop_locals_index
+
+from bug_trail import data_code
+
+
+def frames(count: int):
+    rng = random.Random(3)
+    for i in range(count):
+        f_locals = {
+            "order_id": i,
+            "customer": f"customer-{i % 5000}",
+            "fish": {"x": rng.randint(-1000, 1000), "y": rng.random()},
+            "items": [rng.randint(1, 9) for _ in range(3)],
+            "retries": i % 4,
+            "note": "x" * rng.randint(10, 400),
+            "self": "<app.Checkout object at 0x7f00>",
+        }
+        yield f"{i:012d}", 0, json.dumps(f_locals), "{}"
+
+
+def seed(db_path: str, count: int) -> float:
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname) VALUES (?, ?, 'failed', 'ERROR')",
+        ((f"{i:012d}", 1_700_000_000.0 + i) for i in range(count)),
+    )
+    conn.commit()
+    started = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO traceback_info (exception_instance_id, frame_number, f_locals, f_globals) VALUES (?, ?, ?, ?)",
+        frames(count),
+    )
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def best_ms(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as folder:
+        plain = os.path.join(folder, "plain.db")
+        BaseErrorLogHandler(plain)
+        print(f"{count:,} frames written without the index: {seed(plain, count):.1f}s")
+        indexed = os.path.join(folder, "indexed.db")
+        BaseErrorLogHandler(indexed, index_locals=True)
+        print(
+            f"{count:,} frames written with the index:    {seed(indexed, count):.1f}s"
+        )
+
+        conn = sqlite3.connect(indexed)
+        drop_locals_index(conn)
+        conn.commit()
+        conn.execute("VACUUM")
+        size_without = os.path.getsize(indexed)
+        started = time.perf_counter()
+        create_locals_index(conn)
+        conn.commit()
+        print(f"backfill of the index: {time.perf_counter() - started:.1f}s")
+        conn.execute("VACUUM")
+        print(
+            f"database {size_without / 2**20:.0f} MB without the index, {os.path.getsize(indexed) / 2**20:.0f} MB with it"
+        )
+        conn.close()
+
+        print(f"{'query':>22} {'matches':>8} {'index ms':>9} {'json ms':>9}")
+        for name, operator, value in (
+            ("order_id", "=", count // 2),
+            ("customer", "=", "customer-42"),
+            ("fish.x", "<", -990),
+            ("retries", ">=", 3),
+        ):
+            _, total = data_code.search_locals(indexed, name, operator, value)
+            index_ms = best_ms(
+                lambda name=name, operator=operator, value=value: data_code.search_locals(
+                    indexed, name, operator, value
+                )
+            )
+            json_ms = best_ms(
+                lambda name=name, operator=operator, value=value: _json_scan(
+                    plain, name, operator, value
+                ),
+                repeat=1,
+            )
+            shown = (
+                f"{data_code.LOCALS_MATCH_CAP}+"
+                if total > data_code.LOCALS_MATCH_CAP
+                else str(total)
+            )
+            print(
+                f"{name + ' ' + operator + ' ' + str(value):>22} {shown:>8} {index_ms:>9.1f} {json_ms:>9.1f}"
+            )
+
+
+def _json_scan(db_path: str, name: str, operator: str, value) -> None:
+    # What the same question costs without the index: decode every frame.
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            f"SELECT exception_instance_id FROM traceback_info "  # nosec
+            f"WHERE json_extract(f_locals, ?) {operator} ? ORDER BY id DESC LIMIT 50",
+            ("$." + name, value),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
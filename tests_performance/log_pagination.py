@@ -0,0 +1,70 @@
+"""
+Log list page latency by depth: LIMIT/OFFSET vs keyset cursors.
+
+Seeds a database with N log rows, then times fetching a 100-row page near the
+top, in the middle and at the end of the list both ways.
+
+    python tests_performance/log_pagination.py [N]
+"""
+
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+
+from bug_trail import data_code
+
+PAGE_SIZE = 100
+
+
+def seed(db_path: str, count: int) -> None:
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname, filename, lineno) "
+        "VALUES (?, ?, ?, 'ERROR', 'bench.py', 1)",
+        ((f"{i:012d}", 1_700_000_000.0 + i / 10, f"message {i}") for i in range(count)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def best_ms(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = f"{folder}/pages.db"
+        seed(db_path, count)
+        keys = data_code.fetch_log_keys(
+            db_path, data_code.LogCursor(float("inf"), ""), count, older=True
+        )
+        print(f"{count:,} rows, {PAGE_SIZE} per page")
+        print(f"{'depth':>10} {'OFFSET ms':>10} {'keyset ms':>10}")
+        for depth in (0.0, 0.5, 0.99):
+            offset = int(count * depth) // PAGE_SIZE * PAGE_SIZE
+            cursor = keys[offset - 1] if offset else None
+            offset_ms = best_ms(
+                lambda offset=offset: data_code.fetch_log_data(
+                    db_path, limit=PAGE_SIZE, offset=offset
+                )
+            )
+            keyset_ms = best_ms(
+                lambda cursor=cursor: data_code.fetch_log_page(
+                    db_path, PAGE_SIZE, before=cursor
+                )
+            )
+            print(f"{offset:>10,} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Full-text search latency on a large database.
+
+Seeds N log rows with a mix of common and rare words (through the FTS triggers,
+as the handler would write them), rebuilds the index from scratch the way the
+migration does, then times a 50-row results page for words of different
+frequency, best match first and newest first.
+
+    python tests_performance/log_search.py [N]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.search_index import create_search_index, drop_search_index
+
+from bug_trail import data_code
+
+WORDS = [
+    "timeout",
+    "connection",
+    "refused",
+    "database",
+    "locked",
+    "retry",
+    "worker",
+    "queue",
+    "payload",
+    "cache",
+]
+
+
+def seed(db_path: str, count: int) -> None:
+    BaseErrorLogHandler(db_path)
+    rng = random.Random(7)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, args, levelname, filename, lineno, traceback) "
+        "VALUES (?, ?, ?, '()', 'ERROR', 'bench.py', 1, ?)",
+        (
+            (
+                f"{i:012d}",
+                1_700_000_000.0 + i / 10,
+                # "rare<n>" appears in 1 row of 10,000; the WORDS in about a third of rows each
+                " ".join(rng.sample(WORDS, 3)) + f" order {i} rare{i % 10_000}",
+                (
+                    'Traceback (most recent call last):\n  File "bench.py", line 1, in handler\n'
+                    if i % 4 == 0
+                    else None
+                ),
+            )
+            for i in range(count)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def best_ms(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "search.db")
+        started = time.perf_counter()
+        seed(db_path, count)
+        print(
+            f"{count:,} rows written with the search triggers in {time.perf_counter() - started:.1f}s"
+        )
+
+        conn = sqlite3.connect(db_path)
+        drop_search_index(conn)
+        conn.commit()
+        conn.execute("VACUUM")
+        size_without = os.path.getsize(db_path)
+        started = time.perf_counter()
+        create_search_index(conn)
+        conn.commit()
+        print(f"backfill of the index: {time.perf_counter() - started:.1f}s")
+        conn.execute("VACUUM")
+        size_with = os.path.getsize(db_path)
+        conn.close()
+        print(
+            f"database {size_without / 2**20:.0f} MB without the index, {size_with / 2**20:.0f} MB with it"
+        )
+
+        print(
+            f"{'query':>24} {'matches':>8} {'rank ms':>9} {'newest ms':>10} {'LIKE ms':>9}"
+        )
+        for text in (
+            "rare1234",
+            "timeout",
+            "timeout refused",
+            "connection*",
+            "handler",
+        ):
+            _, total = data_code.search_logs(db_path, text)
+            rank_ms = best_ms(
+                lambda text=text: data_code.search_logs(db_path, text, order="rank")
+            )
+            newest_ms = best_ms(
+                lambda text=text: data_code.search_logs(db_path, text, order="newest")
+            )
+            like_ms = best_ms(
+                lambda text=text: _like(db_path, text.split()[0].rstrip("*")), repeat=1
+            )
+            shown = (
+                f"{data_code.SEARCH_MATCH_CAP}+"
+                if total > data_code.SEARCH_MATCH_CAP
+                else str(total)
+            )
+            print(
+                f"{text:>24} {shown:>8} {rank_ms:>9.1f} {newest_ms:>10.1f} {like_ms:>9.1f}"
+            )
+
+
+def _like(db_path: str, word: str) -> None:
+    # What a search without the index would have to do.
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            "SELECT record_id FROM logs WHERE msg LIKE ? OR traceback LIKE ? ORDER BY created DESC LIMIT 50",
+            (f"%{word}%", f"%{word}%"),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
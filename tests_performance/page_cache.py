@@ -0,0 +1,62 @@
+"""
+Per-request time for cached pages: rendered every time, served from the
+response cache, and answered with 304 Not Modified.
+
+    python tests_performance/page_cache.py [ROWS] [REQUESTS]
+"""
+
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.venv_info import record_venv_info
+from fastapi.testclient import TestClient
+
+from bug_trail import app as app_module
+
+
+def seed(db_path: str, count: int) -> None:
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    record_venv_info(conn)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname, filename, lineno) "
+        "VALUES (?, ?, ?, 'ERROR', 'bench.py', 1)",
+        ((f"{i:012d}", 1_700_000_000.0 + i / 10, f"message {i}") for i in range(count)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def mean_us(
+    client: TestClient, path: str, requests: int, headers: dict | None = None
+) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = f"{folder}/viewer.db"
+        seed(db_path, rows)
+        app_module.configure(db_path)
+        print(f"{rows:,} rows, {requests} requests each, mean µs per request")
+        print(f"{'path':<14} {'rendered':>10} {'cached':>10} {'304':>10}")
+        for path in ("/environment", "/system", "/"):
+            # No `with`: the lifespan doesn't run, so there is no cache.
+            rendered = mean_us(TestClient(app_module.app), path, requests)
+            with TestClient(app_module.app) as client:
+                etag = client.get(path).headers["etag"]
+                cached = mean_us(client, path, requests)
+                not_modified = mean_us(client, path, requests, {"If-None-Match": etag})
+            print(f"{path:<14} {rendered:>10.0f} {cached:>10.0f} {not_modified:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
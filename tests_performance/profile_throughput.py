@@ -0,0 +1,53 @@
+"""
+Throughput of BugTrailHandler under each storage profile.
+
+Logs N errors (a fifth of them with a traceback) through a handler and reports
+records/second as seen by the caller (emit) and end to end (emit + final flush).
+
+    python tests_performance/profile_throughput.py [N]
+"""
+
+import logging
+import sys
+import tempfile
+import time
+
+from bug_trail_core import BugTrailHandler
+from bug_trail_core.profiles import PROFILES
+
+
+def run(profile: str, count: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as folder:
+        handler = BugTrailHandler(f"{folder}/bench.db", profile=profile)
+        logger = logging.getLogger(f"bench.{profile}")
+        logger.handlers.clear()
+        logger.propagate = False
+        logger.addHandler(handler)
+        started = time.perf_counter()
+        for i in range(count):
+            if i % 5:
+                logger.error("benchmark error %s", i, extra={"iteration": i})
+            else:
+                try:
+                    raise ValueError(i)
+                except ValueError:
+                    logger.exception("benchmark exception %s", i)
+        emitted = time.perf_counter() - started
+        handler.flush()
+        total = time.perf_counter() - started
+        logger.handlers.clear()
+        handler.close()
+    return count / emitted, count / total
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{count} records per profile")
+    print(f"{'profile':<10} {'emit rec/s':>12} {'durable rec/s':>14}")
+    for name in PROFILES:
+        emit_rate, total_rate = run(name, count)
+        print(f"{name:<10} {emit_rate:>12,.0f} {total_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Dashboard charts from the rollup tables versus GROUP BY over logs.
+
+Seeds N records spread over the last 30 days, with and without the rollup trigger, and
+times both inserts. Then times each chart the log list draws: one series per
+level over 2 days by hour, and per logger over 30 days by day. The comparison
+is the GROUP BY over logs that a chart would otherwise run on every page load.
+
+    python tests_performance/rollup_charts.py [N]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from bug_trail_core.rollups import drop_rollups
+
+from bug_trail import data_code
+
+LEVELS = ("WARNING", "ERROR", "ERROR", "ERROR", "CRITICAL")
+
+
+def records(count: int, end: float):
+    # In time order, as a handler writes them
+    rng = random.Random(5)
+    start = end - 30 * 86400
+    for i in range(count):
+        created = start + 30 * 86400 * i / count
+        yield f"{i:012d}", created, "failed", rng.choice(
+            LEVELS
+        ), f"app.module{rng.randrange(40)}"
+
+
+def seed(db_path: str, count: int, end: float, rollups: bool) -> float:
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    if not rollups:
+        drop_rollups(conn)
+    started = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname, name) VALUES (?, ?, ?, ?, ?)",
+        records(count, end),
+    )
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def best_ms(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def _group_by(
+    db_path: str, seconds: int, column: str, buckets: int, end: float
+) -> None:
+    # What the chart costs without rollups: group the logs in range on every load.
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            f"SELECT {column}, CAST(created / ? AS INTEGER) AS bucket, count(*) FROM logs "  # nosec
+            "WHERE created >= ? GROUP BY 1, 2",
+            (seconds, end - buckets * seconds),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    end = time.time()
+    with tempfile.TemporaryDirectory() as folder:
+        plain = os.path.join(folder, "plain.db")
+        rolled = os.path.join(folder, "rolled.db")
+        print(
+            f"{count:,} records written without rollups: {seed(plain, count, end, False):.1f}s"
+        )
+        print(
+            f"{count:,} records written with rollups:    {seed(rolled, count, end, True):.1f}s"
+        )
+
+        print(f"{'chart':>28} {'rollups ms':>11} {'GROUP BY ms':>12}")
+        for label, resolution, dimension, column, buckets in (
+            ("levels, 48 hours", "hour", "level", "levelname", 48),
+            ("heatmap, 7 days", "hour", "level", "levelname", 168),
+            ("loggers, 30 days", "day", "logger", "name", 30),
+        ):
+            seconds = data_code.ROLLUP_RESOLUTIONS[resolution]
+            rollup_ms = best_ms(
+                lambda resolution=resolution, dimension=dimension, buckets=buckets: data_code.fetch_rollups(
+                    rolled, resolution, dimension, buckets, end
+                )
+            )
+            scan_ms = best_ms(
+                lambda seconds=seconds, column=column, buckets=buckets: _group_by(
+                    plain, seconds, column, buckets, end
+                ),
+                repeat=3,
+            )
+            print(f"{label:>28} {rollup_ms:>11.1f} {scan_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Hold many /events connections open while log records stream in.
+
+Starts the viewer in a subprocess, connects N SSE clients with raw asyncio
+sockets, writes records at a steady rate from this process, and reports how
+many clients stayed connected, how many `rows` events each received, the
+delay from the write to its arrival, and the server's memory.
+
+    python tests_performance/sse_load.py [CLIENTS] [SECONDS] [RECORDS_PER_SECOND]
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bug_trail_core.handlers import BugTrailHandler
+
+SERVER = """
+import sys
+from bug_trail import app as app_module
+import uvicorn
+app_module.configure(sys.argv[1], max_sse_clients=int(sys.argv[3]))
+uvicorn.run(app_module.app, port=int(sys.argv[2]), log_level="warning")
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+async def client(
+    port: int, written_at: dict[int, float], stats: dict, stop: asyncio.Event
+) -> None:
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError:
+        stats["refused"] += 1
+        return
+    writer.write(
+        b"GET /events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n"
+    )
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        stats["refused"] += 1
+        writer.close()
+        return
+    stats["connected"] += 1
+    events = 0
+    try:
+        while not stop.is_set():
+            try:
+                line = await asyncio.wait_for(reader.readline(), 0.5)
+            except TimeoutError:
+                continue
+            if not line:
+                stats["closed"] += 1
+                break
+            if line.startswith(b"id: "):
+                event_id = int(line[4:])
+                sent = written_at.get(event_id)
+                if sent is not None:
+                    stats["delays"].append(time.perf_counter() - sent)
+                events += 1
+    finally:
+        stats["events"].append(events)
+        writer.close()
+
+
+def write_records(
+    db_path: str, rate: float, seconds: float, written_at: dict[int, float]
+) -> None:
+    handler = BugTrailHandler(db_path)
+    logger = logging.getLogger("sse-load")
+    logger.propagate = False
+    logger.addHandler(handler)
+    deadline = time.perf_counter() + seconds
+    rowid = 1  # the seed record
+    while time.perf_counter() < deadline:
+        logger.error("load record %s", rowid)
+        rowid += 1
+        written_at[rowid] = time.perf_counter()
+        time.sleep(1 / rate)
+    logger.removeHandler(handler)
+    handler.close()
+
+
+async def main() -> None:
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "load.db")
+        seed = BugTrailHandler(db_path)
+        seed.handle(
+            logging.makeLogRecord(
+                {"msg": "seed", "levelno": logging.ERROR, "levelname": "ERROR"}
+            )
+        )
+        seed.close()
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-c", SERVER, db_path, str(port), str(clients)]
+        )
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            idle_rss = rss_mb(server.pid)
+
+            stats: dict = {
+                "connected": 0,
+                "refused": 0,
+                "closed": 0,
+                "events": [],
+                "delays": [],
+            }
+            written_at: dict[int, float] = {}
+            stop = asyncio.Event()
+            tasks = [
+                asyncio.create_task(client(port, written_at, stats, stop))
+                for _ in range(clients)
+            ]
+            # One more than the cap should be turned away.
+            extra = asyncio.create_task(client(port, written_at, stats, stop))
+            await asyncio.sleep(2.0)
+            connected_rss = rss_mb(server.pid)
+
+            writer = threading.Thread(
+                target=write_records, args=(db_path, rate, seconds, written_at)
+            )
+            writer.start()
+            while writer.is_alive():
+                await asyncio.sleep(0.2)
+            await asyncio.sleep(2.0)
+            loaded_rss = rss_mb(server.pid)
+            stop.set()
+            await asyncio.gather(*tasks, extra)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    delays = sorted(stats["delays"]) or [float("nan")]
+    print(f"{clients} clients, {seconds:.0f}s of writes at {rate:.0f} records/s")
+    print(
+        f"  connected {stats['connected']}, refused {stats['refused']}, closed early {stats['closed']}"
+    )
+    print(
+        f"  rows events per client: min {min(stats['events'])}, median {statistics.median(stats['events'])}"
+    )
+    print(
+        f"  write-to-client delay: p50 {delays[len(delays) // 2] * 1000:.0f} ms, "
+        f"p99 {delays[int(len(delays) * 0.99)] * 1000:.0f} ms"
+    )
+    print(
+        f"  server RSS: idle {idle_rss:.0f} MB, {clients} connected {connected_rss:.0f} MB, after writes {loaded_rss:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Time to first byte and peak memory of the environment page, streamed or buffered.
+
+Seeds N python_libraries rows and requests /environment straight through the
+ASGI app, timing the first body chunk and the whole page, with tracemalloc's
+peak over the request. "buffered" renders the same rows the way the page was
+rendered before: every row fetched into a list, then the template rendered
+into one string.
+
+    python tests_performance/streaming_render.py [N ...]
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from fastapi import Request
+
+from bug_trail import app as app_module
+from bug_trail.app import app, render
+from bug_trail.data_code import fetch_table_as_list_of_dict
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"bench")],
+    "client": ("bench", 1),
+    "server": ("bench", 80),
+}
+
+
+def seed(db_path: str, count: int) -> None:
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM python_libraries")
+    urls = json.dumps(
+        {
+            "Homepage": "https://example.com/project",
+            "Source": "https://github.com/example/project",
+        }
+    )
+    conn.executemany(
+        "INSERT INTO python_libraries (library_name, version, urls) VALUES (?, ?, ?)",
+        ((f"library-{i}", f"1.{i}.0", urls) for i in range(count)),
+    )
+    conn.commit()
+    conn.close()
+
+
+@app.get("/bench/environment-buffered")
+async def buffered(request: Request):
+    rows = fetch_table_as_list_of_dict(app_module.STATE.db_path, "python_libraries")
+    for row in rows:
+        row["urls"] = json.loads(row["urls"]) if row["urls"] else {}
+    return render(
+        request, "view_python_environment.jinja", logs=rows, library_count=len(rows)
+    )
+
+
+async def request(path: str) -> tuple[float, float, int]:
+    first: list[float] = []
+    size = 0
+
+    async def receive():
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body" and message.get("body"):
+            if not first:
+                first.append(time.perf_counter())
+            size += len(message["body"])
+
+    started = time.perf_counter()
+    await app({**SCOPE, "path": path, "raw_path": path.encode()}, receive, send)
+    return (first[0] - started) * 1000, (time.perf_counter() - started) * 1000, size
+
+
+def measure(path: str) -> tuple[float, float, int, float]:
+    asyncio.run(request(path))  # warm up
+    tracemalloc.start()
+    ttfb, total, size = asyncio.run(request(path))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ttfb, total, size, peak
+
+
+def main() -> None:
+    counts = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000]
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "bench.db")
+        app_module.STATE.db_path = db_path
+        print(
+            f"{'rows':>7} {'page':>9} {'mode':>9} {'first byte ms':>14} {'total ms':>9} {'peak MB':>8}"
+        )
+        for count in counts:
+            seed(db_path, count)
+            for mode, path in (
+                ("streamed", "/environment"),
+                ("buffered", "/bench/environment-buffered"),
+            ):
+                ttfb, total, size, peak = measure(path)
+                print(
+                    f"{count:>7,} {size / 2**20:>7.1f}MB {mode:>9} {ttfb:>14.1f} {total:>9.0f} {peak / 2**20:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Requests per second for the log list (`/`), with and without the read pool.
+
+Without the pool every data function opens and closes its own connection, as
+when the app runs without its lifespan; with it, reads check out one of the
+lifespan's read-only connections.
+
+    python tests_performance/viewer_requests.py [ROWS] [SECONDS]
+"""
+
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bug_trail_core.handlers import BaseErrorLogHandler
+from fastapi.testclient import TestClient
+
+from bug_trail import app as app_module
+
+THREADS = 8
+
+
+def seed(db_path: str, count: int) -> None:
+    BaseErrorLogHandler(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO logs (record_id, created, msg, levelname, filename, lineno) "
+        "VALUES (?, ?, ?, 'ERROR', 'bench.py', 1)",
+        ((f"{i:012d}", 1_700_000_000.0 + i / 10, f"message {i}") for i in range(count)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def requests_per_second(client: TestClient, seconds: float, threads: int) -> float:
+    deadline = time.perf_counter() + seconds
+
+    def worker() -> int:
+        done = 0
+        while time.perf_counter() < deadline:
+            response = client.get("/")
+            assert response.status_code == 200
+            done += 1
+        return done
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        total = sum(executor.map(lambda _: worker(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = f"{folder}/viewer.db"
+        seed(db_path, rows)
+        app_module.configure(db_path)
+        print(f"{rows:,} rows, GET / for {seconds:.0f}s each")
+        print(f"{'threads':>8} {'no pool req/s':>14} {'pool req/s':>11}")
+        for threads in (1, THREADS):
+            # No `with`: the lifespan doesn't run, so there is no pool.
+            without = requests_per_second(TestClient(app_module.app), seconds, threads)
+            with TestClient(app_module.app) as client:
+                pooled = requests_per_second(client, seconds, threads)
+            print(f"{threads:>8} {without:>14.0f} {pooled:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()